@@ -1,2 +1,2 @@
 from knitlib.knitlib import *
-from knitlib.helpers import tuckPattern, knitPass #so can import directly from there
\ No newline at end of file
+from knitlib.helpers import tuckPattern, knitPass, NeedleSet #so can import directly from there
\ No newline at end of file
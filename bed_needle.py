@@ -1,7 +1,9 @@
 from __future__ import annotations #so we don't have to worry about situations that would require forward declarations
-from typing import Optional, Union, Tuple, List
+from typing import Optional, Union, Tuple, List, Sequence
 # from copy import deepcopy
 from multimethod import multimethod
+import heapq
+import numpy as np
 
 #======
 import sys
@@ -21,33 +23,22 @@ from .knitout_helpers import getBedNeedle
 class BedNeedle:
 	init_row = 0 #check
 
-	@multimethod
-	def __init__(self, bed: str, needle: int):
-		self.bed = bed
-		self.needle = needle
-		self.loop_ct = 1
-		self.stitch_ct = 0
-
-	@__init__.register
-	def __init__(self, bn: Tuple[str,int]):
-		self.bed, self.needle = bn
-		self.loop_ct = 1
-		self.stitch_ct = 0
-	
-	@__init__.register
-	def __init__(self, bn: str):
-		self.bed, self.needle = getBedNeedle(bn)
+	def __init__(self, bed: Union[str, Tuple[str,int], BedNeedle], needle: Optional[int]=None):
+		# (plain `isinstance` checks rather than `multimethod` dispatch, since this is called for every snapshot)
+		if isinstance(bed, BedNeedle): #copy constructor
+			self.bed = bed.bed
+			self.needle = bed.needle
+			self.loop_ct = bed.loop_ct
+			self.stitch_ct = bed.stitch_ct
+			return
+		#
+		if needle is not None: self.bed, self.needle = bed, needle
+		elif isinstance(bed, str): self.bed, self.needle = getBedNeedle(bed)
+		elif isinstance(bed, tuple): self.bed, self.needle = bed
+		else: raise TypeError(f"can't create a BedNeedle from {bed!r}")
 		self.loop_ct = 1
 		self.stitch_ct = 0
 
-	#copy constructor
-	@__init__.register
-	def __init__(self, bn: BedNeedle):
-		self.bed = bn.bed
-		self.needle = bn.needle
-		self.loop_ct = bn.loop_ct
-		self.stitch_ct = bn.stitch_ct
-
 	@property
 	def current_row(self):
 		return self.init_row+self.stitch_ct
@@ -68,37 +59,326 @@ class BedNeedle:
 		return f"{self.bed}{self.needle}"
 
 
-class BedNeedleList(list):
+
+BEDS = ("f", "b", "fs", "bs")
+TIE_RANK = {"fs": 0, "f": 1, "bs": 2, "b": 3} # order of beds at the same needle in sorted order
+
+
+def bedNeedleKey(item: Union[BedNeedle, Tuple[str,int], str]) -> Tuple[str,int]:
+	if isinstance(item, BedNeedle): return item.bed, item.needle
+	elif isinstance(item, str): return getBedNeedle(item)
+	else: return item[0], int(item[1])
+
+
+class RowCounter:
+	'''
+	Keeps track of the row count (aka the highest `stitch_ct` of any needle holding loops) incrementally, using a histogram of stitch counts, so it never has to scan all of the needles.
+	'''
+	def __init__(self):
+		self.hist = {}
+		self.row_ct = 0
+
+	def add(self, stitch_ct: int) -> None:
+		self.hist[stitch_ct] = self.hist.get(stitch_ct, 0) + 1
+		if stitch_ct > self.row_ct: self.row_ct = stitch_ct
+
+	def remove(self, stitch_ct: int) -> None:
+		self.hist[stitch_ct] -= 1
+		if stitch_ct == self.row_ct:
+			while self.row_ct > 0 and not self.hist.get(self.row_ct, 0):
+				self.row_ct -= 1
+
+	def update(self, removed: np.ndarray, added: np.ndarray) -> None:
+		'''
+		Batch version of `remove` (for each value in `removed`) followed by `add` (for each value in `added`).
+		'''
+		for stitch_ct, ct in zip(*np.unique(removed, return_counts=True)):
+			self.hist[int(stitch_ct)] -= int(ct)
+		for stitch_ct, ct in zip(*np.unique(added, return_counts=True)):
+			self.hist[int(stitch_ct)] = self.hist.get(int(stitch_ct), 0) + int(ct)
+		#
+		if len(added): self.row_ct = max(self.row_ct, int(added.max()))
+		while self.row_ct > 0 and not self.hist.get(self.row_ct, 0):
+			self.row_ct -= 1
+
+	def copy(self) -> RowCounter:
+		res = RowCounter()
+		res.hist = self.hist.copy()
+		res.row_ct = self.row_ct
+		return res
+
+
+class BedArrays:
+	'''
+	Per-needle loop state for a single bed, stored in fixed-width numpy arrays indexed by `needle-offset` (and grown as needed, so negative needles are fine too).
+
+	The min/max occupied needles are tracked incrementally with a pair of heaps (`min_heap` holds needles, `max_heap` holds negated needles).  Needles are pushed when they start holding loops, and entries for needles that have since been emptied are only discarded once they reach the top of a heap (lazy deletion), so `minNeedle`/`maxNeedle` are O(1) amortized.
+
+	Parameters:
+	----------
+	* `capacity` (int, optional): initial number of needles to allocate. Defaults to `256`.
+	* `offset` (int, optional): needle number of the first slot. Defaults to `-32`.
+	'''
+	def __init__(self, capacity: int=256, offset: int=-32):
+		self.offset = offset
+		self.occupied = np.zeros(capacity, dtype=bool)
+		self.loop_ct = np.zeros(capacity, dtype=np.int32)
+		self.stitch_ct = np.zeros(capacity, dtype=np.int32)
+		self.init_row = np.zeros(capacity, dtype=np.int32)
+		self.order = np.zeros(capacity, dtype=np.int64) # when each needle was added (so we can iterate in insertion order, like a list)
+		self.ct = 0
+		self.min_heap: List[int] = []
+		self.max_heap: List[int] = []
+
+	def columns(self) -> Tuple[np.ndarray, ...]:
+		return (self.occupied, self.loop_ct, self.stitch_ct, self.init_row, self.order)
+
+	def grow(self, needle: int) -> None:
+		capacity = len(self.occupied)
+		lo, hi = min(self.offset, needle), max(self.offset+capacity, needle+1)
+		new_capacity = max(2*capacity, 2*(hi-lo))
+		new_offset = lo - (new_capacity-(hi-lo))//2
+		shift = self.offset-new_offset
+		#
+		self.occupied, self.loop_ct, self.stitch_ct, self.init_row, self.order = [np.concatenate((np.zeros(shift, dtype=col.dtype), col, np.zeros(new_capacity-capacity-shift, dtype=col.dtype))) for col in self.columns()]
+		self.offset = new_offset
+
+	def index(self, needle: int) -> int:
+		'''
+		Returns the array index for `needle`, growing the arrays first if needed.
+		'''
+		i = needle-self.offset
+		if i < 0 or i >= len(self.occupied):
+			self.grow(needle)
+			i = needle-self.offset
+		return i
+
+	def find(self, needle: int) -> int:
+		'''
+		Returns the array index for `needle` if it is holding loops, otherwise `-1`.
+		'''
+		i = needle-self.offset
+		if 0 <= i < len(self.occupied) and self.occupied[i]: return i
+		else: return -1
+
+	def needles(self) -> np.ndarray:
+		return np.flatnonzero(self.occupied)+self.offset
+
+	def push(self, needle: int) -> None:
+		'''
+		Records that `needle` started holding loops, for the min/max heaps.
+		'''
+		if len(self.min_heap) > 4*self.ct+64: self.compact()
+		heapq.heappush(self.min_heap, needle)
+		heapq.heappush(self.max_heap, -needle)
+
+	def compact(self) -> None:
+		'''
+		Rebuilds the min/max heaps from the occupied needles (dropping stale entries), so they don't grow unbounded when lots of needles are emptied from the middle of the bed.
+		'''
+		needles = [int(n) for n in self.needles()]
+		self.min_heap = needles # (already sorted, so a valid heap)
+		self.max_heap = [-n for n in reversed(needles)]
+
+	def minNeedle(self) -> Optional[int]:
+		if self.ct == 0: return None
+		heap = self.min_heap
+		while self.find(heap[0]) < 0: heapq.heappop(heap)
+		return heap[0]
+
+	def maxNeedle(self) -> Optional[int]:
+		if self.ct == 0: return None
+		heap = self.max_heap
+		while self.find(-heap[0]) < 0: heapq.heappop(heap)
+		return -heap[0]
+
+	def copy(self) -> BedArrays:
+		res = BedArrays.__new__(BedArrays)
+		res.offset, res.ct = self.offset, self.ct
+		res.occupied, res.loop_ct, res.stitch_ct, res.init_row, res.order = [col.copy() for col in self.columns()]
+		res.min_heap, res.max_heap = self.min_heap.copy(), self.max_heap.copy()
+		return res
+
+
+class BedNeedleList:
+	'''
+	State of the loops on the needle beds: `loop_ct`, `stitch_ct`, and `init_row` for each needle holding loops, stored in per-bed numpy arrays (see `BedArrays`), with the row count maintained incrementally (see `RowCounter`).
+
+	Adding, removing, incrementing, and transferring loops are all O(1) (amortized), and so is `getRowCt()`.  Iterating (or indexing) gives `BedNeedle` snapshots in the order the needles were added, like a list.  NOTE: `BedNeedle`s returned by `get`, `min`, `max`, etc. are snapshots; modifying them doesn't change the state.
+
+	Items can be given as `BedNeedle`s, bed-needle strings (e.g., `"f10"`), or `(bed, needle)` tuples.  For hot paths, the core methods (`hasBn`, `appendBn`, `removeBn`, `incrementBn`, `xferBn`) take the bed and needle directly and skip the per-call `multimethod` dispatch.
+	'''
 	def __init__(self, *args):
+		self.beds = {bed: BedArrays() for bed in BEDS}
+		self.rows = RowCounter()
+		self.ct = 0
+		self.next_order = 0
+		#
 		for item in args:
-			bn = BedNeedle(item)
-			self.__dict__[bn.format()] = bn
+			bed, needle = bedNeedleKey(item)
+			if isinstance(item, BedNeedle): self.setLoops(bed, needle, item.loop_ct, item.stitch_ct, item.init_row)
+			else: self.setLoops(bed, needle, 1, 0, 0)
+
+	#---------------------------------------------------------------------------
+	def setLoops(self, bed: str, needle: int, loop_ct: int, stitch_ct: int, init_row: int) -> None:
+		'''
+		Adds a needle that isn't holding loops yet.
+		'''
+		arrs = self.beds[bed]
+		i = arrs.index(needle)
+		if arrs.occupied[i]: self.clearLoops(bed, needle)
+		arrs.occupied[i] = True
+		arrs.loop_ct[i] = loop_ct
+		arrs.stitch_ct[i] = stitch_ct
+		arrs.init_row[i] = init_row
+		arrs.order[i] = self.next_order
+		self.next_order += 1
+		arrs.ct += 1
+		arrs.push(needle)
+		self.ct += 1
+		self.rows.add(stitch_ct)
+
+	def clearLoops(self, bed: str, needle: int) -> bool:
+		'''
+		Removes a needle, returning whether it was holding loops.
+		'''
+		arrs = self.beds[bed]
+		i = arrs.find(needle)
+		if i < 0: return False
+		arrs.occupied[i] = False
+		arrs.ct -= 1
+		self.ct -= 1
+		self.rows.remove(int(arrs.stitch_ct[i]))
+		return True
+
+	def setStitchCt(self, arrs: BedArrays, i: int, stitch_ct: int) -> None:
+		self.rows.remove(int(arrs.stitch_ct[i]))
+		arrs.stitch_ct[i] = stitch_ct
+		self.rows.add(stitch_ct)
+
+	def snapshot(self, bed: str, needle: int) -> Optional[BedNeedle]:
+		arrs = self.beds.get(bed)
+		if arrs is None: return None
+		i = arrs.find(needle)
+		if i < 0: return None
+		bn = BedNeedle(bed, needle)
+		bn.loop_ct = int(arrs.loop_ct[i])
+		bn.stitch_ct = int(arrs.stitch_ct[i])
+		bn.init_row = int(arrs.init_row[i])
+		return bn
+
+	def keys(self) -> List[Tuple[str,int]]:
+		'''
+		(bed, needle) of each needle holding loops, in the order they were added.
+		'''
+		needles, orders = [], []
+		for bed, arrs in self.beds.items():
+			if arrs.ct:
+				idxs = np.flatnonzero(arrs.occupied)
+				needles.extend((bed, int(n)) for n in idxs+arrs.offset)
+				orders.append(arrs.order[idxs])
+		if not needles: return []
+		return [needles[j] for j in np.argsort(np.concatenate(orders), kind="stable")]
+
+	#---------------------------------------------------------------------------
+	# core API: plain `(bed, needle)` arguments, no `multimethod` dispatch (used by the Writer for each operation)
+	def hasBn(self, bed: str, needle: int) -> bool:
+		arrs = self.beds.get(bed)
+		return arrs is not None and arrs.find(needle) >= 0
+
+	def appendBn(self, bed: str, needle: int, loop_ct: int=1, stitch_ct: int=0) -> None:
+		self.setLoops(bed, needle, loop_ct, stitch_ct, self.getRowCt()) #check
+
+	def removeBn(self, bed: str, needle: int) -> None:
+		if not self.clearLoops(bed, needle): raise ValueError(f"'{bed}{needle}' is not holding any loops.")
+
+	def incrementBn(self, bed: str, needle: int, is_tuck: bool=False) -> None:
+		arrs = self.beds[bed]
+		i = arrs.find(needle)
+		if i < 0: self.appendBn(bed, needle)
+		elif is_tuck: arrs.loop_ct[i] += 1
+		else:
+			arrs.loop_ct[i] = 1 #since knitted thru
+			self.setStitchCt(arrs, i, int(arrs.stitch_ct[i])+1)
+
+	def incrementBns(self, beds: Union[str, Sequence[str]], needles: np.ndarray, is_tuck: bool=False, times: int=1) -> None:
+		'''
+		Batch version of `incrementBn` for a whole pass: same result as calling `incrementBn(bed, needle, is_tuck)` for each needle in `needles` (in order), where `beds` is either the bed for all of the needles, or one bed per needle.  With `times > 1`, same result as doing that `times` times over (e.g., for a pass that is repeated).
+
+		When every needle is already holding loops (and none repeat), the loop/stitch counts are updated with vectorized array operations; otherwise, falls back to one needle at a time (since the order then matters, e.g., for the `init_row` of new loops).
+		'''
+		needles = np.asarray(needles, dtype=np.int64)
+		if not len(needles) or times < 1: return
+		if isinstance(beds, str): groups = [(beds, needles)]
+		else:
+			beds = np.asarray(beds)
+			groups = [(bed, needles[beds == bed]) for bed in np.unique(beds)]
+		#
+		idxs = []
+		for bed, ns in groups:
+			arrs = self.beds[bed]
+			i = ns-arrs.offset
+			if i.min() < 0 or i.max() >= len(arrs.occupied) or not arrs.occupied[i].all() or len(np.unique(i)) != len(i): break
+			idxs.append((arrs, i))
+		else:
+			for arrs, i in idxs:
+				if is_tuck: arrs.loop_ct[i] += times
+				else:
+					arrs.loop_ct[i] = 1 #since knitted thru
+					stitch_cts = arrs.stitch_ct[i]
+					self.rows.update(stitch_cts, stitch_cts+times)
+					arrs.stitch_ct[i] = stitch_cts+times
+			return
+		#
+		if isinstance(beds, str): beds = [beds]*len(needles)
+		for _ in range(times):
+			for bed, needle in zip(beds, needles.tolist()):
+				self.incrementBn(str(bed), needle, is_tuck)
+
+	def xferBn(self, bed: str, needle: int, bed2: str, needle2: int, is_split: bool=False) -> None:
+		from_arrs, to_arrs = self.beds[bed], self.beds[bed2]
 		#
-		super().__init__(BedNeedle(item) for item in args) #TODO: consolidate this into above for loop
+		i = from_arrs.find(needle) #TODO: allow xfers from empty needles?
+		if i < 0:
+			self.setLoops(bed, needle, 0, 0, self.getRowCt()) #since not necessarily a loop forming
+			i = from_arrs.find(needle)
+		j = to_arrs.find(needle2)
+		if j < 0:
+			self.setLoops(bed2, needle2, 0, 0, self.getRowCt()) #since not necessarily a loop forming #new #check
+			j = to_arrs.find(needle2)
+			i = from_arrs.find(needle) # (in case the arrays grew)
+		#
+		to_arrs.loop_ct[j] += from_arrs.loop_ct[i]
+		#
+		if from_arrs.stitch_ct[i] < to_arrs.stitch_ct[j]: #?
+			self.setStitchCt(to_arrs, j, int(from_arrs.stitch_ct[i]))
+			to_arrs.init_row[j] = from_arrs.init_row[i]
+		#
+		if is_split:
+			from_arrs.init_row[i] = self.getRowCt()
+			from_arrs.loop_ct[i] = 1
+			self.setStitchCt(from_arrs, i, 0)
+		else: self.clearLoops(bed, needle)
 
+	#---------------------------------------------------------------------------
+	# convenience API: items can be `BedNeedle`s, bed-needle strings, or `(bed, needle)` tuples
 	@multimethod
-	def get(self, item: str):
+	def get(self, item: str) -> Optional[BedNeedle]:
 		try:
-			return self.__dict__[item]
-		except KeyError:
+			return self.snapshot(*getBedNeedle(item))
+		except ValueError:
 			return None
-	
+
 	@get.register
-	def get(self, item: Tuple[str,int]) -> BedNeedle:
-		try:
-			return self.__dict__[f"{item[0]}{item[1]}"]
-		except KeyError:
-			return None
+	def get(self, item: Tuple[str,int]) -> Optional[BedNeedle]:
+		return self.snapshot(item[0], item[1])
 
 	@get.register
-	def get(self, item: BedNeedle) -> BedNeedle:
-		try:
-			return self.__dict__[item.format()]
-		except KeyError:
-			return None
+	def get(self, item: BedNeedle) -> Optional[BedNeedle]:
+		return self.snapshot(item.bed, item.needle)
 
 	def getActiveBns(self, bed: str) -> List[str]:
-		return [f"{bn.bed}{bn.needle}" for bn in self if bn.bed == bed]
+		return [f"{b}{n}" for b, n in self.keys() if b == bed]
 	
 	def getStackCt(self, item: Union[BedNeedle, Tuple[str,int], str]):
 		bn = self.get(item)
@@ -109,125 +389,144 @@ class BedNeedleList(list):
 		return bn.stitch_ct
 	
 	def getRowCt(self) -> int:
-		return max([bn.stitch_ct for bn in self], default=0)
+		return self.rows.row_ct
 	
 	def getHeldRowCt(self, item: Union[BedNeedle, Tuple[str,int], str]):
 		bn = self.get(item)
 		return max(0, self.getRowCt()-bn.current_row) #TODO: have current_row too #? 
 
 	def format(self) -> List[str]:
-		return [bn.format() for bn in self]
+		return [f"{bed}{needle}" for bed, needle in self.keys()]
+
+	def __len__(self) -> int:
+		return self.ct
+
+	def __iter__(self):
+		for bed, needle in self.keys():
+			yield self.snapshot(bed, needle)
+
+	def __getitem__(self, i: Union[int, slice]) -> Union[BedNeedle, List[BedNeedle]]:
+		return list(self)[i]
 
 	@multimethod
 	def __contains__(self, item: str):
-		return item in self.__dict__
+		try:
+			return self.hasBn(*getBedNeedle(item))
+		except ValueError:
+			return False
 	
 	@__contains__.register
 	def __contains__(self, item: BedNeedle):
-		return item.format() in self.__dict__
+		return self.hasBn(item.bed, item.needle)
 	
 	@__contains__.register
 	def __contains__(self, item: Tuple[str,int]):
-		return f"{item[0]}{item[1]}" in self.__dict__
+		return self.hasBn(item[0], item[1])
 	
 	def copy(self): #new
-		return BedNeedleList(*[bn for bn in self])
+		res = BedNeedleList.__new__(BedNeedleList)
+		res.beds = {bed: arrs.copy() for bed, arrs in self.beds.items()}
+		res.rows = self.rows.copy()
+		res.ct, res.next_order = self.ct, self.next_order
+		return res
 	
 	@multimethod
 	def append(self, item: BedNeedle) -> None:
-		item.init_row = self.getRowCt() #check
-		super().append(item)
-		self.__dict__[item.format()] = item #new
+		self.appendBn(item.bed, item.needle, item.loop_ct, item.stitch_ct)
 
 	@append.register
 	def append(self, item: Union[str, Tuple[str,int]]) -> None:
-		self.append(BedNeedle(item))
+		self.appendBn(*bedNeedleKey(item))
 
 	@multimethod
 	def remove(self, item: BedNeedle) -> None:
-		super().remove(self.get(item))
-		del self.__dict__[item.format()]
+		self.removeBn(item.bed, item.needle)
 
 	@remove.register
 	def remove(self, item: Union[str, Tuple[str,int]]) -> None:
-		self.remove(BedNeedle(item))
+		self.removeBn(*bedNeedleKey(item))
 
 	@multimethod
 	def increment(self, bn: BedNeedle, is_tuck=False) -> None:
-		if bn not in self: self.append(bn)
-		else:
-			if is_tuck: bn.loop_ct += 1
-			else:
-				bn.loop_ct = 1 #since knitted thru
-				bn.stitch_ct += 1
+		if self.hasBn(bn.bed, bn.needle): self.incrementBn(bn.bed, bn.needle, is_tuck)
+		else: self.append(bn)
 
 	@increment.register
 	def increment(self, item: Union[Tuple[str,int], str], is_tuck=False) -> None:
-		if item in self: bn = self.get(item)
-		else:
-			bn = BedNeedle(item)
-		#
-		self.increment(bn, is_tuck)
-
+		self.incrementBn(*bedNeedleKey(item), is_tuck)
 
 	@multimethod
 	def xfer(self, bn_from: BedNeedle, bn_to: BedNeedle, is_split=False) -> None:
-		bn_to.loop_ct += bn_from.loop_ct
-		#
-		if bn_from.stitch_ct < bn_to.stitch_ct: #?
-			bn_to.stitch_ct = bn_from.stitch_ct
-			bn_to.init_row = bn_from.init_row
-		#
-		if is_split:
-			bn_from.init_row = self.getRowCt()
-			bn_from.loop_ct = 1
-			bn_from.stitch_ct = 0
-		else: self.remove(bn_from)
+		self.xferBn(bn_from.bed, bn_from.needle, bn_to.bed, bn_to.needle, is_split)
 
 	@xfer.register
 	def xfer(self, item_from: Union[Tuple[str,int], str], item_to: Union[Tuple[str,int], str], is_split=False) -> None:
-		if item_from in self: bn_from = self.get(item_from) #TODO: allow xfers from empty needles?
-		else:
-			bn_from = BedNeedle(item_from)
-			bn_from.loop_ct = 0 #since not necessarily a loop forming
-			self.append(bn_from)
-		#
-		# bn_from = self.get(item_from) #TODO: allow xfers from empty needles?
-		if item_to in self: bn_to = self.get(item_to)
-		else:
-			bn_to = BedNeedle(item_to)
-			bn_to.loop_ct = 0 #since not necessarily a loop forming #new #check
-			self.append(bn_to)
+		self.xferBn(*bedNeedleKey(item_from), *bedNeedleKey(item_to), is_split)
+
+	#---------------------------------------------------------------------------
+	def setOrder(self, keys: List[Tuple[str,int]]) -> None:
+		for bed, needle in keys:
+			arrs = self.beds[bed]
+			arrs.order[arrs.find(needle)] = self.next_order
+			self.next_order += 1
+
+	def sortedKeys(self, bed: Optional[str], reverse=False) -> List[Tuple[str,int]]:
+		if bed is None: res = sorted(self.keys(), key=lambda bn: (-bn[1],bn[0]))
+		elif bed not in self.beds: res = []
+		else: res = sorted(((bed, int(n)) for n in self.beds[bed].needles()), key=lambda bn: (-bn[1],bn[0]))
 		#
-		self.xfer(bn_from, bn_to, is_split)
+		if not reverse: res.reverse() # bed `f` comes first (so works for when knitting at e.g. `rack 0.25`)
+		return res
 
 	def sort(self, reverse=False) -> None:
-		super().sort(key=lambda bn: (-bn.needle,bn.bed))
-		if not reverse: super().reverse() # bed `f` comes first (so works for when knitting at e.g. `rack 0.25`)
+		self.setOrder(self.sortedKeys(None, reverse))
 	
 	def sorted(self, bed: Optional[str], reverse=False) -> BedNeedleList:
-		if bed is None: res = sorted(self, key=lambda bn: (-bn.needle,bn.bed))
-		else: res = sorted([bn for bn in self if bn.bed == bed], key=lambda bn: (-bn.needle,bn.bed))
-		#
-		if not reverse: res.reverse()
-		return BedNeedleList(*res)
+		return BedNeedleList(*[self.snapshot(b, n) for b, n in self.sortedKeys(bed, reverse)])
 			
 	def rackSorted(self, rack: int, reverse=False) -> BedNeedleList: #check
-		res = [bn if bn.bed == "f" else BedNeedle(bn.bed, bn.needle+rack) for bn in self]
-		res = sorted(res, key=lambda bn: (-bn.needle,bn.bed))
-		if not reverse: res.reverse()
-		#
 		res = [bn if bn.bed == "f" else BedNeedle(bn.bed, bn.needle-rack) for bn in self]
 		return BedNeedleList(*res)
+
+	def extremeNeedle(self, bed: Optional[str], get_max: bool) -> Optional[Tuple[int,str]]:
+		'''
+		Returns `(needle, bed)` for the min (or max) needle holding loops on `bed` (or on any bed, if `bed` is `None`), or `None` if there aren't any.
+		'''
+		if bed is None: beds = BEDS
+		else: beds = (bed,) if bed in self.beds else ()
+		#
+		res, best = None, None
+		for b in beds:
+			arrs = self.beds[b]
+			if not arrs.ct: continue
+			needle = arrs.maxNeedle() if get_max else arrs.minNeedle()
+			# (on ties, `min` favors the front bed and `max` favors the back bed, as in the sorted order)
+			key = (needle, TIE_RANK[b])
+			if res is None or (key > best if get_max else key < best): res, best = (needle, b), key
+		return res
+
+	def minNeedle(self, bed: Optional[str]=None) -> Optional[int]:
+		'''
+		Returns the lowest needle holding loops on `bed` (or on any bed, if `bed` is `None`), or `None` if there aren't any.  O(1) amortized.
+		'''
+		res = self.extremeNeedle(bed, get_max=False)
+		return None if res is None else res[0]
+
+	def maxNeedle(self, bed: Optional[str]=None) -> Optional[int]:
+		'''
+		Returns the highest needle holding loops on `bed` (or on any bed, if `bed` is `None`), or `None` if there aren't any.  O(1) amortized.
+		'''
+		res = self.extremeNeedle(bed, get_max=True)
+		return None if res is None else res[0]
 	
 	def min(self, bed: Optional[str]=None) -> BedNeedle:
 		assert len(self) != 0, "no active bns"
-		sorted_bns = self.sorted(bed, reverse=False)
-		assert len(sorted_bns) != 0, f"no active bns on bed {bed}"
-		return sorted_bns[0]
+		res = self.extremeNeedle(bed, get_max=False)
+		assert res is not None, f"no active bns on bed {bed}"
+		return self.snapshot(res[1], res[0])
 	
 	def max(self, bed: Optional[str]=None) -> BedNeedle:
 		assert len(self) != 0, "no active bns"
-		sorted_bns = self.sorted(bed, reverse=False)
-		assert len(sorted_bns) != 0, f"no active bns on bed {bed}"
-		return sorted_bns[-1]
\ No newline at end of file
+		res = self.extremeNeedle(bed, get_max=True)
+		assert res is not None, f"no active bns on bed {bed}"
+		return self.snapshot(res[1], res[0])
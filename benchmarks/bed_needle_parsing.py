@@ -0,0 +1,69 @@
+'''
+Per-call cost of parsing bed-needle strings (e.g., `"f123"`) with the previous regex-based parsers vs. the shared, cached `knitout_helpers.getBedNeedle`.
+
+usage: python benchmarks/bed_needle_parsing.py [--needles 500] [--repeat 200]
+'''
+import argparse
+import importlib.util
+import re
+import timeit
+
+import regex
+
+#===============================================================================
+import sys
+from pathlib import Path
+
+## Register the repo as the `knitlib` package, whatever the clone's folder is named
+ROOT = Path(__file__).absolute().parents[1]
+if "knitlib" not in sys.modules:
+	spec = importlib.util.spec_from_file_location("knitlib", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)])
+	module = importlib.util.module_from_spec(spec)
+	sys.modules["knitlib"] = module
+	spec.loader.exec_module(module)
+#===============================================================================
+
+from knitlib.knitout_helpers import getBedNeedle
+from knitlib.knitlib_knitout import shiftBedNeedle
+from knitlib.helpers import bnSplit
+
+
+# previous implementations, for reference:
+reg = re.compile(r"^([f|b]s?)(-?\d+)?$")
+
+def oldShiftBedNeedle(bn: str):
+	m = reg.match(bn)
+	return m.group(1)+m.group(2), (m.group(1), int(m.group(2)))
+
+def oldGetBedNeedle(bn: str):
+	res = re.match(r"^([f|b]s?)(-?\d+)$", bn)
+	return res.group(1), int(res.group(2))
+
+def oldBnSplit(bn: str):
+	i = regex.search(r"[a-z]+", bn).end()
+	return (bn[:i], int(bn[i:]))
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--needles", type=int, default=500, help="number of needles (per bed) to parse")
+	parser.add_argument("--repeat", type=int, default=200, help="number of times to parse each needle (aka passes)")
+	args = parser.parse_args()
+
+	bns = [f"{bed}{n}" for bed in ("f", "b") for n in range(args.needles)]
+	ct = len(bns)*args.repeat
+
+	def perCall(func) -> float:
+		t = min(timeit.repeat(lambda: [func(bn) for bn in bns], number=args.repeat, repeat=3))
+		return t/ct*1e9
+
+	results = [
+		("shiftBedNeedle", perCall(oldShiftBedNeedle), perCall(lambda bn: shiftBedNeedle([bn]))),
+		("getBedNeedle", perCall(oldGetBedNeedle), perCall(getBedNeedle)),
+		("bnSplit", perCall(oldBnSplit), perCall(bnSplit)),
+	]
+
+	print(f"{ct} calls each (ns per call)")
+	print(f"{'':<16}{'before':>10}{'after':>10}")
+	for name, before, after in results:
+		print(f"{name:<16}{before:>10.0f}{after:>10.0f}  ({before/after:.1f}x)")
@@ -0,0 +1,83 @@
+'''
+Compares the knitlib Writer with validation on vs. off (`Writer(cs, validate=False)`), using the program from `example.py` scaled up (by default, 500 needles and 1000 pattern passes), and checks that both produce the same bytes.
+
+usage: python benchmarks/fast_writer.py [--width 500] [--passes 1000]
+'''
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import tempfile
+import time
+import warnings
+
+#===============================================================================
+import sys
+from pathlib import Path
+
+## Register the repo as the `knitlib` package, whatever the clone's folder is named
+ROOT = Path(__file__).absolute().parents[1]
+if "knitlib" not in sys.modules:
+	spec = importlib.util.spec_from_file_location("knitlib", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)])
+	module = importlib.util.module_from_spec(spec)
+	sys.modules["knitlib"] = module
+	spec.loader.exec_module(module)
+#===============================================================================
+
+from knitlib.knitlib_knitout import Writer
+from knitlib.knitlib import altTuckCaston, dropFinish
+from knitlib.stitch_patterns import jersey, rib, garter, seed
+
+
+def example(k, width: int, passes: int) -> None:
+	c = "1"
+	bed = "f"
+	left_n = 0
+	right_n = width
+	gauge = 1
+	pat_passes = passes//4 # split evenly between the four stitch patterns
+
+	altTuckCaston(k, start_n=right_n, end_n=left_n, c=c, bed=bed, gauge=gauge, inhook=True, releasehook=True, tuck_pattern=True)
+
+	jersey(k, start_n=right_n, end_n=left_n, passes=pat_passes, c=c, bed=bed, gauge=gauge)
+
+	rib(k, start_n=right_n, end_n=left_n, passes=pat_passes, c=c, bed=bed, sequence="ffb", gauge=gauge)
+
+	garter(k, start_n=right_n, end_n=left_n, passes=pat_passes, c=c, bed=bed, sequence="fbffbb", gauge=gauge)
+
+	seed(k, start_n=right_n, end_n=left_n, passes=pat_passes, c=c, bed=bed, sequence="fb", gauge=gauge)
+
+	dropFinish(k, front_needle_ranges=[left_n, right_n], back_needle_ranges=[left_n, right_n], out_carriers=[c], direction="-", machine="swgn2")
+
+
+def run(validate: bool, width: int, passes: int, out_path: str) -> float:
+	with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+		start = time.perf_counter()
+		k = Writer("1 2 3 4 5 6 7 8 9 10", validate=validate)
+		warnings.simplefilter("ignore") # (after creating the Writer, since it sets up its own filters)
+		example(k, width, passes)
+		k.write(out_path)
+		return time.perf_counter()-start
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--width", type=int, default=500, help="number of needles")
+	parser.add_argument("--passes", type=int, default=1000, help="total number of stitch pattern passes")
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		checked_path, unchecked_path = os.path.join(tmp_dir, "validate.k"), os.path.join(tmp_dir, "fast.k")
+		#
+		checked_t = run(True, args.width, args.passes, checked_path)
+		unchecked_t = run(False, args.width, args.passes, unchecked_path)
+		#
+		with open(checked_path, "rb") as f1, open(unchecked_path, "rb") as f2:
+			same = f1.read() == f2.read()
+
+	print(f"{args.width} needles x {args.passes} passes")
+	print(f"validate=True:  {checked_t:.2f}s")
+	print(f"validate=False: {unchecked_t:.2f}s ({checked_t/unchecked_t:.1f}x faster)")
+	print(f"identical output: {same}")
+	if not same: sys.exit(1)
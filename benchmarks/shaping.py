@@ -0,0 +1,68 @@
+'''
+Times a shaped panel knit with `KnitObject` (a jersey panel that is decreased by one needle on each side every other row), which queries the min/max needles holding loops (`getMinNeedle`/`getMaxNeedle`) many times per row, and reports how long those queries take vs. a full scan of the bed state.
+
+usage: python benchmarks/shaping.py [--width 1000] [--decreases 100]
+'''
+import argparse
+import contextlib
+import importlib.util
+import io
+import time
+import timeit
+import warnings
+
+#===============================================================================
+import sys
+from pathlib import Path
+
+## Register the repo as the `knitlib` package, whatever the clone's folder is named
+ROOT = Path(__file__).absolute().parents[1]
+if "knitlib" not in sys.modules:
+	spec = importlib.util.spec_from_file_location("knitlib", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)])
+	module = importlib.util.module_from_spec(spec)
+	sys.modules["knitlib"] = module
+	spec.loader.exec_module(module)
+#===============================================================================
+
+from knitlib.knitlib_knitout import Writer
+from knitlib.knit_object import KnitObject, CastonMethod, StitchPattern, DecreaseMethod
+
+
+def shapedPanel(width: int, decreases: int) -> KnitObject:
+	k = Writer("1 2 3 4 5 6") # (KnitObject relies on the bed/carrier state, so validation needs to stay on)
+	warnings.simplefilter("ignore") # (after creating the Writer, since it sets up its own filters)
+	obj = KnitObject(k, gauge=1)
+	obj.caston(CastonMethod.ALT_TUCK_CLOSED, "f", (width, 0), "1")
+	for _ in range(decreases):
+		obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+		obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+		obj.decreaseLeft(DecreaseMethod.EDGE, "f", 1)
+		obj.decreaseRight(DecreaseMethod.EDGE, "f", 1)
+	return obj
+
+
+def scanMinNeedle(obj: KnitObject, bed=None):
+	# for reference: scanning all of the needles holding loops
+	needles = [n for b, n in obj.k.bns.keys() if bed is None or b == bed]
+	return min(needles) if len(needles) else float("inf")
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--width", type=int, default=1000, help="number of needles to cast on")
+	parser.add_argument("--decreases", type=int, default=100, help="number of (double-sided) decreases")
+	args = parser.parse_args()
+	assert args.width > 2*args.decreases, "too many decreases for the width"
+
+	with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+		start = time.perf_counter()
+		obj = shapedPanel(args.width, args.decreases)
+		total_t = time.perf_counter()-start
+
+		ct = 10000
+		incremental_t = min(timeit.repeat(lambda: (obj.getMinNeedle(), obj.getMaxNeedle("f")), number=ct, repeat=3))/(2*ct)
+		scan_t = min(timeit.repeat(lambda: (scanMinNeedle(obj), scanMinNeedle(obj, "f")), number=ct//10, repeat=3))/(2*ct//10)
+
+	print(f"{args.width} needles, {args.decreases} decreases ({len(obj.k.bns)} needles left)")
+	print(f"shaped panel: {total_t:.2f}s")
+	print(f"min/max needle query: {incremental_t*1e6:.2f}us (full scan: {scan_t*1e6:.2f}us, {scan_t/incremental_t:.0f}x)")
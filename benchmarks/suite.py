@@ -0,0 +1,308 @@
+'''
+Benchmark suite with reproducible workloads covering raw `Writer.knit` throughput, each `stitch_patterns` function (at several widths, gauges, and pass counts), `wasteSection`, the castons and bindoffs in `knitlib.py`, `KnitObject` shaping sequences, `punch_card.generate`, `generate_swatches.generate`, and a full `KnitObject` garment.
+
+For each workload, reports the wall time (best of `--repeat` runs), the number of operations emitted and ops/sec, and the peak memory allocated (traced in a separate run, so tracing doesn't slow down the timed ones).  Results can be saved as JSON (`--out`), and compared with a previous run's (`--compare`), exiting with status 1 if any workload got slower (or used more memory) by more than `--threshold`.
+
+usage: python benchmarks/suite.py [--filter REGEX] [--quick] [--repeat 3] [--out results.json] [--compare baseline.json] [--threshold 0.15] [--list]
+'''
+import argparse
+import contextlib
+import copy
+import datetime
+import importlib.util
+import inspect
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+#===============================================================================
+import sys
+from pathlib import Path
+
+## Register the repo as the `knitlib` package, whatever the clone's folder is named
+ROOT = Path(__file__).absolute().parents[1]
+if "knitlib" not in sys.modules:
+	spec = importlib.util.spec_from_file_location("knitlib", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)])
+	module = importlib.util.module_from_spec(spec)
+	sys.modules["knitlib"] = module
+	spec.loader.exec_module(module)
+#===============================================================================
+
+from knitlib.knitlib_knitout import Writer
+from knitlib.knitlib import wasteSection, altTuckCaston, altTuckClosedCaston, altTuckOpenTubeCaston, zigzagCaston, sheetBindoff, closedTubeBindoff, openTubeBindoff, simultaneousBindoff, dropFinish
+from knitlib import stitch_patterns
+from knitlib.knit_object import KnitObject, CastonMethod, StitchPattern, BindoffMethod, DecreaseMethod, IncreaseMethod
+
+
+CARRIERS = "1 2 3 4 5 6 7 8 9 10"
+
+STITCH_PATTERNS = ("jersey", "interlock", "rib", "seed", "garter", "tuckGarter", "tuckStitch", "altKnitTuck")
+
+# differences smaller than this are treated as noise when comparing runs
+NOISE_FLOOR = {"time": 1e-3, "peak_memory": 64*1024}
+
+SWATCHES = [["jersey", [20, 12], 1], ["rib_fb", [24, 10], 1, {"stitchNumber": 70}], ["garter_fbb", [24, 9], 1], ["seed_fb", [30, 11], 1], ["tuck", [30, 8], 1], ["jersey_b", [34, 7], 1], ["interlock", [36, 6], 1], ["jersey tube", [40, 10], 1], ["rib_fb tube", [44, 6], 2]]
+
+
+class Workload:
+	'''
+	A benchmark workload: `run(k, **params)` is timed on a fresh Writer, after the (untimed) `setup(k, **params)`.
+
+	Parameters:
+	----------
+	* `name` (str): name of the workload (the params are appended to it, e.g., `"stitch_patterns.rib[width=50,gauge=1,passes=10]"`).
+	* `run` (callable): emits the operations to time; it can return a different Writer than `k` to count operations from (e.g., if it creates its own).
+	* `setup` (callable, optional): prepares `k` (e.g., casts on, so a bindoff has loops to bind off). Defaults to `None`.
+	* `validate` (bool, optional): `validate` argument for the Writer. Defaults to `True`.
+	* `params`: JSON-serializable keyword arguments for `run` and `setup`.
+	'''
+	def __init__(self, name: str, run, setup=None, validate: bool=True, **params):
+		shown = dict(params, **({} if validate else {"validate": False}))
+		self.name = name + ("[" + ",".join(f"{key}={val}" for key, val in shown.items() if key != "img_path") + "]" if shown else "")
+		self.run = run
+		self.setup = setup
+		self.validate = validate
+		self.params = params
+
+	def measure(self, trace: bool=False):
+		'''
+		Runs the workload once, and returns `(wall time, operations emitted, peak memory allocated (if traced, otherwise None))`.
+		'''
+		with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()): # (some workloads create their own Writers, which reset the warning filters)
+			k = Writer(CARRIERS, validate=self.validate)
+			warnings.simplefilter("ignore") # (after creating the Writer, since it sets up its own filters)
+			if self.setup is not None: self.setup(k, **self.params)
+			start_ct = len(k.operations)
+			#
+			if trace: tracemalloc.start()
+			try:
+				start = time.perf_counter()
+				res = self.run(k, **self.params)
+				t = time.perf_counter()-start
+				peak = tracemalloc.get_traced_memory()[1] if trace else None
+			finally:
+				if trace: tracemalloc.stop()
+		#
+		if isinstance(res, Writer) and res is not k: return t, len(res.operations), peak
+		else: return t, len(k.operations)-start_ct, peak
+
+
+#-------------------------------------------------------------------------------
+# workloads:
+
+def writerKnit(k, width: int, passes: int) -> None:
+	k.inhook("1")
+	for p in range(passes):
+		if p % 2 == 0:
+			for n in range(width-1, -1, -1):
+				k.knit("-", f"f{n}", "1")
+		else:
+			for n in range(width):
+				k.knit("+", f"f{n}", "1")
+
+
+def castOn(k, width: int, gauge: int, bed=None, **kwargs) -> None:
+	if bed == "f" or bed == "b": altTuckCaston(k, width-1, 0, "1", bed, gauge=gauge, inhook=True, releasehook=True, tuck_pattern=True)
+	else: altTuckClosedCaston(k, width-1, 0, "1", gauge=gauge, inhook=True, releasehook=True, tuck_pattern=True)
+
+
+def stitchPatternSetup(func):
+	bed = inspect.signature(func).parameters["bed"].default # (single-bed patterns default to "f", double-bed ones to None)
+	def setup(k, width: int, gauge: int, passes: int) -> None:
+		castOn(k, width, gauge, bed)
+	return setup
+
+
+def stitchPatternRun(func):
+	def run(k, width: int, gauge: int, passes: int) -> None:
+		func(k, start_n=width-1, end_n=0, passes=passes, c="1", gauge=gauge)
+	return run
+
+
+def wasteSectionRun(k, width: int, gauge: int, bed) -> None:
+	wasteSection(k, 0, width-1, caston_bed=bed, waste_c="1", draw_c="2", in_cs=["1", "2"], gauge=gauge, initial=True)
+
+
+CASTONS = {
+	"altTuckCaston": lambda k, width, gauge: altTuckCaston(k, width-1, 0, "1", "f", gauge=gauge, inhook=True, releasehook=True, tuck_pattern=True),
+	"altTuckClosedCaston": lambda k, width, gauge: altTuckClosedCaston(k, width-1, 0, "1", gauge=gauge, inhook=True, releasehook=True, tuck_pattern=True),
+	"altTuckOpenTubeCaston": lambda k, width, gauge: altTuckOpenTubeCaston(k, width-1, 0, "1", gauge=gauge, inhook=True, releasehook=True, tuck_pattern=True),
+	"zigzagCaston": lambda k, width, gauge: zigzagCaston(k, width-1, 0, "1", gauge=gauge, inhook=True, releasehook=True, tuck_pattern=True),
+}
+
+# bindoff: (setup, run)
+BINDOFFS = {
+	"sheetBindoff": (lambda k, width, gauge: castOn(k, width, gauge, "f"), lambda k, width, gauge: sheetBindoff(k, 0, width-1, "1", "f", gauge=gauge)),
+	"closedTubeBindoff": (lambda k, width, gauge: castOn(k, width, gauge), lambda k, width, gauge: closedTubeBindoff(k, 0, width-1, "1", gauge=gauge)),
+	"openTubeBindoff": (lambda k, width, gauge: altTuckOpenTubeCaston(k, width-1, 0, "1", gauge=gauge, inhook=True, releasehook=True, tuck_pattern=True), lambda k, width, gauge: openTubeBindoff(k, 0, width-1, "1", gauge=gauge)),
+	"simultaneousBindoff": (lambda k, width, gauge: (castOn(k, width, gauge), altTuckCaston(k, 0, width-1, "2", "b", gauge=gauge, inhook=True, releasehook=True, tuck_pattern=True)), lambda k, width, gauge: simultaneousBindoff(k, {"f": width-1, "b": 0}, {"f": 0, "b": width-1}, {"f": "1", "b": "2"})),
+	"dropFinish": (lambda k, width, gauge: castOn(k, width, gauge), lambda k, width, gauge: dropFinish(k, front_needle_ranges=[0, width-1], back_needle_ranges=[0, width-1], out_carriers=["1"], direction="-")),
+}
+
+
+def shapingRun(k, width: int, count: int, dec: str, inc: str) -> None:
+	# jersey panel that is decreased on the left and increased on the right every other row (so it shifts over without changing width)
+	obj = KnitObject(k, gauge=1)
+	obj.caston(CastonMethod.ALT_TUCK_CLOSED, "f", (width-1, 0), "1")
+	for _ in range(count):
+		obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+		obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+		obj.decreaseLeft(DecreaseMethod[dec], "f", 1)
+		obj.increaseRight(IncreaseMethod[inc], "f", 1)
+
+
+def punchCardRun(k, width: int, passes: int, setting: str, img_path: str) -> None:
+	from knitlib import punch_card # (needs opencv)
+	if setting == "FAIRISLE": punch_card.generate(k, width-1, 0, passes, "1", "f", img_path, setting=punch_card.FAIRISLE, c2="2", inhook_carriers=["1", "2"])
+	else: punch_card.generate(k, width-1, 0, passes, "1", "f", img_path, setting=getattr(punch_card, setting), inhook_carriers=["1"])
+
+
+def swatchesRun(k, count: int) -> Writer:
+	from knitlib.generate_swatches import generate
+	swatches = copy.deepcopy(SWATCHES*count) # (`generate` fills in the swatches in place)
+	return generate(swatches, None, processes=1)
+
+
+def garmentRun(k, width: int, rows: int) -> None:
+	# waste section, ribbed cuff, and a jersey body that is decreased on both sides, then bound off and written out
+	obj = KnitObject(k, gauge=2)
+	obj.wasteSection(None, (width-1, 0), "5", "6", ["1"])
+	obj.caston(CastonMethod.ALT_TUCK_CLOSED, None, (width-1, 0), "1")
+	for _ in range(rows//4):
+		obj.knitPass(StitchPattern.RIB, None, None, "1")
+	for r in range(rows):
+		obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+		if r % 4 == 3 and r < rows//2:
+			obj.decreaseLeft(DecreaseMethod.EDGE, "f", 2)
+			obj.decreaseRight(DecreaseMethod.EDGE, "f", 2)
+	obj.bindoff(BindoffMethod.CLOSED, "f", "1")
+	k.write(io.StringIO())
+
+
+def workloads(quick: bool, tmp_dir: str) -> list:
+	widths, gauges, pass_cts = ((50,), (1, 2), (10,)) if quick else ((50, 250), (1, 2), (10, 100))
+	res = []
+	#
+	for validate in (True, False):
+		res.append(Workload("writer.knit", writerKnit, validate=validate, width=100 if quick else 500, passes=20 if quick else 200))
+	#
+	for name in STITCH_PATTERNS:
+		func = getattr(stitch_patterns, name)
+		for width in widths:
+			for gauge in gauges:
+				for passes in pass_cts:
+					res.append(Workload(f"stitch_patterns.{name}", stitchPatternRun(func), stitchPatternSetup(func), width=width, gauge=gauge, passes=passes))
+	#
+	for width in widths:
+		for gauge in gauges:
+			for bed in ("f", None):
+				res.append(Workload("knitlib.wasteSection", wasteSectionRun, width=width, gauge=gauge, bed=bed))
+			for name, run in CASTONS.items():
+				res.append(Workload(f"knitlib.{name}", run, width=width, gauge=gauge))
+			for name, (setup, run) in BINDOFFS.items():
+				res.append(Workload(f"knitlib.{name}", run, setup, width=width, gauge=gauge))
+	#
+	for dec, inc in (("EDGE", "SCHOOL_BUS"), ("SCHOOL_BUS", "SCHOOL_BUS"), ("EDGE", "CASTON")):
+		res.append(Workload("knit_object.shaping", shapingRun, width=100 if quick else 300, count=10 if quick else 50, dec=dec, inc=inc))
+	#
+	img_path = os.path.join(tmp_dir, "punch_card.png")
+	try:
+		import cv2
+		cv2.imwrite(img_path, np.random.default_rng(0).choice(np.array([0, 255], dtype=np.uint8), size=(24, 24)))
+		for setting in ("TUCK", "FAIRISLE", "SLIP"):
+			res.append(Workload("punch_card.generate", punchCardRun, width=100 if quick else 240, passes=24 if quick else 96, setting=setting, img_path=img_path))
+	except ImportError: print("(skipping punch_card workloads: they need opencv)")
+	#
+	res.append(Workload("generate_swatches.generate", swatchesRun, count=1 if quick else 3))
+	res.append(Workload("garment.knit_object", garmentRun, width=80 if quick else 240, rows=40 if quick else 200))
+	return res
+
+
+#-------------------------------------------------------------------------------
+
+def gitCommit():
+	try:
+		return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError): return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+	'''
+	Returns `(name, metric, ratio)` for each workload that is slower (or uses more memory) than in `baseline` by more than `threshold` (e.g., `0.15` for 15%), and by more than the `NOISE_FLOOR`.
+	'''
+	regressions = []
+	for name, res in results.items():
+		base = baseline.get(name)
+		if base is None: continue
+		for metric in ("time", "peak_memory"):
+			if base.get(metric) and res.get(metric) is not None:
+				ratio = res[metric]/base[metric]
+				if ratio > 1+threshold and res[metric]-base[metric] > NOISE_FLOOR[metric]: regressions.append((name, metric, ratio))
+	return regressions
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--filter", type=str, default=None, help="only run the workloads whose names match this regex")
+	parser.add_argument("--quick", action="store_true", help="smaller workloads (e.g., for a quick check)")
+	parser.add_argument("--repeat", type=int, default=3, help="number of timed runs per workload (the best one is reported)")
+	parser.add_argument("--out", type=str, default=None, help="path to save the results to, as JSON")
+	parser.add_argument("--compare", type=str, default=None, help="path to the JSON results of a previous run to compare with")
+	parser.add_argument("--threshold", type=float, default=0.15, help="relative slowdown (or memory increase) to report as a regression")
+	parser.add_argument("--list", action="store_true", help="list the workloads without running them")
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		selected = [w for w in workloads(args.quick, tmp_dir) if args.filter is None or re.search(args.filter, w.name)]
+		if args.list:
+			print("\n".join(w.name for w in selected))
+			sys.exit(0)
+		#
+		results = {}
+		for w in selected:
+			try:
+				w.measure() # (warm-up, e.g. for caches that are filled on first use)
+				t, ops, _ = min(w.measure() for _ in range(args.repeat))
+				_, _, peak = w.measure(trace=True)
+			except Exception as e:
+				print(f"{w.name}: FAILED ({type(e).__name__}: {e})")
+				results[w.name] = {"error": f"{type(e).__name__}: {e}"}
+				continue
+			results[w.name] = {"time": t, "ops": ops, "ops_per_sec": ops/t if t > 0 else None, "peak_memory": peak}
+			print(f"{w.name}: {t*1000:.1f}ms, {ops} ops ({ops/t if t > 0 else float('inf'):,.0f} ops/s), peak {peak/1024**2:.2f}MiB")
+
+	report = {
+		"meta": {
+			"date": datetime.datetime.now().isoformat(timespec="seconds"),
+			"commit": gitCommit(),
+			"python": platform.python_version(),
+			"numpy": np.__version__,
+			"platform": platform.platform(),
+			"quick": args.quick,
+			"repeat": args.repeat,
+		},
+		"results": results,
+	}
+	if args.out is not None:
+		with open(args.out, "w") as f:
+			json.dump(report, f, indent=2)
+		print(f"wrote results to '{args.out}'")
+	#
+	if args.compare is not None:
+		with open(args.compare) as f:
+			baseline = json.load(f)
+		if baseline["meta"].get("quick") != args.quick: print("WARNING: comparing quick and full workloads")
+		regressions = compare(results, baseline["results"], args.threshold)
+		for name, metric, ratio in regressions:
+			print(f"REGRESSION: {name} {metric} {ratio:.2f}x baseline")
+		print(f"{len(regressions)} regressions (threshold: {args.threshold:.0%}) vs. '{args.compare}' (commit {baseline['meta'].get('commit')})")
+		if len(regressions): sys.exit(1)
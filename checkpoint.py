@@ -0,0 +1,76 @@
+from typing import Optional, Union, Tuple
+from pathlib import Path
+import pickle
+import io
+
+#===============================================================================
+import sys
+
+## Standalone boilerplate before relative imports
+if not __package__: #remove #?
+	DIR = Path(__file__).resolve().parent
+	sys.path.insert(0, str(DIR.parent))
+	__package__ = DIR.name
+#===============================================================================
+
+from .op_buffer import OpBuffer
+from .op_file import OpFile, writeOpFile
+
+
+class Checkpoint:
+	'''
+	Snapshot of a Writer's state (and optionally a KnitObject's), taken with `Writer.checkpoint` or `KnitObject.checkpoint`.  It can be used to roll the program back to that point (`restore`), or saved to disk and resumed from in a later run (`save`, then `Writer.loadCheckpoint` or `KnitObject.loadCheckpoint`), so a pipeline only has to regenerate the sections that changed.
+
+	Taking a checkpoint doesn't copy the op log: it just records how many operations there were (`op_ct`), along with copies of the rest of the state (whose size depends on the number of needles and carriers in use, not on the length of the program).
+
+	NOTE: checkpoint files are pickled, so only load ones you trust.
+
+	Parameters:
+	----------
+	* `op_ct` (int): number of operations in the Writer's op log at the checkpoint.
+	* `writer` (dict): the Writer's state (see `Writer.getState`).
+	* `knit_object` (dict, optional): the KnitObject's state (see `KnitObject.getState`). Defaults to `None`.
+	'''
+	VERSION = 1
+
+	def __init__(self, op_ct: int, writer: dict, knit_object: Optional[dict]=None):
+		self.op_ct = op_ct
+		self.writer = writer
+		self.knit_object = knit_object
+
+	def save(self, path: Union[str, Path], ops: OpBuffer) -> None:
+		'''
+		Saves the checkpoint to `path`, along with the operations leading up to it (from the op log `ops`, stored in the binary op format; see `OpFile`).
+
+		Parameters:
+		----------
+		* `path` (str or Path): file to save to.
+		* `ops` (OpBuffer): the op log the checkpoint was taken from.
+
+		Raises:
+		------
+		* ValueError: if some of the operations were flushed already (by a streaming Writer), or the op log was rolled back past the checkpoint.
+		'''
+		if len(ops) < self.op_ct: raise ValueError("The op log was rolled back past this checkpoint.")
+		buf = io.BytesIO()
+		writeOpFile(buf, [], ops)
+		#
+		with open(path, "wb") as f:
+			pickle.dump({"version": self.VERSION, "op_ct": self.op_ct, "writer": self.writer, "knit_object": self.knit_object, "ops": buf.getvalue()}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+	@classmethod
+	def load(cls, path: Union[str, Path]) -> Tuple["Checkpoint", OpBuffer]:
+		'''
+		Loads a checkpoint saved with `save`.
+
+		Returns:
+		-------
+		* (tuple): the checkpoint, and an op log holding the operations leading up to it.
+		'''
+		with open(path, "rb") as f:
+			data = pickle.load(f)
+		if not isinstance(data, dict) or data.get("version") != cls.VERSION: raise ValueError("Not a knitlib checkpoint (or one from an unsupported version).", path)
+		#
+		ops = OpFile(io.BytesIO(data["ops"])).toOpBuffer()
+		ops.truncate(data["op_ct"])
+		return cls(data["op_ct"], data["writer"], data["knit_object"]), ops
@@ -1,236 +1,387 @@
+from typing import Optional, Union, List, Tuple, Dict, Sequence, IO
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 import json
+import io
 
-import knitout
+#===============================================================================
+import sys
 
-k = knitout.Writer("1 2 3 4 5 6 7 8 9 10")
-k.addHeader("Machine","swgn2")
+## Standalone boilerplate before relative imports
+if not __package__: #remove #?
+	DIR = Path(__file__).resolve().parent
+	sys.path.insert(0, str(DIR.parent))
+	__package__ = DIR.name
+#===============================================================================
 
-
-import knitlib
-from knitlib import jersey, rib, garter, altKnitTuck, tuckGarter, seed, tuckStitch # need these for globals()[pat]
-
-from .helpers import c2cs
+from .knitlib_knitout import Writer
+from .op_file import OpFile, writeOpFile
+from .knitlib import altTuckCaston, wasteSection, drawThread, circular, dropFinish
+from .stitch_patterns import jersey, rib, garter, altKnitTuck, tuckGarter, seed, tuckStitch, interlock # need these for globals()[pat]
+from .helpers import c2cs, tuckPattern, toggleDirection
 
 
+default_carriers = "1 2 3 4 5 6 7 8 9 10"
 default_bed = "f"
 default_stitch_number = 63
 default_speed_number = 0
 
-def generate(swatches, out_fp, main_c="1", waste_c="2", draw_c="3", sort_by_width=True):
-	main_cs = c2cs(main_c)
-	waste_cs = c2cs(waste_c)
-	draw_cs = c2cs(draw_c)
-	directions = {main_cs: "-", waste_cs: "-", draw_cs: "-"}
-	left_n = 0
 
+def swatchInfo(swatches: List[list], sort_by_width: bool=True) -> List[list]:
+	'''
+	Fills in the defaults for each swatch (`[pat, [width, rows], gauge, extensions]`) and returns them in the order they'll be knitted in.
+	'''
 	pat_info = swatches.copy()
 
 	for pat in pat_info:
 		if len(pat) < 4: pat.append({})
-		
+
 		if (pat[1][0]-1) % pat[2] != 0: pat[1][0] += (pat[1][0]-1) % pat[2]
 
 	if sort_by_width: pat_info = sorted(pat_info, key=lambda x: x[1][0]) #sort by right needle
+	return pat_info
 
-	print(pat_info) #debug
 
-	k.stitchNumber(default_stitch_number)
-	k.speedNumber(default_speed_number)
+def parseSwatch(pat: str, gauge: int) -> Tuple[str, bool, int, str, Optional[str]]:
+	'''
+	Returns `(stitch pattern function name, tube, gauge, bed, sequence)` for a swatch's pattern string (e.g., `"rib_fb"` or `"jersey tube"`).
+	'''
+	if "tube" in pat:
+		tube = True
+		if gauge == 1 and not "jersey"in pat:
+			print(f"(@ pat: {pat}) gauge must be 2 for non-jersey tubes, changing it.")
+			gauge = 2
+	else: tube = False
 
-	for i, (pat, dims, gauge, extensions) in enumerate(pat_info):
-		if "tube" in pat:
-			tube = True
-			if gauge == 1 and not "jersey"in pat:
-				print(f"(@ pat: {pat}) gauge must be 2 for non-jersey tubes, changing it.")
-				gauge = 2
-		else: tube = False
+	pat = pat.replace("small", "").replace("large", "").strip() #get rid of these comments when calling as func
 
-		comment = f"begin swatch:{' half-gauge' if gauge == 2 else ''} {pat} ({dims[0]}x{dims[1]})"
+	if tube: pat = pat.replace("tube", "").strip()
 
-		pat = pat.replace("small", "").replace("large", "").strip() #get rid of these comments when calling as func
+	if pat == "tuck": pat = "altKnitTuck"
 
-		if len(extensions): comment += " " + json.dumps(extensions)
+	if "_" in pat:
+		if pat.startswith("jersey"):
+			pat, bed = pat.split("_")
+			sequence = None
+		else:
+			pat, sequence = pat.split("_")
+			bed = default_bed
+	else:
+		sequence = None
+		bed = default_bed
 
-		if i > 0 and gauge == 2:
-			for n in range(left_n, right_n+1):
-				if n % 2 != 0: k.xfer(f"f{n}", f"b{n}")
+	return pat, tube, gauge, bed, sequence
 
-		if tube: pat = pat.replace("tube", "").strip()
 
-		if pat == "tuck": pat = "altKnitTuck"
+def initialState(main_c: str="1", waste_c: str="2", draw_c: str="3") -> dict:
+	'''
+	State carried over from one swatch to the next (see `knitSwatch`), before the first swatch.
+	'''
+	return {"directions": {c2cs(main_c): "-", c2cs(waste_c): "-", c2cs(draw_c): "-"}, "right_n": None, "end_on_right": [], "rack": 0, "tube": False}
 
-		if "_" in pat:
-			if pat.startswith("jersey"):
-				pat, bed = pat.split("_")
-				sequence = None
-			else:
-				pat, sequence = pat.split("_")
-				if tube:
-					seq = [sequence, ""]
-					for char in sequence:
-						seq[1] += "f" if char == "b" else "b"
-				bed = default_bed
-		else:
-			sequence = None
-			bed = default_bed
 
-		if i == 0:
-			right_n = dims[0]-1
-			knitlib.altTuckCaston(k, right_n, left_n, waste_c, default_bed, gauge, inhook=True, releasehook=True)
-		elif dims[0] > right_n:
-			if directions[main_cs] == "+": k.miss("-", f"f{left_n}", main_c)
-			else: k.miss("+", f"f{dims[0]}", main_c)
-		elif not sort_by_width and dims[0] < right_n:
-			knitlib.wasteSection(k, left_n, right_n, caston_bed=(None if tube else "f"), waste_c=waste_c, draw_c=None, in_cs=[], gauge=gauge, end_on_right=end_on_right, initial=False, draw_middle=False, interlock_passes=10)
-			knitlib.interlock(k, start_n=right_n, end_n=dims[0]+1, passes=1, c=waste_c, gauge=gauge) # position carrier by new right needle
-			for n in range(dims[0]+1, right_n+1):
-				k.drop(f"f{n}")
-			for n in range(right_n, dims[0], -1):
-				k.drop(f"b{n}")
-		
-		right_n = dims[0]-1
+def knitSwatch(k, i: int, pat_info: List[list], state: dict, main_c: str="1", waste_c: str="2", draw_c: str="3", sort_by_width: bool=True) -> None:
+	'''
+	Adds swatch `i` of `pat_info` (see `swatchInfo`), along with the waste section/draw thread glue around it (and the caston, for the first swatch), updating `state` (see `initialState`) for the next swatch.
 
-		rows = dims[1]
+	The operations only depend on the swatch and `state` (not on the state of `k`), so the swatches can be built on separate Writers and stitched together afterwards (see `generate`).
+	'''
+	main_cs = c2cs(main_c)
+	draw_cs = c2cs(draw_c)
+	directions = state["directions"]
+	right_n = state["right_n"]
+	left_n = 0
 
-		if directions[main_cs] == "-":
-			start_n = right_n
-			end_n = left_n
-		else:
-			start_n = left_n
-			end_n = right_n
+	pat, dims, gauge, extensions = pat_info[i]
 
-		end_on_right = []
+	comment_pat = pat
+	pat, tube, gauge, bed, sequence = parseSwatch(pat, gauge)
 
-		if tube:
-			if directions[draw_cs] == "-": end_on_right = [draw_c]
-		else:
-			if directions[draw_cs] == "+":
-				end_on_right = [draw_c]
-				directions[draw_cs] = "-"
-			else: directions[draw_cs] = "+"
+	comment = f"begin swatch:{' half-gauge' if gauge == 2 else ''} {comment_pat} ({dims[0]}x{dims[1]})"
 
+	if len(extensions): comment += " " + json.dumps(extensions)
 
-		knitlib.wasteSection(k, left_n, right_n, caston_bed=(None if tube else "f"), waste_c=waste_c, draw_c=draw_c, in_cs=([draw_c] if i == 0 else []), gauge=gauge, end_on_right=end_on_right, initial=(i==0), draw_middle=False, interlock_passes=20)
+	if i > 0 and gauge == 2:
+		for n in range(left_n, right_n+1):
+			if n % 2 != 0: k.xfer(f"f{n}", f"b{n}")
 
-		if not tube and bed == "b":
-			for n in range(left_n, right_n+1):
-				k.xfer(f"f{n}", f"b{n}")
+	if tube and sequence is not None:
+		seq = [sequence, ""]
+		for char in sequence:
+			seq[1] += "f" if char == "b" else "b"
 
-		stitchPatFunc = globals()[pat]
+	if i == 0:
+		right_n = dims[0]-1
+		altTuckCaston(k, right_n, left_n, waste_c, default_bed, gauge, inhook=True, releasehook=True)
+	elif dims[0] > right_n:
+		if directions[main_cs] == "+": k.miss("-", f"f{left_n}", main_c)
+		else: k.miss("+", f"f{dims[0]}", main_c)
+	elif not sort_by_width and dims[0] < right_n:
+		wasteSection(k, left_n, right_n, caston_bed=(None if tube else "f"), waste_c=waste_c, draw_c=None, in_cs=[], gauge=gauge, end_on_right=state["end_on_right"], initial=False, draw_middle=False, interlock_passes=10)
+		interlock(k, start_n=right_n, end_n=dims[0]+1, passes=1, c=waste_c, gauge=gauge) # position carrier by new right needle
+		for n in range(dims[0]+1, right_n+1):
+			k.drop(f"f{n}")
+		for n in range(right_n, dims[0], -1):
+			k.drop(f"b{n}")
+
+	right_n = dims[0]-1
+
+	rows = dims[1]
+
+	if directions[main_cs] == "-":
+		start_n = right_n
+		end_n = left_n
+	else:
+		start_n = left_n
+		end_n = right_n
+
+	end_on_right = []
+
+	if tube:
+		if directions[draw_cs] == "-": end_on_right = [draw_c]
+	else:
+		if directions[draw_cs] == "+":
+			end_on_right = [draw_c]
+			directions[draw_cs] = "-"
+		else: directions[draw_cs] = "+"
+
+
+	wasteSection(k, left_n, right_n, caston_bed=(None if tube else "f"), waste_c=waste_c, draw_c=draw_c, in_cs=([draw_c] if i == 0 else []), gauge=gauge, end_on_right=end_on_right, initial=(i==0), draw_middle=False, interlock_passes=20)
+
+	if not tube and bed == "b":
+		for n in range(left_n, right_n+1):
+			k.xfer(f"f{n}", f"b{n}")
+
+	stitchPatFunc = globals()[pat]
+
+	func_inhook = False
+	if i == 0:
+		if pat == "interlock": func_inhook = True
+		else:
+			k.inhook(main_c)
+			if end_n > start_n: init_dir = "+"
+			else: init_dir = "-"
+			tuckPattern(k, first_n=start_n, direction=init_dir, c=main_c)
+
+	if tube:
+		bn_locs = {
+			"f": [n for n in range(left_n, right_n+1) if n % 2 == 0],
+			"b": [n for n in range(left_n, right_n+1) if n % 2 != 0]
+		}
+		func_args_f = {
+			"k": k,
+			"start_n": start_n,
+			"end_n": end_n,
+			"passes": 1,
+			"c": main_c,
+			"bed": "f",
+			"gauge": gauge,
+			"inhook": func_inhook, # we want to do this before adding the "begin swatch" flag #(i==0),
+			"releasehook": (i==0)
+		}
+
+		func_args_b = {
+			"k": k,
+			"start_n": end_n,
+			"end_n": start_n,
+			"passes": 1,
+			"c": main_c,
+			"bed": "b",
+			"gauge": gauge
+		}
+
+		if pat == "rib" or pat == "seed":
+			func_args_f["bn_locs"] = bn_locs
+			func_args_b["bn_locs"] = bn_locs
+
+		k.comment(comment)
+
+		if "stitchNumber" in extensions: k.stitchNumber(extensions["stitchNumber"])
+		if "speedNumber" in extensions: k.speedNumber(extensions["speedNumber"])
+
+		for r in range(rows):
+			func_args = func_args_f.copy()
+
+			if sequence is not None:
+				if "garter" in pat: func_args["sequence"] = sequence[r%len(sequence)]
+				else: func_args["sequence"] = seq[r%2]
+
+			stitchPatFunc(**func_args) #main_c dir doesn"t change since circular
+
+			func_args_f["inhook"], func_args_f["releasehook"] = False, False #ensure these are False after first row
+
+			func_args = func_args_b.copy()
+			if sequence is not None:
+				if "garter" in pat: func_args["sequence"] = sequence[r%len(sequence)]
+				else: func_args["sequence"] = seq[r%2]
+
+			stitchPatFunc(**func_args) #main_c dir doesn"t change since circular
+	else:
+		func_args = {
+			"k": k,
+			"start_n": start_n,
+			"end_n": end_n,
+			"passes": rows,
+			"c": main_c,
+			"bed": bed,
+			"gauge": gauge,
+			"inhook": func_inhook, # we want to do this before adding the "begin swatch" flag #(i==0),
+			"releasehook": (i==0)
+		}
+
+		if sequence is not None: func_args["sequence"] = sequence
+
+		if pat == "rib" or pat == "seed": func_args["bn_locs"] = {"f": list(range(left_n, right_n+1)), "b": []}
+
+		k.comment(comment)
+
+		if "stitchNumber" in extensions: k.stitchNumber(extensions["stitchNumber"])
+		if "speedNumber" in extensions: k.speedNumber(extensions["speedNumber"])
+
+		directions[main_cs] = stitchPatFunc(**func_args)
+
+	assert directions[main_cs] == "-" or directions[main_cs] == "+" #debug
 
-		func_inhook = False
-		if i == 0:
-			if pat == "interlock": func_inhook = True
-			else:
-				k.inhook(main_c)
-				if end_n > start_n: init_dir = "+"
-				else: init_dir = "-"
-				knitlib.tuckPattern(k, firstN=start_n, direction=init_dir, c=main_c)
+	k.stitchNumber(default_stitch_number)
+	k.speedNumber(default_speed_number)
 
-		if tube:
-			bn_locs = {
-				"f": [n for n in range(left_n, right_n+1) if n % 2 == 0],
-				"b": [n for n in range(left_n, right_n+1) if n % 2 != 0]
-			}
-			func_args_f = {
-				"k": k,
-				"start_n": start_n,
-				"end_n": end_n,
-				"passes": 1,
-				"c": main_c,
-				"bed": "f",
-				"gauge": gauge,
-				"inhook": func_inhook, # we want to do this before adding the "begin swatch" flag #(i==0),
-				"releasehook": (i==0)
-			}
-
-			func_args_b = {
-				"k": k,
-				"start_n": end_n,
-				"end_n": start_n,
-				"passes": 1,
-				"c": main_c,
-				"bed": "b",
-				"gauge": gauge
-			}
-
-			if pat == "rib" or pat == "seed":
-				func_args_f["bn_locs"] = bn_locs
-				func_args_b["bn_locs"] = bn_locs
-
-			k.comment(comment)
-
-			if "stitchNumber" in extensions: k.stitchNumber(extensions["stitchNumber"])
-			if "speedNumber" in extensions: k.speedNumber(extensions["speedNumber"])
-
-			for r in range(rows):
-				func_args = func_args_f.copy()
-				
-				if sequence is not None:
-					if "garter" in pat: func_args["sequence"] = sequence[r%len(sequence)]
-					else: func_args["sequence"] = seq[r%2]
-
-				stitchPatFunc(**func_args) #main_c dir doesn"t change since circular
-
-				func_args_f["inhook"], func_args_f["releasehook"] = False, False #ensure these are False after first row
-
-				func_args = func_args_b.copy()
-				if sequence is not None:
-					if "garter" in pat: func_args["sequence"] = sequence[r%len(sequence)]
-					else: func_args["sequence"] = seq[r%2]
-
-				stitchPatFunc(**func_args) #main_c dir doesn"t change since circular
-		else:
-			func_args = {
-				"k": k,
-				"start_n": start_n,
-				"end_n": end_n,
-				"passes": rows,
-				"c": main_c,
-				"bed": bed,
-				"gauge": gauge,
-				"inhook": func_inhook, # we want to do this before adding the "begin swatch" flag #(i==0),
-				"releasehook": (i==0)
-			}
+	if not tube and (pat == "rib" or "garter" in pat or bed == "b"): #transfer back to front bed for draw thread
+		for n in range(left_n, right_n+1):
+			k.xfer(f"b{n}", f"f{n}")
 
-			if sequence is not None: func_args["sequence"] = sequence
+	if i < len(pat_info)-1: miss_draw = pat_info[i+1][1][0]
+	else: miss_draw = None
 
-			if pat == "rib" or pat == "seed": func_args["bn_locs"] = {"f": list(range(left_n, right_n+1)), "b": []}
+	if tube:
+		draw_c_final_d = ("+" if directions[draw_cs] == "-" else "-")
+	else:
+		draw_c_final_d = directions[draw_cs]
+		directions[draw_cs] = ("+" if directions[draw_cs] == "-" else "-")
+	drawThread(k, left_n, right_n, draw_c, final_direction=draw_c_final_d, circular=tube, miss_draw=miss_draw, gauge=gauge)
 
-			k.comment(comment)
+	if i < len(pat_info)-1:
+		if tube:
+			circular(k, start_n=left_n, end_n=right_n, passes=6, c=waste_c, gauge=gauge)
+		else: jersey(k, left_n, right_n, 6, waste_c, bed="f", gauge=gauge)
+
+	state["right_n"] = right_n
+	state["end_on_right"] = end_on_right
+	state["rack"] = k.rack_value
+	state["tube"] = tube
+
+
+def predictState(i: int, pat_info: List[list], state: dict, main_c: str="1", draw_c: str="3") -> dict:
+	'''
+	Returns a guess at the state after swatch `i` (see `knitSwatch`), without knitting it, so the following swatch can be built in parallel: the stitch pattern functions return the direction the main carrier ends up in, which is guessed from the number of passes.  `generate` rebuilds any swatches that started from a wrong guess.
+	'''
+	main_cs, draw_cs = c2cs(main_c), c2cs(draw_c)
+	pat, dims, _, _ = pat_info[i]
+	tube = "tube" in pat
+	directions = dict(state["directions"])
+	#
+	if tube: end_on_right = [draw_c] if directions[draw_cs] == "-" else []
+	else:
+		end_on_right = [draw_c] if directions[draw_cs] == "+" else [] # (the draw carrier's direction is toggled twice per swatch, so ends up where it started)
+		if dims[1] % 2 != 0: directions[main_cs] = toggleDirection(directions[main_cs])
+	return {"directions": directions, "right_n": dims[0]-1, "end_on_right": end_on_right, "rack": 0, "tube": tube}
+
+
+def knitSegment(cs: str, i: int, pat_info: List[list], state: dict, main_c: str="1", waste_c: str="2", draw_c: str="3", sort_by_width: bool=True) -> Tuple[bytes, dict]:
+	'''
+	Builds swatch `i` on its own Writer (e.g., in a worker process; see `knitSwatch`), and returns its operations (in the binary op format; see `OpFile`) along with the state after it.
+	'''
+	k = Writer(cs, validate=False) # (the segment is checked when it's added to the program; see `Writer.addSegment`)
+	k.rack_value = state["rack"]
+	knitSwatch(k, i, pat_info, state, main_c, waste_c, draw_c, sort_by_width)
+	#
+	buf = io.BytesIO()
+	writeOpFile(buf, [], k.operations)
+	return buf.getvalue(), state
+
+
+def generate(swatches: List[list], out_fp: Optional[Union[str, Path, IO]], main_c: str="1", waste_c: str="2", draw_c: str="3", sort_by_width: bool=True, processes: Optional[int]=None, cs: str=default_carriers, validate: bool=True) -> Writer:
+	'''
+	Generates a single knitout program holding a set of swatches, separated by waste sections/draw threads.
+
+	With `processes` other than `1`, each swatch is built on its own Writer in a process pool (see `knitSegment`), and the segments are then stitched together in order on the program's Writer (see `Writer.addSegment`), which checks them against the carrier positions left by the previous swatch.  Since a swatch's operations depend on where the previous one left the main carrier, that's guessed upfront (see `predictState`), and any swatches that started from a wrong guess are rebuilt.  The program is the same either way.
+
+	Parameters:
+	----------
+	* `swatches` (list): a `[pat, [width, rows], gauge, extensions]` list for each swatch (`extensions` is optional; e.g., `{"stitchNumber": 70}`).
+	* `out_fp` (str, Path, or file-like, optional): where to write the program (see `Writer.write`); `None` to just return the Writer.
+	* `main_c`, `waste_c`, `draw_c` (str, optional): carriers for the swatches, waste sections, and draw threads. Defaults to `"1"`, `"2"`, and `"3"`.
+	* `sort_by_width` (bool, optional): whether to knit the swatches from narrowest to widest. Defaults to `True`.
+	* `processes` (int, optional): number of worker processes; `1` to build the swatches sequentially, in this process. Defaults to `None` (aka the number of CPUs).
+	* `cs` (str, optional): carriers available on the machine. Defaults to `"1 2 3 4 5 6 7 8 9 10"`.
+	* `validate` (bool, optional): see `Writer`. Defaults to `True`.
+
+	Returns:
+	-------
+	* (Writer): the program's Writer.
+	'''
+	pat_info = swatchInfo(swatches, sort_by_width)
 
-			if "stitchNumber" in extensions: k.stitchNumber(extensions["stitchNumber"])
-			if "speedNumber" in extensions: k.speedNumber(extensions["speedNumber"])
+	print(pat_info) #debug
 
-			directions[main_cs] = stitchPatFunc(**func_args)
+	k = Writer(cs, validate=validate)
+	k.addHeader("Machine","swgn2")
 
-		assert directions[main_cs] == "-" or directions[main_cs] == "+" #debug
+	k.stitchNumber(default_stitch_number)
+	k.speedNumber(default_speed_number)
 
-		k.stitchNumber(default_stitch_number)
-		k.speedNumber(default_speed_number)
+	state = initialState(main_c, waste_c, draw_c)
+	if processes == 1 or len(pat_info) < 2:
+		for i in range(len(pat_info)):
+			knitSwatch(k, i, pat_info, state, main_c, waste_c, draw_c, sort_by_width)
+	else:
+		with ProcessPoolExecutor(max_workers=processes) as pool:
+			start = 0
+			while start < len(pat_info): # (each round builds the rest of the swatches, from the first one whose starting state is known)
+				states = [state]
+				for i in range(start, len(pat_info)-1):
+					states.append(predictState(i, pat_info, states[-1], main_c, draw_c))
+				futures = [pool.submit(knitSegment, cs, i, pat_info, states[i-start], main_c, waste_c, draw_c, sort_by_width) for i in range(start, len(pat_info))]
+				#
+				for i, future in enumerate(futures, start):
+					if state != states[i-start]: # (wrong guess, so rebuild the rest)
+						for f in futures[i-start:]:
+							f.cancel()
+						start = i
+						break
+					ops, state = future.result()
+					k.addSegment(OpFile(io.BytesIO(ops)).toOpBuffer())
+				else: start = len(pat_info)
+
+	left_n, right_n = 0, state["right_n"]
+
+	if state["tube"]: back_needle_ranges=[left_n, right_n]
+	else: back_needle_ranges=[]
 
-		if not tube and (pat == "rib" or "garter" in pat or bed == "b"): #transfer back to front bed for draw thread
-			for n in range(left_n, right_n+1):
-				k.xfer(f"b{n}", f"f{n}")
+	dropFinish(k, front_needle_ranges=[left_n, right_n], back_needle_ranges=back_needle_ranges, out_carriers=[main_c, waste_c, draw_c], direction="+", border_c=waste_c, border_passes=20)
 
-		if i < len(pat_info)-1: miss_draw = pat_info[i+1][1][0]
-		else: miss_draw = None
+	if out_fp is not None: k.write(out_fp)
+	return k
 
-		if tube:
-			draw_c_final_d = ("+" if directions[draw_cs] == "-" else "-")
-		else:
-			draw_c_final_d = directions[draw_cs]
-			directions[draw_cs] = ("+" if directions[draw_cs] == "-" else "-")
-		knitlib.drawThread(k, left_n, right_n, draw_c, final_direction=draw_c_final_d, circular=tube, miss_draw=miss_draw, gauge=gauge)
 
-		if i < len(pat_info)-1:
-			if tube:
-				knitlib.circular(k, start_n=left_n, end_n=right_n, passes=6, c=waste_c, gauge=gauge)
-			else: knitlib.jersey(k, left_n, right_n, 6, waste_c, bed="f", gauge=gauge)
+def generateFile(args: Tuple[List[list], Union[str, Path]], kwargs: dict) -> str:
+	swatches, out_fp = args
+	generate(swatches, out_fp, processes=1, **kwargs)
+	return str(out_fp)
 
-	if tube: back_needle_ranges=[left_n, right_n]
-	else: back_needle_ranges=[]
 
-	knitlib.dropFinish(k, front_needle_ranges=[left_n, right_n], back_needle_ranges=back_needle_ranges, carriers=[main_c, waste_c, draw_c], direction="+", border_c=waste_c, border_passes=20)
+def generateFiles(jobs: Sequence[Tuple[List[list], Union[str, Path]]], processes: Optional[int]=None, **kwargs) -> List[str]:
+	'''
+	Generates a separate swatch program for each `(swatches, out_fp)` pair in `jobs`, in parallel (one program per worker process).
+
+	Parameters:
+	----------
+	* `jobs` (sequence): `(swatches, out_fp)` for each program (see `generate`).
+	* `processes` (int, optional): number of worker processes. Defaults to `None` (aka the number of CPUs).
+	* `kwargs`: passed on to `generate` (e.g., `main_c` or `sort_by_width`).
 
-	k.write(out_fp)
+	Returns:
+	-------
+	* (list of str): the files written, in the order of `jobs`.
+	'''
+	with ProcessPoolExecutor(max_workers=processes) as pool:
+		return list(pool.map(generateFile, jobs, [kwargs]*len(jobs)))
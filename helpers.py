@@ -1,10 +1,27 @@
-from typing import Union, Optional, Tuple, List, Dict
+from __future__ import annotations #so we don't have to worry about situations that would require forward declarations
+from typing import Union, Optional, Tuple, List, Dict, Callable
+from collections.abc import Mapping
+from functools import lru_cache
 
 import numpy as np
 import regex
 
 import cv2
 
+#===============================================================================
+import sys
+from pathlib import Path
+
+## Standalone boilerplate before relative imports
+if not __package__: #remove #?
+	DIR = Path(__file__).resolve().parent
+	sys.path.insert(0, str(DIR.parent))
+	__package__ = DIR.name
+#===============================================================================
+
+from .knitout_helpers import getBedNeedle
+from .op_buffer import Op, PassTemplate
+
 #===============================================================================
 #-------------------------------- MISC HELPERS ---------------------------------
 #===============================================================================
@@ -100,6 +117,224 @@ def bnValid(b: str, n: int, gauge: int=1, mod: Optional[int]=None) -> bool:
 #-------------------------------------------------------------------------------
 
 
+#===============================================================================
+#---------------------------------- PASS MASKS ---------------------------------
+#===============================================================================
+# vectorized versions of the per-needle checks used in stitch patterns, for building a whole pass at once (see `maskedPass`)
+def rangeArray(needle_range: range) -> np.ndarray:
+	return np.arange(needle_range.start, needle_range.stop, needle_range.step)
+
+
+def bnValidMask(b: str, needles: np.ndarray, gauge: int=1, mod: Optional[int]=None) -> np.ndarray:
+	'''
+	`bnValid(b, n, gauge, mod)` for each needle `n` in `needles`.
+	'''
+	if b == "f": m = 0 if mod is None else mod
+	elif b == "b": m = gauge//2 if mod is None else mod
+	else: raise ValueError(f"'{b}' is not a valid bed")
+	return needles % gauge == m
+
+
+def needleMask(needles: np.ndarray, ns: Union[List[int], Tuple[int], frozenset]) -> np.ndarray:
+	'''
+	`n in ns` for each needle `n` in `needles`.
+	'''
+	if not len(ns): return np.zeros(len(needles), dtype=bool)
+	elif isinstance(ns, (set, frozenset)): return np.isin(needles, np.fromiter(ns, dtype=np.int64, count=len(ns)))
+	else: return np.isin(needles, list(ns))
+
+
+def sequenceMask(needles: np.ndarray, sequence: str, char: str) -> np.ndarray:
+	'''
+	`sequence[n % len(sequence)] == char` for each needle `n` in `needles`.
+	'''
+	return (np.array(list(sequence)) == char)[needles % len(sequence)]
+
+
+def passTemplate(d: str, needles: np.ndarray, rules: List[Tuple[str, np.ndarray]], miss_bn: Optional[Tuple[str,int]]=None, tuck: bool=False) -> PassTemplate:
+	'''
+	Resolves a pass described by masks into a `PassTemplate` (which can then be added with `k.addTemplate`, or repeated with `k.replayPasses`/`replayPasses`).  For each needle in `needles` (in pass order), knits on the bed of the first rule in `rules` whose mask is `True` for that needle (if any), i.e., the vectorized version of an `if`/`elif` chain in a per-needle loop.
+
+	Parameters:
+	----------
+	* `d` (str): direction of the pass.
+	* `needles` (np.ndarray): needles in the pass, in pass order.
+	* `rules` (list): `(bed, mask)` tuples, in order of precedence, where `mask` is a boolean array aligned with `needles`.
+	* `miss_bn` (tuple, optional): `(bed, needle)` to miss on (in its place in the pass) if that needle isn't knitted, so the carrier ends up in the right spot. Defaults to `None`.
+	* `tuck` (bool, optional): whether to tuck rather than knit. Defaults to `False`.
+
+	Returns:
+	-------
+	* (PassTemplate): the pass.
+	'''
+	op = Op.TUCK if tuck else Op.KNIT
+	#
+	chosen = np.zeros(len(needles), dtype=np.int8) # index of the rule that applies +1 (0 if none)
+	for i, (_, mask) in enumerate(rules):
+		chosen[(chosen == 0) & mask] = i+1
+	knit_idxs = np.flatnonzero(chosen)
+	#
+	beds = [bed for bed, _ in rules]
+	if len(set(beds)) == 1: pass_beds = beds[0]
+	else: pass_beds = np.array(beds)[chosen[knit_idxs]-1]
+	#
+	miss_idx = -1
+	if miss_bn is not None:
+		idxs = np.flatnonzero(needles == miss_bn[1])
+		if len(idxs) and not chosen[idxs[0]]: miss_idx = idxs[0]
+	#
+	template = PassTemplate(d)
+	if miss_idx < 0: template.add(op, pass_beds, needles[knit_idxs])
+	else:
+		split = np.searchsorted(knit_idxs, miss_idx)
+		if isinstance(pass_beds, str): beds1, beds2 = pass_beds, pass_beds
+		else: beds1, beds2 = pass_beds[:split], pass_beds[split:]
+		template.add(op, beds1, needles[knit_idxs[:split]])
+		template.add(Op.MISS, miss_bn[0], [miss_bn[1]])
+		template.add(op, beds2, needles[knit_idxs[split:]])
+	return template
+
+
+def maskedPass(k, d: str, needles: np.ndarray, rules: List[Tuple[str, np.ndarray]], c: Union[str, List[str], Tuple[str]], miss_bn: Optional[Tuple[str,int]]=None, tuck: bool=False) -> None:
+	'''
+	Knits (or tucks) a pass described by masks (see `passTemplate`), with its knits (or tucks) added in bulk by the Writer.
+
+	Parameters:
+	----------
+	* `k` (class instance): instance of the knitout Writer class.
+	* `d` (str): direction of the pass.
+	* `needles` (np.ndarray): needles in the pass, in pass order.
+	* `rules` (list): `(bed, mask)` tuples, in order of precedence, where `mask` is a boolean array aligned with `needles`.
+	* `c` (str or list): carrier(s) to knit with.
+	* `miss_bn` (tuple, optional): `(bed, needle)` to miss on (in its place in the pass) if that needle isn't knitted, so the carrier ends up in the right spot. Defaults to `None`.
+	* `tuck` (bool, optional): whether to tuck rather than knit. Defaults to `False`.
+	'''
+	k.addTemplate(passTemplate(d, needles, rules, miss_bn=miss_bn, tuck=tuck), *c2cs(c))
+
+
+def replayPasses(k, templates: List[PassTemplate], passes: int, c: Union[str, List[str], Tuple[str]], after_pass: Optional[Tuple[int, Callable[[], None]]]=None) -> None:
+	'''
+	Knits `passes` passes, cycling through `templates` (so pass `p` is `templates[p % len(templates)]`), with the full cycles repeated in bulk by `k.replayPasses`.
+
+	Parameters:
+	----------
+	* `k` (class instance): instance of the knitout Writer class.
+	* `templates` (list): the distinct passes (see `passTemplate`), in order.
+	* `passes` (int): total number of passes to knit.
+	* `c` (str or list): carrier(s) to knit with.
+	* `after_pass` (tuple, optional): `(p, func)` to call `func()` right after pass `p` (e.g., to do a releasehook). Defaults to `None`.
+	'''
+	if passes < 1: return
+	cs = c2cs(c) # ensure tuple type
+	p = 0
+	if after_pass is not None and 0 <= after_pass[0] < passes:
+		for p in range(after_pass[0]+1):
+			k.addTemplate(templates[p % len(templates)], *cs)
+		after_pass[1]()
+		p = after_pass[0]+1
+	#
+	i = p % len(templates)
+	cycle = templates[i:]+templates[:i]
+	repeats, extra = divmod(passes-p, len(cycle))
+	k.replayPasses(cycle, repeats, *cs)
+	for template in cycle[:extra]:
+		k.addTemplate(template, *cs)
+
+
+def maskedXfers(k, needles: np.ndarray, rules: List[Tuple[str, str, np.ndarray]]) -> None:
+	'''
+	Transfers described by masks, with a single `k.xferBatch` call.  For each needle in `needles` (in order), transfers from the first bed to the second bed (same needle) of the first rule in `rules` whose mask is `True` for that needle (if any).
+
+	Parameters:
+	----------
+	* `k` (class instance): instance of the knitout Writer class.
+	* `needles` (np.ndarray): needles to consider, in the order the transfers should happen.
+	* `rules` (list): `(from_bed, to_bed, mask)` tuples, in order of precedence, where `mask` is a boolean array aligned with `needles`.
+	'''
+	chosen = np.zeros(len(needles), dtype=np.int8) # index of the rule that applies +1 (0 if none)
+	for i, (_, _, mask) in enumerate(rules):
+		chosen[(chosen == 0) & mask] = i+1
+	xfer_idxs = np.flatnonzero(chosen)
+	#
+	k.xferBatch([((rules[r][0], n), (rules[r][1], n)) for n, r in zip(needles[xfer_idxs].tolist(), (chosen[xfer_idxs]-1).tolist())])
+
+
+class NeedleLayout:
+	'''
+	Precomputed needle geometry for knitting from `left_n` to `right_n` in a given gauge: the needles in pass order for each direction, which of them are valid for each bed (`bnValid`), `n % m == r` masks, stitch pattern sequence masks, and the edge needles.  None of these change between passes, so each one is computed the first time it is requested and then reused (use `getNeedleLayout` to share layouts across calls with the same geometry as well).
+
+	Arrays returned by a layout are shared, so they are read-only.
+
+	Parameters:
+	----------
+	* `left_n` (int): first needle of a `+` pass (and last needle of a `-` pass).
+	* `right_n` (int): last needle of a `+` pass (and first needle of a `-` pass).
+	* `gauge` (int, optional): gauge to knit in. Defaults to `1`.
+	* `mod_f` (int, optional): `mod` value to pass to `bnValid` for the front bed. Defaults to `None`.
+	* `mod_b` (int, optional): `mod` value to pass to `bnValid` for the back bed. Defaults to `None`.
+	'''
+	def __init__(self, left_n: int, right_n: int, gauge: int=1, mod_f: Optional[int]=None, mod_b: Optional[int]=None):
+		self.left_n = left_n
+		self.right_n = right_n
+		self.gauge = gauge
+		self.mod = {"f": mod_f, "b": mod_b}
+		self._cache = {}
+	#
+	def _cached(self, key, func):
+		val = self._cache.get(key)
+		if val is None:
+			val = self._cache[key] = func()
+			if isinstance(val, np.ndarray): val.setflags(write=False)
+		return val
+	#
+	def needles(self, d: str) -> np.ndarray:
+		'''
+		Needles in pass order for direction `d` (same as `range(left_n, right_n+1)` for `+`, and `range(right_n, left_n-1, -1)` for `-`).
+		'''
+		if d == "+": return self._cached(d, lambda: np.arange(self.left_n, self.right_n+1))
+		elif d == "-": return self._cached(d, lambda: np.arange(self.right_n, self.left_n-1, -1))
+		else: raise ValueError(f"'{d}' is not a valid direction")
+	#
+	def validMask(self, bed: str, d: str) -> np.ndarray:
+		'''
+		`bnValid(bed, n, gauge, mod)` for each needle in `needles(d)`.
+		'''
+		return self._cached(("valid", bed, d), lambda: bnValidMask(bed, self.needles(d), self.gauge, mod=self.mod[bed]))
+	#
+	def valid(self, bed: str, d: str) -> np.ndarray:
+		'''
+		The valid needles for `bed`, in pass order for direction `d`.
+		'''
+		return self._cached(("valid_ns", bed, d), lambda: self.needles(d)[self.validMask(bed, d)])
+	#
+	def modMask(self, d: str, m: int, r: int) -> np.ndarray:
+		'''
+		`n % m == r` for each needle in `needles(d)`.
+		'''
+		return self._cached(("mod", d, m, r), lambda: self.needles(d) % m == r)
+	#
+	def sequenceMask(self, d: str, sequence: str, char: str) -> np.ndarray:
+		'''
+		`sequenceMask` for each needle in `needles(d)`.
+		'''
+		return self._cached(("seq", d, sequence, char), lambda: sequenceMask(self.needles(d), sequence, char))
+	#
+	def edges(self) -> Tuple[Optional[Tuple[str,int]], Optional[Tuple[str,int]]]:
+		'''
+		The left-most and right-most valid bed-needles on either bed (front bed first, if both are valid for a needle), as `(bed, needle)` tuples (or `None` if there are no valid needles); same as `bnEdges(left_n, right_n, gauge, return_type=tuple)`, for the layout's `mod` values.
+		'''
+		def findEdges():
+			ns = self.needles("+")
+			f, b = self.validMask("f", "+"), self.validMask("b", "+")
+			idxs = np.flatnonzero(f | b)
+			if not len(idxs): return (None, None)
+			return tuple(("f" if f[i] else "b", int(ns[i])) for i in (idxs[0], idxs[-1]))
+		#
+		return self._cached("edges", findEdges)
+
+#-------------------------------------------------------------------------------
+
+
 #===============================================================================
 #----------------------------------- GETTERS -----------------------------------
 #===============================================================================
@@ -118,15 +353,40 @@ def getNeedleRanges(start_n, end_n, return_direction=False):
 	else: return n_ranges
 
 
+def getNeedleLayout(left_n: int, right_n: int, gauge: int=1, mod: Optional[Dict[str,Optional[int]]]=None) -> NeedleLayout:
+	'''
+	Returns the (shared) `NeedleLayout` for knitting from `left_n` to `right_n` in `gauge`, creating it if it isn't cached yet.
+
+	Parameters:
+	----------
+	* `left_n` (int): first needle of a `+` pass.
+	* `right_n` (int): last needle of a `+` pass.
+	* `gauge` (int, optional): gauge to knit in. Defaults to `1`.
+	* `mod` (dict, optional): `{"f": mod_f, "b": mod_b}` values to pass to `bnValid` for each bed. Defaults to `None`.
+
+	Returns:
+	-------
+	* (NeedleLayout): the layout.  Its arrays are read-only, since they are shared.
+	'''
+	if mod is None: mod = {}
+	return _cachedNeedleLayout(left_n, right_n, gauge, mod.get("f"), mod.get("b"))
+
+
+@lru_cache(maxsize=256)
+def _cachedNeedleLayout(left_n: int, right_n: int, gauge: int, mod_f: Optional[int], mod_b: Optional[int]) -> NeedleLayout:
+	return NeedleLayout(left_n, right_n, gauge, mod_f, mod_b)
+
+
 def bnLast(start_n: int, end_n: int, gauge: int, bn_locs: Union[str, Dict[str,List[int]]]={"f": [], "b": []}, avoid_bns: Dict[str,List[int]]={"f": [], "b": []}, return_type: type=str) -> Union[str, tuple, list]:
 	bn = None
 	if end_n > start_n: step = 1
 	else: step = -1
 	#
-	if type(bn_locs) == str: _bn_locs = {bn_locs: [n for n in range(start_n, end_n+step, step) if bnValid(bn_locs, n, gauge) and n not in avoid_bns.get(bn_locs, [])]}
+	avoid_bns = toNeedleSet(avoid_bns)
+	if type(bn_locs) == str: _bn_locs = NeedleSet({bn_locs: [n for n in range(start_n, end_n+step, step) if bnValid(bn_locs, n, gauge) and n not in avoid_bns.get(bn_locs, [])]})
 	elif not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", [])):
-		_bn_locs = {"f": [n for n in range(start_n, end_n+step, step) if bnValid("f", n, gauge) and n not in avoid_bns.get("f", [])], "b": [n for n in range(start_n, end_n+step, step) if bnValid("b", n, gauge) and n not in avoid_bns.get("b", [])]}
-	else: _bn_locs = bn_locs.copy()
+		_bn_locs = NeedleSet({"f": [n for n in range(start_n, end_n+step, step) if bnValid("f", n, gauge) and n not in avoid_bns.get("f", [])], "b": [n for n in range(start_n, end_n+step, step) if bnValid("b", n, gauge) and n not in avoid_bns.get("b", [])]})
+	else: _bn_locs = toNeedleSet(bn_locs)
 	#
 	for n in range(end_n, start_n-step, -step):
 		if n in _bn_locs.get("f", []):
@@ -150,10 +410,11 @@ def bnLast(start_n: int, end_n: int, gauge: int, bn_locs: Union[str, Dict[str,Li
 def bnEdges(left_n: int, right_n: int, gauge: int, bn_locs: Union[str, Dict[str,List[int]]]={"f": [], "b": []}, avoid_bns: Dict[str,List[int]]={"f": [], "b": []}, return_type: type=str) -> Union[Tuple[str,str], Tuple[tuple,tuple], Tuple[list,list]]:
 	# edge_bns = []
 	#
-	if type(bn_locs) == str: _bn_locs = {bn_locs: [n for n in range(left_n, right_n+1) if bnValid(bn_locs, n, gauge) and n not in avoid_bns.get(bn_locs, [])]}
+	avoid_bns = toNeedleSet(avoid_bns)
+	if type(bn_locs) == str: _bn_locs = NeedleSet({bn_locs: [n for n in range(left_n, right_n+1) if bnValid(bn_locs, n, gauge) and n not in avoid_bns.get(bn_locs, [])]})
 	elif not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", [])):
-		_bn_locs = {"f": [n for n in range(left_n, right_n+1) if bnValid("f", n, gauge) and n not in avoid_bns.get("f", [])], "b": [n for n in range(left_n, right_n+1) if bnValid("b", n, gauge) and n not in avoid_bns.get("b", [])]}
-	else: _bn_locs = bn_locs.copy()
+		_bn_locs = NeedleSet({"f": [n for n in range(left_n, right_n+1) if bnValid("f", n, gauge) and n not in avoid_bns.get("f", [])], "b": [n for n in range(left_n, right_n+1) if bnValid("b", n, gauge) and n not in avoid_bns.get("b", [])]})
+	else: _bn_locs = toNeedleSet(bn_locs)
 	#
 	return (bnLast(right_n, left_n, gauge, _bn_locs, avoid_bns, return_type), bnLast(left_n, right_n, gauge, _bn_locs, avoid_bns, return_type))
 	"""
@@ -242,12 +503,8 @@ def modsHalveGauge(gauge: int, mod: Union[int, str]) -> Tuple[int,int]: # usage:
 
 
 def bnSplit(bns: Union[str,List[str],Tuple[str]]) -> Union[Tuple[str,int], List[Tuple[str,int]]]:
-	if type(bns) == str:
-		i = regex.search(r"[a-z]+", bns).end()
-		return (bns[:i], int(bns[i:]))
-	else:
-		split_idxs = [regex.search(r"[a-z]+", val).end() for val in bns]
-		return [(val[:i], int(val[i:])) for (val, i) in zip(bns, split_idxs)]
+	if type(bns) == str: return getBedNeedle(bns)
+	else: return [getBedNeedle(val) for val in bns]
 
 
 def bnSort(bn_list: List[str]=[], direction: str="+", unique: bool=True) -> List[Tuple[str,int]]:
@@ -387,6 +644,28 @@ def tuckPattern(k, first_n: int, direction: str, c: Optional[Union[str, List[str
 				elif n == first_n+1: k.miss("-", f"{bed}{n}", *cs)
 
 		
+def knitPassTemplate(start_n: int, end_n: int, bed: str="f", gauge: int=1, mod=None, avoid_bns: Dict[str,List[int]]={"f": [], "b": []}, init_direction: Optional[str]=None) -> PassTemplate:
+	'''
+	Resolves a plain knit pass (see `knitPass`) into a `PassTemplate`, e.g., to knit it repeatedly with `replayPasses`.
+
+	Returns:
+	-------
+	* (PassTemplate): the pass.
+	'''
+	if isinstance(avoid_bns, Mapping): avoid_bns = toNeedleSet(avoid_bns)
+	else: avoid_bns = NeedleSet(bnFormat(avoid_bns, gauge=gauge, return_type=list))
+	#
+	if end_n > start_n or init_direction == "+": #pass is pos
+		d = "+"
+		layout = getNeedleLayout(start_n, end_n, gauge, mod={bed: mod})
+	else: #pass is neg
+		d = "-"
+		layout = getNeedleLayout(end_n, start_n, gauge, mod={bed: mod})
+	#
+	needles = layout.needles(d)
+	return passTemplate(d, needles, [(bed, ~needleMask(needles, avoid_bns.get(bed, [])) & layout.validMask(bed, d))], miss_bn=(bed, end_n))
+
+
 def knitPass(k, start_n: int, end_n: int, c: Union[str, List[str], Tuple[str]], bed: str="f", gauge: int=1, mod=None, avoid_bns: Dict[str,List[int]]={"f": [], "b": []}, init_direction: Optional[str]=None) -> None:
 	'''
 	Plain knit a pass
@@ -399,20 +678,10 @@ def knitPass(k, start_n: int, end_n: int, c: Union[str, List[str], Tuple[str]],
 	* `c` (_type_): _description_.
 	* `bed` (str, optional): _description_. Defaults to `"f"`.
 	* `gauge` (int, optional): _description_. Defaults to `1`.
-	* `avoid_bns` (dict or list, optional): _description_. Defaults to `[]`.
+	* `avoid_bns` (dict, NeedleSet, or list, optional): needles to skip. Defaults to `{"f": [], "b": []}`.
 	* `init_direction` (str, optional): in *rare* cases (i.e., when only one needle is being knit), the initial pass direction might not be able to be inferred by the values of `start_n` and `end_n`.  In this case, one can specify the direction using this parameter (otherwise, can leave it as the default value, `None`, which indicates that the direction should/can be inferred).
 	'''
-	cs = c2cs(c) # ensure tuple type
-	avoid_bns_list = bnFormat(avoid_bns, gauge=gauge, return_type=list)
-	#
-	if end_n > start_n or init_direction == "+": #pass is pos
-		for n in range(start_n, end_n+1):
-			if f"{bed}{n}" not in avoid_bns_list and bnValid(bed, n, gauge, mod=mod): k.knit("+", f"{bed}{n}", *cs) 
-			elif n == end_n: k.miss("+", f"{bed}{n}", *cs)
-	else: #pass is neg
-		for n in range(start_n, end_n-1, -1):
-			if f"{bed}{n}" not in avoid_bns_list and bnValid(bed, n, gauge, mod=mod): k.knit("-", f"{bed}{n}", *cs)
-			elif n == end_n: k.miss("-", f"{bed}{n}", *cs)
+	k.addTemplate(knitPassTemplate(start_n, end_n, bed=bed, gauge=gauge, mod=mod, avoid_bns=avoid_bns, init_direction=init_direction), *c2cs(c))
 
 
 def rackedXfer(k, from_bn: Union[str, Tuple[str,int]], to_bn: Union[str, Tuple[str,int]], current_rack=None, reset_rack: bool=True) -> None:
@@ -525,4 +794,70 @@ class CarrierTracker:
 	def __copy__(self):
 		return CarrierTracker(self.cs, self._start_n, self._end_n)
 
+
+class NeedleSet(Mapping):
+	'''
+	Normalized, immutable version of the `{"f": [...], "b": [...]}` dicts used for `avoid_bns`, `bn_locs`, etc.: maps each bed to a `frozenset` of needles, so membership checks (`n in needle_set.get("f", [])`) are O(1), and whole sets can be combined cheaply (`|`, `&`, and `-`, bed by bed).  Since it is a read-only mapping, it can be passed anywhere the dict version is expected.
+
+	Parameters:
+	----------
+	* `needles` (dict, NeedleSet, or iterable, optional): `{bed: needles}` dict (where `needles` is an int or an iterable of ints), or an iterable of bed-needles (e.g., `["f1", ("b", 2)]`). Defaults to `None` (empty).
+	'''
+	def __init__(self, needles=None):
+		self._beds: Dict[str, frozenset] = {}
+		if needles is None: return
+		elif isinstance(needles, Mapping):
+			for b, ns in needles.items():
+				if isinstance(ns, (int, np.integer)): ns = (ns,)
+				self._beds[b] = frozenset(int(n) for n in ns)
+		else:
+			bed_ns = {}
+			for bn in needles:
+				b, n = bnSplit(bn) if isinstance(bn, str) else bn
+				bed_ns.setdefault(b, set()).add(int(n))
+			for b, ns in bed_ns.items():
+				self._beds[b] = frozenset(ns)
+	#
+	def __getitem__(self, bed: str) -> frozenset:
+		return self._beds[bed]
+	#
+	def __iter__(self):
+		return iter(self._beds)
+	#
+	def __len__(self) -> int:
+		return len(self._beds)
+	#
+	def __repr__(self) -> str:
+		return f"NeedleSet({ {b: sorted(ns) for b, ns in self._beds.items()} })"
+	#
+	def has(self, bed: str, n: int) -> bool:
+		return n in self._beds.get(bed, ())
+	#
+	def copy(self) -> NeedleSet:
+		return self # (immutable)
+	#
+	def _combine(self, other, op) -> NeedleSet:
+		other = toNeedleSet(other)
+		out = NeedleSet()
+		for b in list(self._beds)+[b for b in other if b not in self._beds]:
+			out._beds[b] = op(self._beds.get(b, frozenset()), other.get(b, frozenset()))
+		return out
+	#
+	def __or__(self, other) -> NeedleSet:
+		return self._combine(other, frozenset.union)
+	#
+	def __and__(self, other) -> NeedleSet:
+		return self._combine(other, frozenset.intersection)
+	#
+	def __sub__(self, other) -> NeedleSet:
+		return self._combine(other, frozenset.difference)
+
+
+def toNeedleSet(needles) -> Optional[NeedleSet]:
+	'''
+	Converts `needles` to a `NeedleSet` (see its constructor for supported values), returning it as-is if it already is one (or is `None`), so pattern functions can normalize their `avoid_bns`/`bn_locs` args once and pass them along cheaply.
+	'''
+	if needles is None or isinstance(needles, NeedleSet): return needles
+	else: return NeedleSet(needles)
+
 #-------------------------------------------------------------------------------
\ No newline at end of file
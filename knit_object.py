@@ -45,6 +45,8 @@ from .stitch_patterns import jersey, interlock, rib, garter, seed
 
 from .knitout_helpers import getBedNeedle, rackedXfer
 from .shaping import decEdge, decSchoolBus, decBindoff, incEdge, incSchoolBus, incCaston, incSplit
+from .knitlib_knitout import Writer
+from .checkpoint import Checkpoint
 
 
 class StitchPattern(Enum):
@@ -228,17 +230,86 @@ class KnitObject:
 			if key in self.settings.__dict__: self.settings.__dict__[key] = val
 			else: warnings.warn(f"'{key}' is not a valid knitout settings. skipping.")
 
+	def getState(self) -> dict:
+		'''
+		Returns a copy of the KnitObject's own state (see `checkpoint`): settings, carriers, `avoid_bns`, `twist_bns`, `split_bns`, row count, etc.
+		'''
+		return {
+			"gauge": self.gauge,
+			"mod": dict(self.mod),
+			"settings": dict(vars(self.settings)),
+			"active_carrier": self.active_carrier,
+			"draw_carrier": self.draw_carrier,
+			"waste_carrier": self.waste_carrier,
+			"avoid_bns": {bed: list(bns) for bed, bns in self.avoid_bns.items()},
+			"SPLIT_ON_EMPTY": self.SPLIT_ON_EMPTY,
+			"twist_bns": list(self.twist_bns),
+			"split_bns": list(self.split_bns),
+			"row_ct": self._row_ct,
+			"pat_args": dict(self.pat_args)
+		}
+
+	def setState(self, state: dict) -> None:
+		'''
+		Restores the KnitObject's own state from `getState` (leaving `state` untouched, so it can be restored again).
+		'''
+		self.gauge = state["gauge"]
+		self.mod = dict(state["mod"])
+		self.settings.__dict__.update(state["settings"])
+		self.active_carrier = state["active_carrier"]
+		self.draw_carrier = state["draw_carrier"]
+		self.waste_carrier = state["waste_carrier"]
+		self.avoid_bns = {bed: list(bns) for bed, bns in state["avoid_bns"].items()}
+		self.SPLIT_ON_EMPTY = state["SPLIT_ON_EMPTY"]
+		self.twist_bns = list(state["twist_bns"])
+		self.split_bns = list(state["split_bns"])
+		self._row_ct = state["row_ct"] # (not `row_ct`, so no comment is added)
+		self.pat_args = dict(state["pat_args"])
+
+	def checkpoint(self) -> Checkpoint:
+		'''
+		Takes a snapshot of the KnitObject's state, along with its Writer's (see `Writer.checkpoint`), that it can be rolled back to with `restore`, or saved to disk with `saveCheckpoint` and resumed from later with `loadCheckpoint` (e.g., so only the sections of a garment after the last unchanged one need to be regenerated).
+		'''
+		checkpoint = self.k.checkpoint()
+		checkpoint.knit_object = self.getState()
+		return checkpoint
+
+	def restore(self, checkpoint: Checkpoint) -> None:
+		'''
+		Rolls the KnitObject (and its Writer) back to `checkpoint` (see `Writer.restore`).
+		'''
+		assert checkpoint.knit_object is not None, "checkpoint was taken from a Writer, not a KnitObject"
+		self.k.restore(checkpoint)
+		self.setState(checkpoint.knit_object)
+
+	def saveCheckpoint(self, path: str, checkpoint: Optional[Checkpoint]=None) -> None:
+		'''
+		Saves a checkpoint (defaults to the current state), along with the operations leading up to it, to `path` (see `Writer.saveCheckpoint`).
+		'''
+		if checkpoint is None: checkpoint = self.checkpoint()
+		self.k.saveCheckpoint(path, checkpoint)
+
+	@classmethod
+	def loadCheckpoint(cls, path: str, **kwargs) -> KnitObject:
+		'''
+		Loads a checkpoint saved with `saveCheckpoint` into a new KnitObject (and Writer, created with `kwargs`; see `Writer.fromCheckpoint`).
+		'''
+		checkpoint, ops = Checkpoint.load(path)
+		assert checkpoint.knit_object is not None, "checkpoint was saved from a Writer, not a KnitObject"
+		#
+		obj = cls(Writer.fromCheckpoint(checkpoint, ops, **kwargs), gauge=checkpoint.knit_object["gauge"])
+		obj.setState(checkpoint.knit_object)
+		return obj
+
 	def getMinNeedle(self, bed=None) -> Union[int,float]:
-		try:
-			return self.k.bns.min(bed).needle
-		except AssertionError: #?
-			return float("inf")
+		n = self.k.bns.minNeedle(bed)
+		if n is None: return float("inf")
+		else: return n
 
 	def getMaxNeedle(self, bed=None) -> Union[int,float]:
-		try:
-			return self.k.bns.max(bed).needle
-		except AssertionError:
-			return float("-inf")
+		n = self.k.bns.maxNeedle(bed)
+		if n is None: return float("-inf")
+		else: return n
 	
 	def wasteSection(self, bed: Optional[str], needle_range: Union[Tuple[int,int], range], waste_c: Optional[str], draw_c: Optional[str], other_cs: Union[List[str], Tuple[str]]):
 		if waste_c is not None: self.waste_carrier = waste_c
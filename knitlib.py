@@ -4,7 +4,9 @@ sys.path.insert(0, os.getcwd())
 
 from typing import Union, Optional, Tuple, List, Dict
 
-from .helpers import tuckPattern, c2cs, flattenIter, modsHalveGauge, bnValid, toggleDirection, toggleBed, bnLast, getNeedleRanges, gauged
+import numpy as np
+
+from .helpers import tuckPattern, c2cs, flattenIter, modsHalveGauge, bnValid, toggleDirection, toggleBed, bnLast, getNeedleRanges, gauged, rangeArray, bnValidMask, needleMask, maskedPass, passTemplate, replayPasses, toNeedleSet, getNeedleLayout
 from .stitch_patterns import interlock
 
 
@@ -35,16 +37,14 @@ def drawThread(k, left_n, right_n, draw_c, final_direction="-", final_bed="f", c
 	if type(mod) != dict: mod = {final_bed: mod, init_bed: None} #new #check
 
 	def posDraw(bed="f", add_miss=True):
-		for n in range(left_n, right_n+1):
-			if bnValid(bed, n, gauge, mod=mod[bed]): k.knit("+", f"{bed}{n}", *cs)
-			elif n == right_n: k.miss("+", f"{bed}{n}", *cs)
+		layout = getNeedleLayout(left_n, right_n, gauge, mod={bed: mod[bed]})
+		maskedPass(k, "+", layout.needles("+"), [(bed, layout.validMask(bed, "+"))], cs, miss_bn=(bed, right_n))
 		if add_miss and miss_draw is not None: k.miss("+", f"{bed}{miss_draw}", *cs)
 
 
 	def negDraw(bed="f", add_miss=True):
-		for n in range(right_n, left_n-1, -1):
-			if bnValid(bed, n, gauge, mod=mod[bed]): k.knit("-", f"{bed}{n}", *cs)
-			elif n == left_n: k.miss("-", f"{bed}{n}", *cs)
+		layout = getNeedleLayout(left_n, right_n, gauge, mod={bed: mod[bed]})
+		maskedPass(k, "-", layout.needles("-"), [(bed, layout.validMask(bed, "-"))], cs, miss_bn=(bed, left_n))
 		if add_miss and miss_draw is not None: k.miss("-", f"{bed}{miss_draw}", *cs)
 
 	k.comment("begin draw thread")
@@ -68,18 +68,14 @@ def inlay(k, start_n, end_n, c, bed, gauge=2, mod=None): # mod={"f": None, "b":
 	#
 	n_ranges, d = getNeedleRanges(start_n, end_n, return_direction=True)
 	d2 = toggleDirection(d)
+	layout = getNeedleLayout(min(start_n, end_n), max(start_n, end_n), gauge, mod={bed: mod})
 	#
-	do_xfer = True
-	for n in n_ranges[d2]:
-		if bnValid(bed, n, gauge, mod=mod): # if bnValid(bed, n, gauge, mod=mod[bed]) and not bnValid(bed2, n, gauge, mod=mod[bed2]):
-			if do_xfer:
-				k.xfer(f"{bed}{n}", f"{bed2}{n}")
-				do_xfer = False
-			else: do_xfer = True
+	xfer_ns = layout.valid(bed, d2)[::2].tolist() # every other valid needle (in `d2` order) # if bnValid(bed, n, gauge, mod=mod[bed]) and not bnValid(bed2, n, gauge, mod=mod[bed2]):
+	k.xferBatch([((bed, n), (bed2, n)) for n in xfer_ns])
 	#
 	do_tuck = True
-	for n in n_ranges[d]:
-		if not bnValid(bed, n, gauge, mod=mod): # if not bnValid(bed, n, gauge, mod=mod[bed]):
+	for n, valid in zip(n_ranges[d], layout.validMask(bed, d).tolist()):
+		if not valid: # if not bnValid(bed, n, gauge, mod=mod[bed]):
 			if do_tuck:
 				k.tuck(d, f"{bed}{n}", *cs)
 				do_tuck = False
@@ -88,21 +84,9 @@ def inlay(k, start_n, end_n, c, bed, gauge=2, mod=None): # mod={"f": None, "b":
 				do_tuck = True
 		else: k.miss(d, f"{bed}{n}", *cs)
 	#
-	do_xfer = True
-	for n in n_ranges[d2]:
-		if bnValid(bed, n, gauge, mod=mod): # if bnValid(bed, n, gauge, mod=mod[bed]) and not bnValid(bed2, n, gauge, mod=mod[bed2]):
-			if do_xfer:
-				k.xfer(f"{bed2}{n}", f"{bed}{n}")
-				do_xfer = False
-			else: do_xfer = True
+	k.xferBatch([((bed2, n), (bed, n)) for n in xfer_ns])
 	#
-	do_tuck = True
-	for n in n_ranges[d]:
-		if not bnValid(bed, n, gauge, mod=mod): # if not bnValid(bed, n, gauge, mod=mod[bed]):
-			if do_tuck:
-				k.drop(f"{bed}{n}")
-				do_tuck = False
-			else: do_tuck = True
+	k.dropBatch([(bed, n) for n in layout.needles(d)[~layout.validMask(bed, d)][::2].tolist()]) # every other needle we tucked on
 
 
 #--- FUNCTION FOR DOING THE MAIN KNITTING OF CIRCULAR, OPEN TUBES ---
@@ -125,14 +109,19 @@ def circular(k, start_n, end_n, passes, c, gauge=1, mod={"f": None, "b": None})
 
 	bed = "f"
 
-	for p in range(passes):
-		for n in n_ranges[d]:
-			if bnValid(bed, n, gauge, mod=mod[bed]): k.knit(d, f"{bed}{n}", *cs)
-			elif n == n_ranges[d][-1]: k.miss(d, f"{bed}{n}", *cs)
+	# the passes repeat every two (front, then back), so only build those once and then replay them for the rest
+	templates = []
+	for p in range(min(passes, 2)):
+		layout = getNeedleLayout(min(start_n, end_n), max(start_n, end_n), gauge, mod={bed: mod[bed]})
+		templates.append(passTemplate(d, layout.needles(d), [(bed, layout.validMask(bed, d))], miss_bn=(bed, n_ranges[d][-1])))
+		k.addTemplate(templates[-1], *cs)
 		#
 		d = toggleDirection(d)
 		bed = toggleBed(bed)
 
+	replayPasses(k, templates, passes-len(templates), cs)
+
+	if passes > 2 and passes % 2: d = toggleDirection(d) # (the loop above only toggled it `min(passes, 2)` times)
 	return d
 
 
@@ -344,14 +333,12 @@ def wasteSection(k, left_n, right_n, caston_bed=None, waste_c="1", draw_c="2", i
 					n_range = range(left_n, right_n+1)
 					if draw_init_d == "-": n_range = n_range[::-1] #reverse it reversed(n_range)
 					cs = c2cs(draw_c)
-					for n in n_range:
-						if n % 2 == 0: k.tuck(draw_init_d, f"{bed2}{n}", *cs)
-						elif n == n_range[-1]: k.miss(draw_init_d, f"{bed2}{n}", *cs)
+					ns = rangeArray(n_range)
+					maskedPass(k, draw_init_d, ns, [(bed2, ns % 2 == 0)], cs, miss_bn=(bed2, n_range[-1]), tuck=True)
 					
 					# this is essentially circular
 					drawThread(k, left_n, right_n, draw_c, final_direction=("-" if draw_final_d == "+" else "+"), final_bed=bed, circular=False, miss_draw=miss_draw, gauge=gauge)
-					for n in n_range:
-						if n % 2 == 0: k.drop(f"{bed2}{n}")
+					k.dropBatch([(bed2, n) for n in n_range if n % 2 == 0])
 					drawThread(k, left_n, right_n, draw_c, final_direction=draw_final_d, final_bed=bed2, circular=False, miss_draw=miss_draw, gauge=gauge)
 				else: drawThread(k, left_n, right_n, draw_c, final_direction=draw_final_d, circular=True, miss_draw=miss_draw, gauge=gauge) 
 
@@ -380,7 +367,7 @@ def wasteSection(k, left_n, right_n, caston_bed=None, waste_c="1", draw_c="2", i
 			interlock(k, left_n, right_n, interlock_passes-24, waste_c, gauge=gauge)
 		else:
 			if machine.lower() == "swgn2" and initial:
-				interlock(k, right_n, left_n, 1.5, waste_c, gauge, releasehook=(machine.lower() == "swgn2" and waste_c in in_cs))
+				interlock(k, right_n, left_n, 2, waste_c, gauge=gauge, releasehook=(machine.lower() == "swgn2" and waste_c in in_cs))
 				interlock_passes -= 2
 			interlock(k, left_n, right_n, interlock_passes, waste_c, gauge=gauge)
 
@@ -394,14 +381,12 @@ def wasteSection(k, left_n, right_n, caston_bed=None, waste_c="1", draw_c="2", i
 					n_range = range(left_n, right_n+1)
 					if draw_init_d == "-": n_range = n_range[::-1] #reverse it #reversed(n_range)
 					cs = c2cs(draw_c)
-					for n in n_range:
-						if n % 2 == 0: k.tuck(draw_init_d, f"{bed2}{n}", *cs)
-						elif n == n_range[-1]: k.miss(draw_init_d, f"{bed2}{n}", *cs)
+					ns = rangeArray(n_range)
+					maskedPass(k, draw_init_d, ns, [(bed2, ns % 2 == 0)], cs, miss_bn=(bed2, n_range[-1]), tuck=True)
 					
 					# this is essentially circular
 					drawThread(k, left_n, right_n, draw_c, final_direction=("-" if draw_final_d == "+" else "+"), final_bed=bed, circular=False, miss_draw=miss_draw, gauge=gauge)
-					for n in n_range:
-						if n % 2 == 0: k.drop(f"{bed2}{n}")
+					k.dropBatch([(bed2, n) for n in n_range if n % 2 == 0])
 					drawThread(k, left_n, right_n, draw_c, final_direction=draw_final_d, final_bed=bed2, circular=False, miss_draw=miss_draw, gauge=gauge)
 				else: drawThread(k, left_n, right_n, draw_c, final_direction=draw_final_d, circular=True, miss_draw=miss_draw, gauge=gauge) #^
 
@@ -425,8 +410,8 @@ def wasteSection(k, left_n, right_n, caston_bed=None, waste_c="1", draw_c="2", i
 		if miss_waste is not None: k.miss("-", f"{bed}{miss_waste}", *c2cs(waste_c))
 
 	if closed_caston and not draw_middle:
-		for n in range(left_n, right_n+1):
-			if bnValid(bed2, n, gauge): k.drop(f"{bed2}{n}")
+		ns = np.arange(left_n, right_n+1)
+		k.dropBatch([(bed2, n) for n in ns[bnValidMask(bed2, ns, gauge)].tolist()])
 
 	if not draw_middle and draw_c is not None:
 		if machine.lower() == "swgn2" and draw_c in in_cs:
@@ -438,9 +423,8 @@ def wasteSection(k, left_n, right_n, caston_bed=None, waste_c="1", draw_c="2", i
 			if draw_init_d == "-": n_range = n_range[::-1] # reverse it #reversed(n_range)
 
 			cs = c2cs(draw_c)
-			for n in n_range:
-				if n % 2 == 0: k.tuck(draw_init_d, f"{bed2}{n}", *cs)
-				elif n == n_range[-1]: k.miss(draw_init_d, f"{bed2}{n}", *cs)
+			ns = rangeArray(n_range)
+			maskedPass(k, draw_init_d, ns, [(bed2, ns % 2 == 0)], cs, miss_bn=(bed2, n_range[-1]), tuck=True)
 
 			if closed_caston: draw_final_d1 = draw_final_d
 			else: draw_final_d1 = ("-" if draw_final_d == "+" else "+")
@@ -449,12 +433,10 @@ def wasteSection(k, left_n, right_n, caston_bed=None, waste_c="1", draw_c="2", i
 
 			if not closed_caston: # aka circular
 				# this + above drawThread call is essentially circular
-				for n in n_range:
-					if n % 2 == 0: k.drop(f"{bed2}{n}")
+				k.dropBatch([(bed2, n) for n in n_range if n % 2 == 0])
 				drawThread(k, left_n, right_n, draw_c, final_direction=draw_final_d, final_bed=bed2, circular=False, miss_draw=miss_draw, gauge=gauge)
 			else:
-				for n in n_range:
-					if n % 2 == 0: k.drop(f"{bed2}{n}")
+				k.dropBatch([(bed2, n) for n in n_range if n % 2 == 0])
 		else: drawThread(k, left_n, right_n, draw_c, final_direction=draw_final_d, circular=(not closed_caston), miss_draw=miss_draw, gauge=gauge)
 
 		if machine.lower() == "swgn2" and draw_c in in_cs:
@@ -1053,6 +1035,8 @@ def dropFinish(k, front_needle_ranges=[], back_needle_ranges=[], out_carriers=[]
 
 	k.comment("begin drop finish")
 
+	avoid_bns = toNeedleSet(avoid_bns)
+
 	out_cs = list(out_carriers.copy()) #ensure list so we can remove
 
 	if machine.lower() == "kniterate": out_func = k.outcarrier
@@ -1113,13 +1097,13 @@ def dropFinish(k, front_needle_ranges=[], back_needle_ranges=[], out_carriers=[]
 	def dropOnBed(needle_ranges, bed): #v
 		if type(needle_ranges[0]) == int: #just one range (one section)
 			if roll_out and machine.lower() == "kniterate" and (needle_ranges is back_needle_ranges or not len(back_needle_ranges)): k.addRollerAdvance(2000) #TODO: determine what max roller advance is
-			for n in range(needle_ranges[0], needle_ranges[1]+1):
-				if bnValid(bed, n, gauge, mod=mod[bed]) and n not in avoid_bns[bed]: k.drop(f"{bed}{n}")
+			ns = np.arange(needle_ranges[0], needle_ranges[1]+1)
+			k.dropBatch([(bed, n) for n in ns[bnValidMask(bed, ns, gauge, mod=mod[bed]) & ~needleMask(ns, avoid_bns[bed])].tolist()])
 		else: #multiple ranges (multiple sections, likely shortrowing)
 			for nr in needle_ranges:
 				if roll_out and machine.lower() == "kniterate" and needle_ranges.index(nr) == len(needle_ranges)-1 and (needle_ranges is back_needle_ranges or not len(back_needle_ranges)): k.addRollerAdvance(2000)
-				for n in range(nr[0], nr[1]+1):
-					if bnValid(bed, n, gauge, mod=mod[bed]) and n not in avoid_bns[bed]: k.drop(f"{bed}{n}")
+				ns = np.arange(nr[0], nr[1]+1)
+				k.dropBatch([(bed, n) for n in ns[bnValidMask(bed, ns, gauge, mod=mod[bed]) & ~needleMask(ns, avoid_bns[bed])].tolist()])
 	#--- end dropOnBed func ---#^
 
 	if len(front_needle_ranges): dropOnBed(front_needle_ranges, "f")
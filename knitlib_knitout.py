@@ -1,16 +1,15 @@
 import knitout
 from knitout import shiftDirection #check
 
-from typing import Union, Tuple, List
-import re
+from typing import Union, Optional, Tuple, List, Sequence, IO
 import warnings
 from enum import Enum
 
-from queue import Queue
-from threading import Thread
+import numpy as np
 
 #===============================================================================
 import sys
+import os
 from pathlib import Path
 
 ## Standalone boilerplate before relative imports
@@ -20,9 +19,16 @@ if not __package__: #remove #?
     __package__ = DIR.name
 #===============================================================================
 
-from .knitout_helpers import IncList, Carrier, InactiveCarrierWarning, UnalignedNeedlesWarning, FloatWarning, StackedLoopWarning, HeldLoopWarning, UnstableLoopWarning, EmptyXferWarning
+from .knitout_helpers import IncList, Carrier, VALID_BEDS, getBedNeedle, InactiveCarrierWarning, UnalignedNeedlesWarning, FloatWarning, StackedLoopWarning, HeldLoopWarning, UnstableLoopWarning, EmptyXferWarning
 
 from .bed_needle import BedNeedleList
+from .op_buffer import OpBuffer, Op, PassTemplate, OP_NAMES, DIRECTIONS, DIRECTION_IDS, BEDS, BED_IDS
+from .validation import Validator
+from .op_file import OpFile, outputFormat, openOutput, writeKnitout, writeOpFile
+from .knitout_reader import KnitoutReader, headerCarriers, parseArg, splitCarriers
+from .checkpoint import Checkpoint
+from .profiling import Profiler, DEFAULT_MODULES
+from .optimize import optimizeOps
     
 
 class KnitoutException(Enum):
@@ -45,8 +51,6 @@ class KnitoutException(Enum):
 # # warnings.warn("", StackedLoopWarning)
 
 
-reg = re.compile(r"^([f|b]s?)(-?\d+)?$") #TODO: decide if should keep as compile #?
-
 def shiftCarrierSet(args, carriers):
     if len(args) == 0:
         raise AssertionError("No carriers specified")
@@ -65,17 +69,17 @@ def shiftBedNeedle(args):
     needle = None
     #
     if isinstance(bn, str):
-        m = reg.match(bn)
-        if m is None:
-            raise ValueError("Invalid BedNeedle string.", bn)
-        else:
-            bed = m.group(1)
-            if m.group(2) is not None:
-                needle = int(m.group(2))
-            elif isinstance(args[0], int) or args[0].isdigit():
+        if bn in VALID_BEDS:
+            bed = bn
+            if isinstance(args[0], int) or args[0].isdigit():
                 needle = int(args.pop(0))
             else:
-                raise ValueError("Invalid needle. Must be numeric.", m.group(2))
+                raise ValueError("Invalid needle. Must be numeric.", args[0])
+        else:
+            try:
+                return getBedNeedle(bn)
+            except ValueError:
+                raise ValueError("Invalid BedNeedle string.", bn)
     elif isinstance(bn, (list, tuple)):
         if len(bn) != 2:
             raise ValueError("Bed and Needle need to be supplied.")
@@ -90,24 +94,67 @@ def shiftBedNeedle(args):
     else:
         raise AssertionError("Invalid BedNeedle type")
     #
-    return bed+str(needle), (bed, needle)
+    return bed, needle
 
 
-def ValidationThread(q):
-    while True:
-        (f, ln, args) = q.get()
-        if f is None: break
-        else: f(*args)
-        # if f(*args): print(f"@ line {ln+1}") #debug
+def shiftBedNeedleUnchecked(args, i):
+    '''
+    Unchecked version of `shiftBedNeedle` (for Writers with validation turned off), that reads the bed-needle starting at `args[i]` rather than popping it.
+
+    Returns:
+    -------
+    * (Tuple[str, int, int]): bed, needle, and index of the next argument.
+    '''
+    bn = args[i]
+    if isinstance(bn, str):
+        if bn in BED_IDS: return bn, int(args[i+1]), i+2
+        else: return (*getBedNeedle(bn), i+1)
+    else: return bn[0], int(bn[1]), i+1
+
+
+def splitBns(bns) -> Tuple[List[str], np.ndarray]:
+    '''
+    Parses a batch of bed-needles (each either a string, e.g. `"f10"`, or a `(bed, needle)` tuple) into a list of beds and an array of needles.
+    '''
+    beds, needles = [], []
+    for bn in bns:
+        if isinstance(bn, str):
+            try:
+                bed, needle = getBedNeedle(bn)
+            except ValueError:
+                raise ValueError("Invalid BedNeedle string.", bn)
+        else:
+            bed, needle = bn[0], int(bn[1])
+            if bed not in VALID_BEDS: raise ValueError("Invalid bed type. Must be 'f' 'b' 'fs' 'bs'.", bed)
+        beds.append(bed)
+        needles.append(needle)
+    return beds, np.array(needles, dtype=np.int64)
+
 
 class Writer(knitout.Writer):
-    def __init__(self, cs):
+    '''
+    knitout Writer with validation and bed/carrier state tracking.
+
+    Carrier checks are run as each operation is emitted; the bed checks (unaligned needles, empty xfers, held loops, stacked loops) are deferred and run in batches over the op log by a `Validator`, when `validate()` is called, when a streaming Writer flushes a chunk, and at `write()` time.
+
+    With `validate=False`, the Writer takes a fast path for `knit`, `tuck`, `miss`, `xfer`, `split`, and `drop` that skips argument checking, carrier checks/position tracking, and bed state tracking (`bns` and `row_ct` stay empty), while still producing the same bytes.  This is meant for generating programs from already-validated code; anything that relies on the Writer's bed or carrier positions (e.g., `KnitObject`) needs `validate=True`.  The deferred bed checks can still be run on demand with `validate()` (for non-streaming Writers).
+
+    Parameters:
+    ----------
+    * `cs` (str): space-separated carriers available on the machine.
+    * `stream` (str, Path, or file-like, optional): if passed, the Writer streams its operations out in chunks of `buffer_size` lines as they are emitted (rather than holding the whole program in memory), and `write()` will output the program here by default. Defaults to `None` (aka keep everything in memory until `write()`).
+    * `buffer_size` (int, optional): number of lines to buffer in memory before flushing (only applicable if `stream` is passed). Defaults to `10000`.
+    * `validate` (bool, optional): whether to check operations and track bed/carrier state as they are emitted. Defaults to `True`.
+    '''
+    def __init__(self, cs, stream: Optional[Union[str, Path, IO]]=None, buffer_size: int=10000, validate: bool=True):
         super().__init__(cs)
         #
+        self.validation_enabled = validate
         self.line_number = 0
-        # array of operations, strings
-        self.operations = IncList()
-        self.operations.increment = self.updateLineNumber
+        self.stream = stream
+        self.buffer_size = buffer_size
+        # compact buffer of operations (rendered to strings on write)
+        self.operations = self.newOperations()
         #
         headers = self.headers
         self.headers = IncList() #self.headers)
@@ -127,10 +174,7 @@ class Writer(knitout.Writer):
 
         self.setExceptionHandling(enabled_warnings=(KnitoutException.FLOAT, KnitoutException.STACKED_LOOP, KnitoutException.UNSTABLE_LOOP, KnitoutException.EMPTY_XFER), enabled_errors=(KnitoutException.HELD_LOOP, KnitoutException.INACTIVE_CARRIER, KnitoutException.UNALIGNED_NEEDLES)) #default (can be changed by calling it again with different values) (NOTE: any KnitoutExceptions not included in `enabled_warnings` or `enabled_errors` are ignored by default)
         #
-        self.q = Queue()
-        self.thread = Thread(target=ValidationThread, args=(self.q,), daemon=True)
-        # self.thread.daemon = True
-        self.thread.start()
+        self.validator = Validator(self)
 
     @property
     def row_ct(self):
@@ -138,6 +182,33 @@ class Writer(knitout.Writer):
     
     def updateLineNumber(self, n):
         self.line_number += n
+
+    def newOperations(self) -> OpBuffer:
+        if self.stream is None: operations = OpBuffer()
+        else:
+            if isinstance(self.stream, (str, Path)): spool_dir = os.path.dirname(os.path.abspath(self.stream)) # spool next to the output file
+            else: spool_dir = None
+            operations = OpBuffer(buffer_size=self.buffer_size, dir=spool_dir)
+        #
+        operations.increment = self.updateLineNumber
+        if self.validation_enabled: operations.beforeFlush = self.validate
+        return operations
+
+    def validate(self, final: bool=False) -> int:
+        '''
+        Runs the deferred bed checks over any operations that haven't been validated yet, issuing warnings (or raising errors) reported against the line number of the offending operation.
+
+        Parameters:
+        ----------
+        * `final` (bool, optional): whether the program is finished, in which case any needles still holding loops are checked for held loops too. Defaults to `False`.
+
+        Returns:
+        -------
+        * (int): number of problems found.
+        '''
+        ct = self.validator.run(self.operations, header_ct=self.line_number-len(self.operations))
+        if final: ct += self.validator.checkHeldLoops(self.line_number)
+        return ct
     
     def updateCarrier(self, c, op, direction, bed, needle): #*
         w = InactiveCarrierWarning.check(self, warnings, self.carrier_map, c, op=op, line_number=self.line_number)
@@ -230,10 +301,9 @@ class Writer(knitout.Writer):
         assert not self.hook_active, f"Can't inhook carrier(s) '{cs}' since the hook is still holding another yarn." #TODO: improve/make this a KnitoutException
         self.hook_active = True
         #
-        self.operations.append('inhook ' + cs)
+        self.operations.addOp(Op.INHOOK, cs=self.operations.intern(cs))
         #
         for c in carriers:
-            # self.q.put( (self.addCarrier, self.line_number, (c, "inhook")) ) #*
             self.addCarrier(c, "inhook") #new
     
     def incarrier(self, *args): #NOTE: can't name func `in` since that is a keyword in python
@@ -241,10 +311,9 @@ class Writer(knitout.Writer):
         argl = list(args)
         cs, carriers = shiftCarrierSet(argl, self.carriers)
         #
-        self.operations.append('in ' + cs)
+        self.operations.addOp(Op.IN, cs=self.operations.intern(cs))
         #
         for c in carriers:
-            # self.q.put( (self.addCarrier, self.line_number, (c, "in")) ) #*
             self.addCarrier(c, "in") #new
 
     def outhook(self, *args):
@@ -253,20 +322,18 @@ class Writer(knitout.Writer):
         #
         assert not self.hook_active, f"Can't outhook carrier(s) '{cs}' since the hook is still holding another yarn." #TODO: improve/make this a KnitoutException #TODO: check if this is truly an invalid thing to do
         #
-        self.operations.append('outhook ' + cs)
+        self.operations.addOp(Op.OUTHOOK, cs=self.operations.intern(cs))
         #
         for c in carriers:
-            # self.q.put( (self.removeCarrier, self.line_number, (c, "outhook")) ) #*
             self.removeCarrier(c, "outhook") #new
 
     def outcarrier(self, *args):
         argl = list(args)
         cs, carriers = shiftCarrierSet(argl, self.carriers)
         #
-        self.operations.append('out ' + cs)
+        self.operations.addOp(Op.OUT, cs=self.operations.intern(cs))
         #
         for c in carriers:
-            # self.q.put( (self.removeCarrier, self.line_number, (c, "out")) ) #*
             self.removeCarrier(c, "out") #new
 
     def releasehook(self, *args):
@@ -276,155 +343,602 @@ class Writer(knitout.Writer):
         assert self.hook_active, f"Can't releasehook carrier(s) '{cs}' since the hook is not holding yarn." #TODO: improve/make this a KnitoutException
         self.hook_active = False
         #
-        self.operations.append('releasehook ' + cs)
+        self.operations.addOp(Op.RELEASEHOOK, cs=self.operations.intern(cs))
         #
         for c in carriers:
-            # self.q.put( (InactiveCarrierWarning.check, self.line_number, (self, warnings, self.carrier_map,c, "releasehook")) ) #*
             InactiveCarrierWarning.check(self, warnings, self.carrier_map,c, op="releasehook", line_number=self.line_number) #new
     
     def rack(self, r: Union[int,float]): #*#*
         if self.rack_value != r: #keep #?
-            super().rack(r)
+            if not isinstance(r, (int, float)): raise ValueError("Rack must be a number.", r)
+            self.operations.addOp(Op.RACK, cs=self.operations.intern(str(r)))
             self.rack_value = r
 
+    def addUncheckedOp(self, op: Op, args) -> None:
+        '''
+        Validation-off fast path for `knit`, `tuck`, `miss`, `xfer`, `split`, and `drop`: adds the operation straight to the op buffer, without checking the arguments or updating any bed/carrier state.
+        '''
+        if op == Op.XFER or op == Op.DROP: d, i = 0, 0
+        else: d, i = DIRECTION_IDS[args[0]], 1
+        bed, needle, i = shiftBedNeedleUnchecked(args, i)
+        if op == Op.XFER or op == Op.SPLIT:
+            bed2, needle2, i = shiftBedNeedleUnchecked(args, i)
+            bed2 = BED_IDS[bed2]
+        else: bed2, needle2 = 0, 0
+        #
+        if i < len(args): cs = self.operations.intern(' '.join(map(str, args[i:])))
+        else: cs = 0
+        self.operations.addOp(op, d, BED_IDS[bed], needle, bed2, needle2, cs)
+
     def knit(self, *args):
+        if not self.validation_enabled: return self.addUncheckedOp(Op.KNIT, args)
         argl = list(args)
         direction = shiftDirection(argl)
-        bn, (bed, needle) = shiftBedNeedle(argl)
+        bed, needle = shiftBedNeedle(argl)
         cs, carriers = shiftCarrierSet(argl, self.carriers)
         #
-        self.operations.append('knit ' + direction + ' ' + bn + ' ' + cs)
+        self.operations.addOp(Op.KNIT, DIRECTION_IDS[direction], BED_IDS[bed], needle, cs=self.operations.intern(cs))
         #
         for c in carriers:
-            # self.q.put( (FloatWarning.check, self.line_number, (self, warnings, self.carrier_map, c, needle)) ) #*
             FloatWarning.check(self, warnings, self.carrier_map, c, needle, line_number=self.line_number) #new
             #
-            # self.q.put( (self.updateCarrier, self.line_number, (c, "knit", direction, bed, needle)) ) #*
             self.updateCarrier(c, "knit", direction, bed, needle) #new
         #
-        self.q.put( (HeldLoopWarning.check, self.line_number, (self, warnings, self.row_ct, self.bns.get(bn), bed, needle, self.line_number)) ) #* #copy #?
-        #
-        self.bns.increment((bed,needle), is_tuck=False) #*#*
+        self.bns.incrementBn(bed, needle, is_tuck=False) #*#*
 
 
     def tuck(self, *args):
+        if not self.validation_enabled: return self.addUncheckedOp(Op.TUCK, args)
         argl = list(args)
         direction = shiftDirection(argl)
-        bn, (bed, needle) = shiftBedNeedle(argl)
+        bed, needle = shiftBedNeedle(argl)
         cs, carriers = shiftCarrierSet(argl, self.carriers)
         #
-        self.operations.append('tuck ' + direction + ' ' + bn + ' ' + cs)
+        self.operations.addOp(Op.TUCK, DIRECTION_IDS[direction], BED_IDS[bed], needle, cs=self.operations.intern(cs))
         #
         for c in carriers:
-            # self.q.put( (FloatWarning.check, self.line_number, (self, warnings, self.carrier_map, c, needle)) ) #*
             FloatWarning.check(self, warnings, self.carrier_map, c, needle, line_number=self.line_number) #new
             #
-            # self.q.put( (self.updateCarrier, self.line_number, (c, "tuck", direction, bed, needle)) ) #*
             self.updateCarrier(c, "tuck", direction, bed, needle) #new
         #
-        self.q.put( (HeldLoopWarning.check, self.line_number, (self, warnings, self.row_ct, self.bns.get(bn), bed, needle, self.line_number)) ) #* #copy #?
-        #
-        self.bns.increment((bed,needle), is_tuck=True) #*#*
-        self.q.put( (StackedLoopWarning.check, self.line_number, (self, warnings, self.bns.get(bn), bed, needle, self.line_number)) ) #* #copy #?
+        self.bns.incrementBn(bed, needle, is_tuck=True) #*#*
 
     def xfer(self, *args):
+        if not self.validation_enabled: return self.addUncheckedOp(Op.XFER, args)
         argl = list(args)
-        bn_from, (bed, needle) = shiftBedNeedle(argl)
-        bn_to, (bed2, needle2) = shiftBedNeedle(argl)
+        bed, needle = shiftBedNeedle(argl)
+        bed2, needle2 = shiftBedNeedle(argl)
         #
-        self.operations.append('xfer ' + bn_from + ' ' + bn_to)
+        self.operations.addOp(Op.XFER, 0, BED_IDS[bed], needle, BED_IDS[bed2], needle2)
         #
-        self.q.put( (UnalignedNeedlesWarning.check, self.line_number, (self, warnings, self.rack_value, bed, needle, bed2, needle2, self.line_number)) ) #*
-        self.q.put( (EmptyXferWarning.check, self.line_number, (self, warnings, self.bns.get(bn_from), bed, needle, self.line_number)) ) #* #copy #?
-        #
-        self.bns.xfer((bed,needle), (bed2,needle2), is_split=False) #*#*
-        self.q.put( (StackedLoopWarning.check, self.line_number, (self, warnings, self.bns.get(bn_to), bed2, needle2, self.line_number)) ) #* #copy #?
+        self.bns.xferBn(bed, needle, bed2, needle2, is_split=False) #*#*
 
     def split(self, *args):
+        if not self.validation_enabled: return self.addUncheckedOp(Op.SPLIT, args)
         argl = list(args)
         direction = shiftDirection(argl)
-        bn_from, (bed, needle) = shiftBedNeedle(argl)
-        bn_to, (bed2, needle2) = shiftBedNeedle(argl)
+        bed, needle = shiftBedNeedle(argl)
+        bed2, needle2 = shiftBedNeedle(argl)
         cs, carriers = shiftCarrierSet(argl, self.carriers)
         #
-        self.operations.append('split '+ direction + ' ' + bn_from + ' ' + bn_to + ' ' + cs)
-        #
-        self.q.put( (UnalignedNeedlesWarning.check, self.line_number, (self, warnings, self.rack_value, bed, needle, bed2, needle2, self.line_number)) ) #*
-        self.q.put( (EmptyXferWarning.check, self.line_number, (self, warnings, self.bns.get(bn_from), bed, needle, self.line_number)) ) #* #copy #?
+        self.operations.addOp(Op.SPLIT, DIRECTION_IDS[direction], BED_IDS[bed], needle, BED_IDS[bed2], needle2, self.operations.intern(cs))
         #
         for c in carriers:
-            # self.q.put( (FloatWarning.check, self.line_number, (self, warnings, self.carrier_map, c, needle)) ) #* #TODO: deepcopy for these #*#*#*
             FloatWarning.check(self, warnings, self.carrier_map, c, needle, line_number=self.line_number) #new
             #
-            # self.q.put( (self.updateCarrier, self.line_number, (c, "split", direction, bed, needle)) ) #* #TODO: deepcopy for these #? #*#*#*
             self.updateCarrier(c, "split", direction, bed, needle) #new
         #
-        self.q.put( (HeldLoopWarning.check, self.line_number, (self, warnings, self.row_ct, self.bns.get(bn_from), bed, needle, self.line_number)) ) #* #copy #?
-        #
-        self.bns.xfer((bed,needle), (bed2,needle2), is_split=True) #*#*
-        self.q.put( (StackedLoopWarning.check, self.line_number, (self, warnings, self.bns.get(bn_to), bed2, needle2, self.line_number)) ) #* #copy #?
+        self.bns.xferBn(bed, needle, bed2, needle2, is_split=True) #*#*
 
     def miss(self, *args):
+        if not self.validation_enabled: return self.addUncheckedOp(Op.MISS, args)
         argl = list(args)
         direction = shiftDirection(argl)
-        bn, (bed, needle) = shiftBedNeedle(argl)
+        bed, needle = shiftBedNeedle(argl)
         cs, carriers = shiftCarrierSet(argl, self.carriers)
         #
-        self.operations.append('miss ' + direction + ' ' + bn + ' ' + cs)
+        self.operations.addOp(Op.MISS, DIRECTION_IDS[direction], BED_IDS[bed], needle, cs=self.operations.intern(cs))
         #
         for c in carriers:
-            # self.q.put( (self.updateCarrier, self.line_number, (c, "miss", direction, bed, needle)) ) #*
             self.updateCarrier(c, "miss", direction, bed, needle) #new
     
     def drop(self, *args):
+        if not self.validation_enabled: return self.addUncheckedOp(Op.DROP, args)
         argl = list(args)
-        bn, (bed, needle) = shiftBedNeedle(argl)
+        bed, needle = shiftBedNeedle(argl)
+        #
+        self.operations.addOp(Op.DROP, 0, BED_IDS[bed], needle)
         #
-        self.operations.append('drop ' + bn)
+        self.bns.clearLoops(bed, needle) #*#* (dropping an empty needle is valid knitout, just nothing to remove)
+
+    def addPass(self, op: Op, direction: str, beds: Union[str, Sequence[str]], needles: Union[Sequence[int], np.ndarray], *cs) -> None:
+        '''
+        Adds a whole pass of `knit`, `tuck`, or `miss` operations in a single call; same output, warnings, and state as calling e.g. `knit(direction, f"{bed}{n}", *cs)` for each needle in `needles` (in order), but with the arguments parsed once, and the op buffer, float checks, and bed state updated in bulk.
+
+        Parameters:
+        ----------
+        * `op` (Op): `Op.KNIT`, `Op.TUCK`, or `Op.MISS`.
+        * `direction` (str): direction of the pass (`"+"` or `"-"`).
+        * `beds` (str or sequence of str): bed for every needle in the pass, or one bed per needle (e.g., for rib).
+        * `needles` (sequence of int or np.ndarray): needles to add the operation on, in the order they should be added.
+        * `cs` (str): carrier(s) to use.
+        '''
+        assert op in (Op.KNIT, Op.TUCK, Op.MISS), f"can't add a pass of '{op.name}' operations"
+        needles = np.asarray(needles, dtype=np.int64)
+        if not len(needles): return
         #
-        self.q.put( (HeldLoopWarning.check, self.line_number, (self, warnings, self.row_ct, self.bns.get(bn), bed, needle, self.line_number)) ) #* #copy #?
+        try:
+            if isinstance(beds, str): bed_ids = BED_IDS[beds]
+            else:
+                assert len(beds) == len(needles), "need one bed per needle"
+                bed_ids = np.array([BED_IDS[bed] for bed in beds], dtype=np.uint8)
+        except KeyError as e:
+            raise ValueError("Invalid bed type. Must be 'f' 'b' 'fs' 'bs'.", e.args[0])
+        #
+        if not self.validation_enabled: return self.operations.addOps(op, DIRECTION_IDS[direction], bed_ids, needles, cs=self.operations.intern(' '.join(map(str, cs))))
+        #
+        direction = shiftDirection([direction])
+        cs_args = cs
+        cs, carriers = shiftCarrierSet(list(cs), self.carriers)
+        #
+        if op != Op.MISS and any(c not in self.carrier_map for c in carriers): # knitting with a carrier that isn't in; fall back to the single-op method so the error is raised at the same op
+            opFunc = self.knit if op == Op.KNIT else self.tuck
+            for i, needle in enumerate(needles.tolist()):
+                opFunc(direction, f"{beds if isinstance(beds, str) else beds[i]}{needle}", *cs_args)
+            return
+        #
+        line_number = self.line_number # (of the op before the pass)
+        self.operations.addOps(op, DIRECTION_IDS[direction], bed_ids, needles, cs=self.operations.intern(cs))
+        #
+        last_bed = beds if isinstance(beds, str) else str(beds[-1])
+        if op == Op.MISS:
+            for c in carriers:
+                self.updateCarrier(c, "miss", direction, last_bed, int(needles[-1])) #new
+            return
+        #
+        floats = [] # (op index, carrier index, previous needle)
+        for ci, c in enumerate(carriers):
+            prev_needle = self.carrier_map[c].needle
+            if prev_needle is not None and abs(int(needles[0])-prev_needle) > FloatWarning.MAX_FLOAT_LEN: floats.append((0, ci, prev_needle))
+            for i in np.flatnonzero(np.abs(np.diff(needles)) > FloatWarning.MAX_FLOAT_LEN)+1:
+                floats.append((int(i), ci, int(needles[i-1])))
+        for i, ci, prev_needle in sorted(floats):
+            warnings.warn(FloatWarning(carriers[ci], prev_needle, int(needles[i]), line_number+i+1)) #new
         #
-        self.bns.remove((bed,needle)) #*#*
+        for c in carriers:
+            self.updateCarrier(c, "knit" if op == Op.KNIT else "tuck", direction, last_bed, int(needles[-1])) #new
+        #
+        self.bns.incrementBns(beds, needles, is_tuck=(op == Op.TUCK)) #*#*
+
+    def knitPass(self, direction: str, beds: Union[str, Sequence[str]], needles: Union[Sequence[int], np.ndarray], *cs) -> None:
+        '''
+        Knits a whole pass in a single call: same as calling `knit(direction, f"{bed}{n}", *cs)` for each needle in `needles`, in order (see `addPass`).
+
+        Parameters:
+        ----------
+        * `direction` (str): direction of the pass (`"+"` or `"-"`).
+        * `beds` (str or sequence of str): bed for every needle in the pass, or one bed per needle.
+        * `needles` (sequence of int or np.ndarray): needles to knit, in the order they should be knitted.
+        * `cs` (str): carrier(s) to knit with.
+        '''
+        self.addPass(Op.KNIT, direction, beds, needles, *cs)
+
+    def tuckPass(self, direction: str, beds: Union[str, Sequence[str]], needles: Union[Sequence[int], np.ndarray], *cs) -> None:
+        '''
+        Tucks a whole pass in a single call: same as calling `tuck(direction, f"{bed}{n}", *cs)` for each needle in `needles`, in order (see `addPass`).
+
+        Parameters:
+        ----------
+        * `direction` (str): direction of the pass (`"+"` or `"-"`).
+        * `beds` (str or sequence of str): bed for every needle in the pass, or one bed per needle.
+        * `needles` (sequence of int or np.ndarray): needles to tuck on, in the order they should be tucked.
+        * `cs` (str): carrier(s) to tuck with.
+        '''
+        self.addPass(Op.TUCK, direction, beds, needles, *cs)
+
+    def xferBatch(self, pairs) -> None:
+        '''
+        Adds a batch of transfers in a single call: same as calling `xfer(from_bn, to_bn)` for each pair, in order, but with the op buffer filled in bulk (alignment with the current rack and empty xfers are checked by the deferred validator, as usual).
+
+        Parameters:
+        ----------
+        * `pairs` (iterable): `(from_bn, to_bn)` pairs, where each bed-needle is a string (e.g., `"f10"`) or a `(bed, needle)` tuple.
+        '''
+        pairs = list(pairs)
+        if not len(pairs): return
+        beds, needles = splitBns([pair[0] for pair in pairs])
+        beds2, needles2 = splitBns([pair[1] for pair in pairs])
+        #
+        self.operations.addOps(Op.XFER, 0, np.array([BED_IDS[bed] for bed in beds]), needles, np.array([BED_IDS[bed] for bed in beds2]), needles2)
+        #
+        if self.validation_enabled:
+            for bed, needle, bed2, needle2 in zip(beds, needles.tolist(), beds2, needles2.tolist()):
+                self.bns.xferBn(bed, needle, bed2, needle2, is_split=False) #*#*
+
+    def dropBatch(self, bns) -> None:
+        '''
+        Drops a batch of needles in a single call: same as calling `drop(bn)` for each bed-needle in `bns`, in order.
+
+        Parameters:
+        ----------
+        * `bns` (iterable): bed-needles to drop, each a string (e.g., `"f10"`) or a `(bed, needle)` tuple.
+        '''
+        beds, needles = splitBns(bns)
+        if not len(beds): return
+        #
+        self.operations.addOps(Op.DROP, 0, np.array([BED_IDS[bed] for bed in beds]), needles)
+        #
+        if self.validation_enabled:
+            for bed, needle in zip(beds, needles.tolist()):
+                self.bns.clearLoops(bed, needle) #*#* (dropping an empty needle is valid knitout, just nothing to remove)
+
+    def addTemplate(self, template: PassTemplate, *cs) -> None:
+        '''
+        Adds a pass from a `PassTemplate`: same as calling `addPass` for each of its segments (and `miss` for its single-needle misses), in order.
+
+        Parameters:
+        ----------
+        * `template` (PassTemplate): the pass to add.
+        * `cs` (str): carrier(s) to use.
+        '''
+        d = template.direction
+        for op, beds, needles in template.segments:
+            if op == Op.MISS and len(needles) == 1: self.miss(d, f"{beds if isinstance(beds, str) else beds[0]}{int(needles[0])}", *cs)
+            else: self.addPass(op, d, beds, needles, *cs)
+
+    def replayPasses(self, templates: Sequence[PassTemplate], times: int, *cs) -> None:
+        '''
+        Adds the passes in `templates` (in order) `times` times over; same output, warnings, and state as calling `addTemplate` for each of them, `times` times.
+
+        The first repeat is added as usual.  After that, the carriers are back where they were at the end of the first repeat, so every other repeat produces exactly the same operations: those are stored as a repeat of the first one in the op buffer (see `OpBuffer.addRepeat`; only expanded when the program is written out), and their carrier and bed state updates are applied in bulk (e.g., a repeated knit pass just advances the stitch counts on the same needles), so the time this takes depends on the number of distinct passes rather than the total number of passes.  (If the repeats would form floats, they are added one at a time instead, so the warnings are issued in the usual order.)
+
+        Parameters:
+        ----------
+        * `templates` (sequence of PassTemplate): the passes to repeat, in order.
+        * `times` (int): number of times to repeat them.
+        * `cs` (str): carrier(s) to use.
+        '''
+        if times < 1: return
+        for template in templates:
+            self.addTemplate(template, *cs)
+        times -= 1
+        if not times: return
+        #
+        cols = [template.columns() for template in templates]
+        ops = np.concatenate([c[0] for c in cols])
+        if not len(ops): return
+        bed_ids = np.concatenate([c[1] for c in cols])
+        needles = np.concatenate([c[2] for c in cols])
+        ds = np.concatenate([np.full(len(c[0]), DIRECTION_IDS[template.direction], dtype=np.uint8) for template, c in zip(templates, cols)])
+        #
+        def addRepeats(cs_id):
+            if not self.operations.addRepeat(len(ops), times): # (e.g., if the first repeat was partly flushed already, so just add copies)
+                self.operations.addOps(np.tile(ops, times), np.tile(ds, times), np.tile(bed_ids, times), np.tile(needles, times), cs=cs_id)
+        #
+        if not self.validation_enabled: return addRepeats(self.operations.intern(' '.join(map(str, cs))))
+        #
+        cs, carriers = shiftCarrierSet(list(cs), self.carriers)
+        stitch_ops = ops != Op.MISS
+        prev_needles = np.roll(needles, 1) # (the carriers start each repeat where they ended the last one)
+        if any(c not in self.carrier_map for c in carriers) or (stitch_ops & (np.abs(needles-prev_needles) > FloatWarning.MAX_FLOAT_LEN)).any():
+            for _ in range(times):
+                for template in templates:
+                    self.addTemplate(template, *carriers)
+            return
+        #
+        addRepeats(self.operations.intern(cs))
+        #
+        direction = next(template.direction for template in reversed(templates) if len(template))
+        for c in carriers:
+            self.updateCarrier(c, OP_NAMES[ops[-1]], direction, BEDS[bed_ids[-1]], int(needles[-1])) #new
+        #
+        if (ops == Op.TUCK).any(): # order matters for tucks (loops accumulate until the next knit), so apply each pass in turn
+            for _ in range(times):
+                for template in templates:
+                    for op, beds, ns in template.segments:
+                        if op != Op.MISS: self.bns.incrementBns(beds, ns, is_tuck=(op == Op.TUCK)) #*#*
+        else: # each needle just gets knitted through (number of times it is knitted per repeat)*`times` more times
+            keys, cts = np.unique(np.stack((bed_ids[stitch_ops].astype(np.int64), needles[stitch_ops])), axis=1, return_counts=True)
+            for ct in np.unique(cts):
+                sel = cts == ct
+                self.bns.incrementBns([BEDS[b] for b in keys[0][sel].tolist()], keys[1][sel], times=int(ct)*times) #*#*
 
     #Extensions:
     def stitchNumber(self, val):
         self.stitch_number = val #store it
-        self.operations.append('x-stitch-number ' + str(val))
+        self.operations.addOp(Op.STITCH_NUMBER, cs=self.operations.intern(str(val)))
 
     def speedNumber(self, val):
         self.speed_number = val #store it
-        self.operations.append('x-speed-number ' + str(val))
+        self.operations.addOp(Op.SPEED_NUMBER, cs=self.operations.intern(str(val)))
 
     def clear(self):
         #clear buffers
         self.headers = list()
-        self.operations = list()
+        self.operations.close()
+        self.operations = self.newOperations()
+        self.line_number = 0
+        self.validator.reset()
         #
         self.rack_value = 0
         self.carrier_map = dict()
         self.bns = BedNeedleList()
 
-    def write(self, filename):
+    @classmethod
+    def fromFile(cls, source: Union[str, Path, IO], stream: Optional[Union[str, Path, IO]]=None, buffer_size: int=10000, validate: bool=True, mmap: bool=True, binary: Optional[bool]=None) -> "Writer":
+        '''
+        Loads an existing program (e.g., one output by `write`, as knitout or in the binary op format) into a new Writer, so it can be extended (e.g., with a bindoff) or written out again, without regenerating it from scratch.
+
+        The operations are parsed straight into the op log (see `KnitoutReader`), or copied over as-is from a binary op file (see `OpFile`), and the Writer's state (`bns`, `carrier_map`, `rack_value`, `stitch_number`, `speed_number`, and the hook) is then replayed from the op columns (see `replayOps`) without running any checks on the loaded operations.  Operations added after that are checked as usual.
+
+        Parameters:
+        ----------
+        * `source` (str, Path, or file-like): the knitout or binary op file (optionally gzip- or zstd-compressed, going by its extension).  It needs a `;;Carriers:` header.
+        * `stream`, `buffer_size`, `validate`: see `Writer`.
+        * `mmap` (bool, optional): whether to memory-map an uncompressed file rather than reading it through a buffered stream. Defaults to `True`.
+        * `binary` (bool, optional): whether `source` is in the binary op format rather than knitout text. Defaults to `None` (aka infer it from the extension: `.kops`, optionally followed by a compression extension).
+
+        NOTE: file-like objects need to be opened in binary mode for binary op files.
+
+        Returns:
+        -------
+        * (Writer): a Writer holding the program's headers and operations.
+        '''
+        if binary is None: binary = outputFormat(source)[1]
+        if binary:
+            op_file = OpFile(source, mmap=mmap)
+            reader = None
+            headers, readInto = op_file.headers, lambda ops: ops.addBuffer(op_file.toOpBuffer())
+        else:
+            reader = KnitoutReader(source, mmap=mmap)
+            headers, readInto = reader.headers, reader.readInto
+        try:
+            carriers = headerCarriers(headers)
+            if carriers is None: raise ValueError("Can't load a knitout program without a ';;Carriers:' header.", source)
+            k = cls(carriers, stream=stream, buffer_size=buffer_size, validate=validate)
+            k.setHeaders(headers)
+            #
+            ops = k.operations
+            replayed_ct = 0
+            def replay():
+                nonlocal replayed_ct
+                start, end = replayed_ct-ops.spooled_ct, len(ops)-ops.spooled_ct
+                k.replayOps(ops.columns(start, end))
+                replayed_ct = ops.spooled_ct+end
+            #
+            before_flush = ops.beforeFlush
+            ops.beforeFlush = replay # (for a streaming Writer, so each chunk is replayed before it's flushed)
+            try:
+                readInto(ops)
+            finally:
+                ops.beforeFlush = before_flush
+            replay()
+        finally:
+            if reader is not None: reader.close()
+        return k
+
+    def replayOps(self, cols: Tuple[np.ndarray, ...], strings: Optional[Sequence[str]]=None, check: bool=False) -> None:
+        '''
+        Brings the Writer's state up to date with operations that were added to the op log directly (e.g., by `fromFile`), without running any checks on them.  With `validate=False`, only the state that the fast path tracks too (carriers in/out, rack, settings, and the hook) is updated.
+
+        Parameters:
+        ----------
+        * `cols` (tuple): op columns (see `OpBuffer.columns`) of the operations, which must be the last ones added to the op log.
+        * `strings` (sequence of str, optional): the interned strings that the `cs` column refers to. Defaults to `None` (aka the op log's own).
+        * `check` (bool, optional): whether to check the operations as if they had been emitted by this Writer (see `addSegment`): the carrier checks are run as the carrier state is updated, and the bed checks are left to the deferred validator (rather than marking the operations as validated). Defaults to `False`.
+        '''
+        ops = self.operations
+        if strings is None: strings = ops.strings
+        if self.validation_enabled and not check:
+            self.validator.replay(ops, cols) # (steps the validator's bed model through them, without checking anything)
+            self.validator.validated_ct += len(cols[0])
+        #
+        line_number = self.line_number-len(cols[0]) # (of the op before them)
+        carriers = {} # carrier-set string id -> carriers
+        for op, d, bed, n, bed2, n2, cs in zip(*[col.tolist() for col in cols]):
+            line_number += 1
+            if op == Op.RAW: continue
+            elif op <= Op.DROP:
+                if not self.validation_enabled: continue
+                if op != Op.XFER and op != Op.DROP:
+                    if cs not in carriers: carriers[cs] = splitCarriers(strings[cs])
+                    for c in carriers[cs]:
+                        if c in self.carrier_map:
+                            if check and op != Op.MISS: FloatWarning.check(self, warnings, self.carrier_map, c, n, line_number=line_number) #new
+                            self.carrier_map[c].update(DIRECTIONS[d], BEDS[bed], n)
+                        else:
+                            if check: InactiveCarrierWarning.check(self, warnings, self.carrier_map, c, op=OP_NAMES[op], line_number=line_number) #new
+                            self.carrier_map[c] = Carrier(DIRECTIONS[d], BEDS[bed], n)
+                #
+                if op == Op.KNIT or op == Op.TUCK: self.bns.incrementBn(BEDS[bed], n, is_tuck=(op == Op.TUCK))
+                elif op == Op.XFER or op == Op.SPLIT: self.bns.xferBn(BEDS[bed], n, BEDS[bed2], n2, is_split=(op == Op.SPLIT))
+                elif op == Op.DROP: self.bns.clearLoops(BEDS[bed], n)
+            elif op == Op.IN or op == Op.INHOOK:
+                if check and op == Op.INHOOK: assert not self.hook_active, f"Can't inhook carrier(s) '{strings[cs]}' since the hook is still holding another yarn."
+                for c in splitCarriers(strings[cs]):
+                    if check: self.addCarrier(c, OP_NAMES[op])
+                    else: self.carrier_map[c] = Carrier()
+                if op == Op.INHOOK: self.hook_active = True
+                else: self.use_hook = False
+            elif op == Op.OUT or op == Op.OUTHOOK:
+                for c in splitCarriers(strings[cs]):
+                    if check and InactiveCarrierWarning.check(self, warnings, self.carrier_map, c, op=OP_NAMES[op], line_number=line_number): continue #new
+                    self.carrier_map.pop(c, None)
+            elif op == Op.RELEASEHOOK:
+                if check:
+                    assert self.hook_active, f"Can't releasehook carrier(s) '{strings[cs]}' since the hook is not holding yarn."
+                    for c in splitCarriers(strings[cs]):
+                        InactiveCarrierWarning.check(self, warnings, self.carrier_map, c, op=OP_NAMES[op], line_number=line_number) #new
+                self.hook_active = False
+            elif op == Op.RACK: self.rack_value = parseArg(strings[cs])
+            elif op == Op.STITCH_NUMBER: self.stitch_number = parseArg(strings[cs])
+            elif op == Op.SPEED_NUMBER: self.speed_number = parseArg(strings[cs])
+
+    def addSegment(self, ops: OpBuffer) -> None:
+        '''
+        Appends a segment of operations that was generated on a separate Writer (e.g., in another process, starting from a blank state), in order, as if they had been emitted by this one: the carrier checks are run against this Writer's carrier positions, its state is brought up to date (see `replayOps`), and the bed checks are run by the deferred validator as usual.  Repeat blocks in the segment are kept as repeats.
+
+        Parameters:
+        ----------
+        * `ops` (OpBuffer): the segment's (in-memory) operations.
+        '''
+        if not len(ops): return
+        self.operations.addBuffer(ops)
+        self.replayOps(ops.columns(0, len(ops)), strings=ops.strings, check=True)
+
+    def setHeaders(self, headers: Sequence[str]) -> None:
+        '''
+        Replaces the header lines (e.g., the defaults, when loading a program).
+        '''
+        self.updateLineNumber(-len(self.headers))
+        del self.headers[:]
+        self.headers.extend(headers)
+
+    def getState(self) -> dict:
+        '''
+        Returns a copy of the Writer's state (everything but the op log itself): headers, `bns`, `carrier_map`, `rack_value`, `stitch_number`, `speed_number`, the hook, and the validator's progress (see `checkpoint`).
+        '''
+        return {
+            "carriers": list(self.carriers),
+            "validation_enabled": self.validation_enabled,
+            "headers": list(self.headers),
+            "bns": self.bns.copy(),
+            "carrier_map": {c: Carrier(carrier.direction, carrier.bed, carrier.needle) for c, carrier in self.carrier_map.items()},
+            "rack_value": self.rack_value,
+            "stitch_number": self.stitch_number,
+            "speed_number": self.speed_number,
+            "hook_active": self.hook_active,
+            "use_hook": self.use_hook,
+            "validator": self.validator.getState()
+        }
+
+    def setState(self, state: dict) -> None:
+        '''
+        Restores the Writer's state from `getState` (leaving `state` untouched, so it can be restored again).  `headers` and `validator` can be left out of `state`, to leave those as they are.
+        '''
+        if "headers" in state: self.setHeaders(state["headers"])
+        self.bns = state["bns"].copy()
+        self.carrier_map = {c: Carrier(carrier.direction, carrier.bed, carrier.needle) for c, carrier in state["carrier_map"].items()}
+        self.rack_value = state["rack_value"]
+        self.stitch_number = state["stitch_number"]
+        self.speed_number = state["speed_number"]
+        self.hook_active = state["hook_active"]
+        self.use_hook = state["use_hook"]
+        if "validator" in state: self.validator.setState(state["validator"])
+
+    def checkpoint(self) -> Checkpoint:
+        '''
+        Takes a snapshot of the Writer's state, that it can be rolled back to later with `restore`, or saved to disk with `saveCheckpoint` (see `Checkpoint`).  This doesn't copy the op log, just records its length, so it's cheap to take a checkpoint after every section of a program.
+
+        Returns:
+        -------
+        * (Checkpoint): the checkpoint.
+        '''
+        return Checkpoint(len(self.operations), self.getState())
+
+    def restore(self, checkpoint: Checkpoint) -> None:
+        '''
+        Rolls the Writer back to `checkpoint` (taken from this Writer with `checkpoint`): any operations added since are removed, and the rest of the state is restored.  The same checkpoint can be restored any number of times.
+
+        Raises:
+        ------
+        * ValueError: if some of the operations added since the checkpoint were flushed already (by a streaming Writer), or the op log is shorter than it was at the checkpoint.
+        '''
+        if len(self.operations) < checkpoint.op_ct: raise ValueError("The op log was rolled back past this checkpoint.")
+        self.operations.truncate(checkpoint.op_ct)
+        self.setState(checkpoint.writer)
+
+    def saveCheckpoint(self, path: Union[str, Path], checkpoint: Optional[Checkpoint]=None) -> None:
+        '''
+        Saves a checkpoint, along with the operations leading up to it, to `path`, so the program can be resumed from that point in a later run with `loadCheckpoint`.
+
+        Parameters:
+        ----------
+        * `path` (str or Path): file to save to.
+        * `checkpoint` (Checkpoint, optional): checkpoint (taken from this Writer) to save. Defaults to `None` (aka the current state).
+        '''
+        if checkpoint is None: checkpoint = self.checkpoint()
+        checkpoint.save(path, self.operations)
+
+    @classmethod
+    def loadCheckpoint(cls, path: Union[str, Path], stream: Optional[Union[str, Path, IO]]=None, buffer_size: int=10000) -> "Writer":
+        '''
+        Loads a checkpoint saved with `saveCheckpoint` into a new Writer, with the operations and state it had at the checkpoint.
+
+        Parameters:
+        ----------
+        * `path` (str or Path): the checkpoint file.
+        * `stream`, `buffer_size`: see `Writer`.
+
+        Returns:
+        -------
+        * (Writer): the Writer.
+        '''
+        return cls.fromCheckpoint(*Checkpoint.load(path), stream=stream, buffer_size=buffer_size)
+
+    @classmethod
+    def fromCheckpoint(cls, checkpoint: Checkpoint, ops: OpBuffer, stream: Optional[Union[str, Path, IO]]=None, buffer_size: int=10000) -> "Writer":
+        '''
+        Creates a new Writer from `checkpoint`, with the operations leading up to it (`ops`, e.g., from `Checkpoint.load`).
+        '''
+        state = checkpoint.writer
+        k = cls(' '.join(state["carriers"]), stream=stream, buffer_size=buffer_size, validate=state["validation_enabled"])
+        k.setState(state)
+        k.operations.addBuffer(ops) # (any operations that weren't validated yet at the checkpoint will be, as usual)
+        return k
+
+    def profile(self, modules: Sequence[str]=DEFAULT_MODULES, files: Sequence[Union[str, Path]]=()) -> Profiler:
+        '''
+        Returns a profiler that records the operations emitted, and the time spent, by each knitlib function called while it's enabled (use it as a context manager, e.g., `with k.profile() as prof: ...`, then `print(prof.report())`; see `Profiler`).  Nothing is recorded (or slowed down) outside of the `with` block.
+
+        Parameters:
+        ----------
+        * `modules`, `files`: see `Profiler`.
+
+        Returns:
+        -------
+        * (Profiler): the profiler.
+        '''
+        return Profiler(self, modules, files)
+
+    def writeContent(self, out: IO, binary: bool=False, operations: Optional[OpBuffer]=None) -> None:
+        if operations is None: operations = self.operations
+        if binary: writeOpFile(out, self.headers, operations)
+        else: writeKnitout(out, self.headers, operations)
+
+    def write(self, filename: Optional[Union[str, Path, IO]]=None, compression: Optional[str]=None, binary: Optional[bool]=None, optimize: bool=False):
+        '''
+        Writes the program out (after taking out any carriers that are still in, and running the final validation checks).
+
+        Parameters:
+        ----------
+        * `filename` (str, Path, or file-like, optional): where to write the program. Defaults to `None` (aka the `stream` the Writer was opened on).
+        * `compression` (str, optional): `"gzip"` or `"zstd"` (needs the `zstandard` package) to compress the output as it is written. Defaults to `None` (aka infer it from the extension of `filename`: `.gz` for gzip, `.zst`/`.zstd` for zstd, otherwise uncompressed).
+        * `binary` (bool, optional): whether to write the compact binary op format (see `OpFile`) rather than knitout text. Defaults to `None` (aka infer it from the extension: `.kops`, optionally followed by a compression extension).
+        * `optimize` (bool, optional): whether to run the optimization passes over the operations before writing them (see `optimizeOps`): transfers are grouped by racking, and redundant `rack`, `x-stitch-number`, `x-speed-number`, and `miss` operations are removed (the number of lines saved is printed).  The Writer's own op log is left as-is.  Not supported for streaming Writers that have flushed operations already. Defaults to `False`.
+
+        NOTE: file-like objects need to be opened in binary mode for compressed or binary output.
+        '''
+        if filename is None:
+            assert self.stream is not None, "Must specify `filename` for a Writer that wasn't opened on a stream."
+            filename = self.stream
         # ensure all carriers have been taken out:
         for c in self.carrier_map.copy():
             print(f"WARNING: taking carrier {c} out in 'write' func")
             if self.use_hook: self.outhook(c)
             else: self.outcarrier(c)
         
-        for bn in self.bns:
-            self.q.put( (HeldLoopWarning.check, self.line_number, (self, warnings, self.row_ct, self.bns.get(bn), bn.bed, bn.needle, self.line_number)) ) #* #copy #?
+        if self.validation_enabled: self.validate(final=True)
         #
-        self.q.put((None, None, None)) #indicates we're done
-        # wait for thread to finish:
-        self.thread.join()
+        operations = self.operations
+        if optimize:
+            operations, removed = optimizeOps(self.operations)
+            print(f"optimized out {sum(removed.values())} lines ({', '.join(f'{name}: {ct}' for name, ct in removed.items())})")
         #
-        version = ';!knitout-2\n'
-        content = version + '\n'.join(self.headers) + '\n' + '\n'.join(self.operations)
+        compression, binary = outputFormat(filename, compression, binary)
         try:
-            with open(filename, "w") as out:
-                print(content, file=out)
-            print('wrote file ' + filename)
+            with openOutput(filename, compression, binary) as out:
+                self.writeContent(out, binary, operations)
+            print(f'wrote file {getattr(filename, "name", filename)}')
         except IOError as error:
-            print('Could not write to file ' + filename)
-        # #
-        # self.thread.join()
+            print(f'Could not write to file {getattr(filename, "name", filename)}')
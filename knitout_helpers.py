@@ -1,6 +1,6 @@
 from __future__ import annotations #so we don't have to worry about situations that would require forward declarations
 from typing import Optional, Union, Tuple, List
-import re
+from functools import lru_cache
 # from multimethod import multimethod
 
 from collections import UserList
@@ -81,11 +81,20 @@ class Carrier:
 		if needle is not None: self.needle = needle
 
 
-def getBedNeedle(bn: str):
-	res = re.match(r"^([f|b]s?)(-?\d+)$", bn)
-	if res is not None:
-		bed, needle = res.group(1), int(res.group(2))
-		return bed, needle
+VALID_BEDS = ("f", "b", "fs", "bs")
+
+
+@lru_cache(maxsize=4096)
+def getBedNeedle(bn: str) -> Tuple[str, int]:
+	'''
+	Splits a bed-needle string into its bed and needle, e.g., `"f123"` -> `("f", 123)`.
+
+	Results are cached by string (for the 4096 most recently used bed-needles, enough for every needle on both beds and sliders of a machine, so the cache stays bounded in long-lived processes), so each bed-needle is only parsed once, and the same (immutable) tuple is returned every time after that.
+	'''
+	if bn[1:2] == "s": bed, needle = bn[:2], bn[2:]
+	else: bed, needle = bn[:1], bn[1:]
+	#
+	if bed in VALID_BEDS and needle.lstrip("-").isdecimal() and needle.count("-") <= 1: return bed, int(needle)
 	else: raise ValueError(f"'{bn}' is not a valid bed-needle string.")
 
 
@@ -0,0 +1,182 @@
+from typing import Optional, Union, Iterator, List, Sequence, IO
+from pathlib import Path
+from itertools import chain
+import mmap as mmap_module
+
+#===============================================================================
+import sys
+
+## Standalone boilerplate before relative imports
+if not __package__: #remove #?
+	DIR = Path(__file__).resolve().parent
+	sys.path.insert(0, str(DIR.parent))
+	__package__ = DIR.name
+#===============================================================================
+
+from .knitout_helpers import getBedNeedle
+from .op_buffer import OpBuffer, Op, OP_NAMES, DIRECTION_IDS, BED_IDS
+from .op_file import outputFormat, openInput
+
+
+# opcode for each knitout operation name the op buffer has a dedicated column layout for
+OP_IDS = {name: Op(i) for i, name in enumerate(OP_NAMES) if name is not None}
+
+
+def parseArg(s: str) -> Union[int, float, str]:
+	'''
+	Parses the argument of a `rack` or extension (e.g., `x-stitch-number`) line back into the value that was passed to the Writer.
+	'''
+	try:
+		return int(s)
+	except ValueError:
+		try:
+			return float(s)
+		except ValueError:
+			return s
+
+
+def splitCarriers(cs: str) -> List[str]:
+	'''
+	Returns the carriers in a carrier-set string from a knitout line (ignoring any trailing comment).
+	'''
+	return cs.partition(";")[0].split()
+
+
+def parseBn(bn: str):
+	'''
+	Returns `(bed id, needle)` for a bed-needle string, if it's in the form the Writer outputs (e.g., `"f10"`, not `"f010"`), otherwise `None`.
+	'''
+	try:
+		bed, needle = getBedNeedle(bn)
+	except ValueError:
+		return None
+	if bn[len(bed):] != str(needle): return None
+	return BED_IDS[bed], needle
+
+
+def headerCarriers(headers: Sequence[str]) -> Optional[str]:
+	'''
+	Returns the carriers available on the machine from a program's `;;Carriers:` header line, or `None` if `headers` doesn't include one.
+	'''
+	for line in headers:
+		name, _, value = line[2:].partition(":")
+		if name.strip() == "Carriers": return value.strip()
+	return None
+
+
+class KnitoutReader:
+	'''
+	Streaming parser for knitout files, that reads a program back into the compact op log the Writer uses (see `OpBuffer`), e.g., so that an existing program can be loaded with `Writer.fromFile` and extended.
+
+	The version line and headers are read when the reader is opened; the operations are only read (one line at a time, so memory use is just that of the op log) by `readInto`.  Uncompressed files opened by path are memory-mapped rather than read in, and gzip/zstd-compressed files (going by their extension) are decompressed as they are read.
+
+	Operations are read into their op columns when they are in the form the Writer outputs them in, so writing the op log back out gives the same bytes.  Any other lines (comments, pauses, extensions without a dedicated opcode, or operations with unusual formatting) are kept as-is, as `Op.RAW` lines.
+
+	Parameters:
+	----------
+	* `source` (str, Path, or file-like): the knitout file (file-like objects can be opened in text or binary mode).
+	* `mmap` (bool, optional): whether to memory-map an uncompressed file rather than reading it through a buffered stream. Defaults to `True`.
+	'''
+	def __init__(self, source: Union[str, Path, IO], mmap: bool=True):
+		self.source = source
+		self.file = None
+		self.map = None
+		#
+		if isinstance(source, (str, Path)):
+			self.file = openInput(source)
+			if mmap and outputFormat(source)[0] is None:
+				try:
+					self.map = mmap_module.mmap(self.file.fileno(), 0, access=mmap_module.ACCESS_READ)
+				except ValueError: # (empty file)
+					pass
+		#
+		self.lines = self.readLines()
+		self.pending = None # line read past the end of the headers
+		#
+		self.version = next(self.lines, None)
+		if self.version is None or not self.version.startswith(";!knitout-"):
+			self.close()
+			raise ValueError("Not a knitout file (missing the ';!knitout-2' version line).", source)
+		#
+		self.headers = []
+		for line in self.lines:
+			if line.startswith(";;"): self.headers.append(line)
+			else:
+				if len(self.headers) or line != "": self.pending = line # (the Writer outputs an empty line in place of the headers, if there are none)
+				break
+
+	def readLines(self) -> Iterator[str]:
+		if self.map is not None: lines = iter(self.map.readline, b"")
+		elif self.file is not None: lines = self.file
+		else: lines = self.source
+		#
+		for line in lines:
+			if isinstance(line, bytes): line = line.decode("utf-8")
+			yield line.rstrip("\r\n")
+
+	@property
+	def carriers(self) -> Optional[str]:
+		'''
+		The carriers available on the machine (from the `;;Carriers:` header), or `None` if the program doesn't have that header.
+		'''
+		return headerCarriers(self.headers)
+
+	def readInto(self, ops: OpBuffer) -> int:
+		'''
+		Reads the rest of the operations into `ops` (in order).
+
+		Parameters:
+		----------
+		* `ops` (OpBuffer): op log to add the operations to.
+
+		Returns:
+		-------
+		* (int): number of operations read.
+		'''
+		lines = self.lines if self.pending is None else chain((self.pending,), self.lines)
+		self.pending = None
+		#
+		first, second = next(lines, None), next(lines, None)
+		if first is None or (first == "" and second is None): return 0 # (a program with no operations is output with an empty line in their place)
+		#
+		ct = 0
+		for line in chain((first,) if second is None else (first, second), lines):
+			self.parseLine(ops, line)
+			ct += 1
+		return ct
+
+	def parseLine(self, ops: OpBuffer, line: str) -> None:
+		name, _, rest = line.partition(" ")
+		op = OP_IDS.get(name)
+		if op is not None:
+			if op <= Op.MISS:
+				args = rest.split(" ", 2)
+				if len(args) == 3 and args[0] in DIRECTION_IDS and args[2]:
+					bn = parseBn(args[1])
+					if bn is not None: return ops.addOp(op, DIRECTION_IDS[args[0]], bn[0], bn[1], cs=ops.intern(args[2]))
+			elif op == Op.XFER:
+				args = rest.split(" ")
+				if len(args) == 2:
+					bn, bn2 = parseBn(args[0]), parseBn(args[1])
+					if bn is not None and bn2 is not None: return ops.addOp(op, 0, bn[0], bn[1], bn2[0], bn2[1])
+			elif op == Op.SPLIT:
+				args = rest.split(" ", 3)
+				if len(args) == 4 and args[0] in DIRECTION_IDS and args[3]:
+					bn, bn2 = parseBn(args[1]), parseBn(args[2])
+					if bn is not None and bn2 is not None: return ops.addOp(op, DIRECTION_IDS[args[0]], bn[0], bn[1], bn2[0], bn2[1], ops.intern(args[3]))
+			elif op == Op.DROP:
+				bn = parseBn(rest)
+				if bn is not None: return ops.addOp(op, 0, bn[0], bn[1])
+			elif rest: return ops.addOp(op, cs=ops.intern(rest)) # carrier ops, rack, and extensions
+		#
+		ops.append(line)
+
+	def close(self) -> None:
+		if self.map is not None: self.map.close()
+		if self.file is not None: self.file.close()
+
+	def __enter__(self) -> "KnitoutReader":
+		return self
+
+	def __exit__(self, *args) -> None:
+		self.close()
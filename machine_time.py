@@ -0,0 +1,302 @@
+from typing import Optional, Union, Dict, List, Tuple, IO
+from pathlib import Path
+
+#===============================================================================
+import sys
+
+## Standalone boilerplate before relative imports
+if not __package__: #remove #?
+	DIR = Path(__file__).resolve().parent
+	sys.path.insert(0, str(DIR.parent))
+	__package__ = DIR.name
+#===============================================================================
+
+from .op_buffer import OpBuffer, Op, BEDS, DIRECTIONS
+from .op_file import OpFile, outputFormat
+from .knitout_reader import KnitoutReader, parseArg
+
+
+class MachineModel:
+	'''
+	Timing model for a knitting machine, used to estimate how long a program takes to knit (see `carriagePasses`).  The defaults are rough figures for a 15-gauge industrial V-bed (e.g., the SWGN2); calibrate them against measured knitting times for your machine to get accurate estimates.
+
+	Parameters:
+	----------
+	* `gauge` (float, optional): needles per inch. Defaults to `15`.
+	* `default_speed` (float, optional): carriage speed (in m/s) for passes knit before any `x-speed-number` is set (or with `x-speed-number 0`). Defaults to `0.8`.
+	* `speed_unit` (float, optional): carriage speed (in m/s) per unit of `x-speed-number` (e.g., `0.0025` makes speed number 400 a speed of 1 m/s). Defaults to `0.0025`.
+	* `max_xfer_speed` (float, optional): max carriage speed (in m/s) for passes with transfers. Defaults to `0.6`.
+	* `overrun` (float, optional): distance (in mm) the carriage travels past the edge of the pass on each side (e.g., to clear the cams and turn around). Defaults to `100`.
+	* `pass_overhead` (float, optional): fixed time (in s) per carriage pass. Defaults to `0.2`.
+	* `xfer_time` (float, optional): extra time (in s) per transfer (or split) in a pass. Defaults to `0.005`.
+	* `rack_time` (float, optional): time (in s) per racking change. Defaults to `0.25`.
+	* `hook_time` (float, optional): time (in s) per yarn inserting hook operation (`inhook`, `releasehook`, `outhook`). Defaults to `3`.
+	* `carrier_time` (float, optional): time (in s) per carrier operation that doesn't use the hook (`in`, `out`). Defaults to `0.5`.
+	'''
+	def __init__(self, gauge: float=15, default_speed: float=0.8, speed_unit: float=0.0025, max_xfer_speed: float=0.6, overrun: float=100, pass_overhead: float=0.2, xfer_time: float=0.005, rack_time: float=0.25, hook_time: float=3, carrier_time: float=0.5):
+		self.gauge = gauge
+		self.default_speed = default_speed
+		self.speed_unit = speed_unit
+		self.max_xfer_speed = max_xfer_speed
+		self.overrun = overrun
+		self.pass_overhead = pass_overhead
+		self.xfer_time = xfer_time
+		self.rack_time = rack_time
+		self.hook_time = hook_time
+		self.carrier_time = carrier_time
+
+	def speed(self, speed_number: Optional[Union[int, float]], xfers: bool=False) -> float:
+		'''
+		Returns the carriage speed (in m/s) for a pass at `speed_number` (`None` if it wasn't set; `0` also means the machine's default speed).
+		'''
+		speed = self.default_speed if speed_number is None or speed_number <= 0 else speed_number*self.speed_unit
+		if xfers: speed = min(speed, self.max_xfer_speed)
+		return speed
+
+	def passTime(self, p: "CarriagePass") -> float:
+		'''
+		Returns the estimated time (in s) for the carriage pass `p`: the fixed overhead, plus the time to travel the width of the pass (and the overrun on each side) at its speed, plus the time for its transfers.
+		'''
+		distance = (p.width()*25.4/self.gauge + 2*self.overrun)/1000
+		return self.pass_overhead + distance/self.speed(p.speed_number, p.xfer_ct > 0) + p.xfer_ct*self.xfer_time
+
+
+class CarriagePass:
+	'''
+	A group of consecutive operations that the machine does in a single carriage pass (see `carriagePasses`).
+
+	* `kind` (str): `"knit"` (knit/tuck/miss/split operations, which move carriers), `"xfer"`, or `"drop"`.
+	* `direction` (str): `"+"` or `"-"` (`None` for xfer/drop passes).
+	* `carriers` (str): carriers the pass uses, e.g., `"1 2"` (`None` for xfer/drop passes).
+	* `rack` (int or float): racking during the pass.
+	* `stitch_number`, `speed_number` (int, or `None` if it wasn't set): settings for the pass.
+	* `start`, `end` (int): the pass's operations are `start:end` in the op log (including any comments between them).
+	* `op_ct` (int): number of needle operations in the pass.
+	* `xfer_ct` (int): number of transfers (and splits) in the pass.
+	* `left`, `right` (int or float): leftmost and rightmost needle positions (in front bed needles, going by the racking) used in the pass.
+	* `section` (tuple of str): the section (nested `begin ...` comments) the pass starts in.
+	* `time` (float): estimated time (in s), see `MachineModel.passTime`.
+	'''
+	__slots__ = ("kind", "direction", "carriers", "rack", "stitch_number", "speed_number", "start", "end", "op_ct", "xfer_ct", "left", "right", "section", "time", "used", "last_pos")
+
+	def __init__(self, kind: str, direction: Optional[str], carriers: Optional[str], rack: Union[int, float], stitch_number, speed_number, start: int, section: Tuple[str, ...]):
+		self.kind = kind
+		self.direction = direction
+		self.carriers = carriers
+		self.rack = rack
+		self.stitch_number = stitch_number
+		self.speed_number = speed_number
+		self.start = start
+		self.end = start
+		self.op_ct = 0
+		self.xfer_ct = 0
+		self.left = float("inf")
+		self.right = float("-inf")
+		self.section = section
+		self.time = 0.0
+		self.used = set() # (bed, needle) used in the pass
+		self.last_pos = None
+
+	def width(self) -> int:
+		return int(self.right-self.left)+1 if self.op_ct else 0
+
+	def fits(self, pos: Union[int, float], *bns: Tuple[int, int]) -> bool:
+		'''
+		Whether an operation at needle position `pos` on bed-needles `bns` can be added to the pass: a needle can only be used once per pass, and the operations in a knit pass need to be in order along its direction.
+		'''
+		if any(bn in self.used for bn in bns): return False
+		if self.direction is not None and self.last_pos is not None:
+			if self.direction == "+" and pos < self.last_pos: return False
+			if self.direction == "-" and pos > self.last_pos: return False
+		return True
+
+	def add(self, pos: Union[int, float], *bns: Tuple[int, int], xfer: bool=False) -> None:
+		self.used.update(bns)
+		self.last_pos = pos
+		self.left = min(self.left, pos)
+		self.right = max(self.right, pos)
+		self.op_ct += 1
+		if xfer: self.xfer_ct += 1
+
+
+class SectionStats:
+	'''
+	Totals for a section of a program (see `MachineTimeEstimate.sections`).
+
+	* `passes` (int): number of carriage passes started in the section, and `knit_passes`, `xfer_passes`, and `drop_passes` of each kind.
+	* `ops` (int): needle operations in those passes.
+	* `xfers` (int): transfers (and splits).
+	* `racks` (int): racking changes.
+	* `hooks` (int): carrier operations (`in`, `inhook`, `releasehook`, `out`, `outhook`).
+	* `time` (float): estimated time (in s), including nested sections.
+	* `self_time` (float): estimated time (in s), excluding nested sections.
+	'''
+	__slots__ = ("passes", "knit_passes", "xfer_passes", "drop_passes", "ops", "xfers", "racks", "hooks", "time", "self_time")
+
+	def __init__(self):
+		for name in self.__slots__:
+			setattr(self, name, 0.0 if name.endswith("time") else 0)
+
+	def asDict(self) -> dict:
+		return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MachineTimeEstimate:
+	'''
+	Estimated machine time for a program, per carriage pass and per section (see `carriagePasses`).
+
+	* `passes` (list of CarriagePass): the carriage passes, in order.
+	* `sections` (dict): `SectionStats` for each section (a tuple of the names of the nested `begin ...` comments it's in, e.g., `("waste section", "interlock")`; `()` for the whole program), in the order they first appear.
+	* `time` (float): estimated total time (in s).
+	'''
+	def __init__(self, passes: List[CarriagePass], sections: Dict[Tuple[str, ...], SectionStats]):
+		self.passes = passes
+		self.sections = sections
+		self.time = sections[()].time
+
+	def report(self, depth: Optional[int]=None) -> str:
+		'''
+		Returns a report (a table with a row per section, indented by nesting) as a string.
+
+		Parameters:
+		----------
+		* `depth` (int, optional): max nesting depth of the sections to include. Defaults to `None` (aka all of them).
+		'''
+		rows = [(key, s) for key, s in self.sections.items() if depth is None or len(key) <= depth]
+		names = ["  "*(len(key)-1)+key[-1] if len(key) else "(program)" for key, _ in rows]
+		width = max(len("section"), *(len(name) for name in names))
+		lines = [f"{'section':<{width}}  {'passes':>7}  {'knit':>6}  {'xfer':>6}  {'drop':>6}  {'ops':>9}  {'xfers':>7}  {'racks':>6}  {'hooks':>6}  {'time (s)':>10}  {'self (s)':>10}"]
+		for name, (_, s) in zip(names, rows):
+			lines.append(f"{name:<{width}}  {s.passes:>7}  {s.knit_passes:>6}  {s.xfer_passes:>6}  {s.drop_passes:>6}  {s.ops:>9}  {s.xfers:>7}  {s.racks:>6}  {s.hooks:>6}  {s.time:>10.1f}  {s.self_time:>10.1f}")
+		total = self.sections[()].time
+		lines.append(f"total: {len(self.passes)} carriage passes, ~{total:.0f}s ({total/60:.1f} min)")
+		return "\n".join(lines)
+
+
+def loadOps(source: Union["Writer", OpBuffer, str, Path, IO]) -> OpBuffer:
+	'''
+	Returns the op log for `source`: a Writer, an `OpBuffer`, or a knitout file (`.k`, optionally compressed) or binary op file (`.kops`) to read.
+	'''
+	if isinstance(source, OpBuffer): ops = source
+	elif hasattr(source, "operations"): ops = source.operations
+	elif isinstance(source, (str, Path)) and outputFormat(source)[1]: return OpFile(source).toOpBuffer()
+	else:
+		ops = OpBuffer()
+		with KnitoutReader(source) as reader:
+			reader.readInto(ops)
+		return ops
+	#
+	if ops.spooled_ct: raise ValueError("Some of the operations were flushed to the output already (by a streaming Writer); estimate from the output file instead.")
+	return ops
+
+
+def carriagePasses(source: Union["Writer", OpBuffer, str, Path, IO], model: Optional[MachineModel]=None) -> MachineTimeEstimate:
+	'''
+	Groups a program's operations into carriage passes, and estimates the machine time for each one, and for each section of the program.
+
+	Consecutive operations go in the same pass as long as they're of the same kind (knit/tuck/miss/split, xfer, or drop), and for knit passes, in the same direction with the same carriers, in order along that direction.  A pass also ends at any racking, stitch/speed number, or carrier operation, at any other extension or pause, and when a needle would be used a second time.  The time for racking changes and carrier operations is added between passes.
+
+	Sections are taken from the `;begin ...`/`;end ...` comments the library emits around each function's operations (e.g., `;begin f-bed jersey`), and each pass is attributed to the section it starts in.  An `end` comment ends the innermost section with that name (along with any sections nested in it), or if there isn't one, the innermost section.  A `begin` comment whose name has a prefix ending in `:` (e.g., `;begin swatch: jersey (20x40)`, which is never ended) first ends the innermost section with the same prefix (along with any sections nested in it).
+
+	Parameters:
+	----------
+	* `source` (Writer, OpBuffer, str, Path, or file-like): the program: a Writer (or its op log, which must still hold all of the operations), or a knitout or binary op file.
+	* `model` (MachineModel, optional): timing model. Defaults to `None` (aka `MachineModel()`).
+
+	Returns:
+	-------
+	* (MachineTimeEstimate): the estimate.
+	'''
+	if model is None: model = MachineModel()
+	ops = loadOps(source)
+	strings = ops.strings
+	op_col, d_col, bed_col, n_col, bed2_col, n2_col, cs_col = (col.tolist() for col in ops.columns(0, len(ops)))
+	#
+	passes: List[CarriagePass] = []
+	sections: Dict[Tuple[str, ...], SectionStats] = {(): SectionStats()}
+	section: Tuple[str, ...] = ()
+	rack, stitch_number, speed_number = 0, None, None
+	cur: Optional[CarriagePass] = None
+	#
+	def addTime(key: Tuple[str, ...], time: float) -> None:
+		sections[key].self_time += time
+		for i in range(len(key)+1):
+			sections[key[:i]].time += time
+	#
+	def endPass(i: int) -> None:
+		nonlocal cur
+		if cur is None: return
+		cur.end = i
+		cur.time = model.passTime(cur)
+		cur.used = None
+		passes.append(cur)
+		for j in range(len(cur.section)+1):
+			s = sections[cur.section[:j]]
+			s.passes += 1
+			setattr(s, f"{cur.kind}_passes", getattr(s, f"{cur.kind}_passes")+1)
+			s.ops += cur.op_ct
+			s.xfers += cur.xfer_ct
+		addTime(cur.section, cur.time)
+		cur = None
+	#
+	def count(name: str, time: float) -> None: # (racking changes and carrier operations)
+		for j in range(len(section)+1):
+			s = sections[section[:j]]
+			setattr(s, name, getattr(s, name)+1)
+		addTime(section, time)
+	#
+	for i, op in enumerate(op_col):
+		if op == Op.KNIT or op == Op.TUCK or op == Op.MISS or op == Op.SPLIT:
+			direction, carriers, bed, n = DIRECTIONS[d_col[i]], strings[cs_col[i]], bed_col[i], n_col[i]
+			pos = n+rack if BEDS[bed][0] == "b" else n
+			bns = ((bed, n), (bed2_col[i], n2_col[i])) if op == Op.SPLIT else ((bed, n),)
+			if cur is None or cur.kind != "knit" or cur.direction != direction or cur.carriers != carriers or not cur.fits(pos, *bns):
+				endPass(i)
+				cur = CarriagePass("knit", direction, carriers, rack, stitch_number, speed_number, i, section)
+			cur.add(pos, *bns, xfer=(op == Op.SPLIT))
+		elif op == Op.XFER or op == Op.DROP:
+			kind = "xfer" if op == Op.XFER else "drop"
+			bed, n = bed_col[i], n_col[i]
+			pos = n+rack if BEDS[bed][0] == "b" else n
+			bns = ((bed, n), (bed2_col[i], n2_col[i])) if op == Op.XFER else ((bed, n),)
+			if cur is None or cur.kind != kind or not cur.fits(pos, *bns):
+				endPass(i)
+				cur = CarriagePass(kind, None, None, rack, stitch_number, speed_number, i, section)
+			cur.add(pos, *bns, xfer=(op == Op.XFER))
+		elif op == Op.RAW:
+			line = strings[cs_col[i]]
+			if line.startswith(";"): # (comments don't affect the carriage)
+				if line.startswith(";begin "):
+					name = line[len(";begin "):].strip()
+					if ":" in name: # (e.g., `;begin swatch: ...` or `;begin panel: ...`, which aren't ended, so the next one ends the last one)
+						prefix = name[:name.index(":")+1]
+						for j in range(len(section)-1, -1, -1):
+							if section[j].startswith(prefix):
+								section = section[:j]
+								break
+					section = section+(name,)
+					if section not in sections: sections[section] = SectionStats()
+				elif line.startswith(";end ") and len(section):
+					name = line[len(";end "):].strip()
+					if name in section: section = section[:len(section)-1-section[::-1].index(name)] # (ending any nested sections that weren't ended)
+					else: section = section[:-1] # (some functions' `end` comments don't quite match their `begin` ones, e.g. `;begin rib (fb)`/`;end f-bed rib (ffbb)`)
+			else: endPass(i) # (pauses, or extensions without their own opcode)
+		else:
+			endPass(i)
+			if op == Op.RACK:
+				value = parseArg(strings[cs_col[i]])
+				if value != rack: count("racks", model.rack_time)
+				rack = value
+			elif op == Op.STITCH_NUMBER: stitch_number = parseArg(strings[cs_col[i]])
+			elif op == Op.SPEED_NUMBER: speed_number = parseArg(strings[cs_col[i]])
+			elif op == Op.INHOOK or op == Op.RELEASEHOOK or op == Op.OUTHOOK: count("hooks", model.hook_time)
+			elif op == Op.IN or op == Op.OUT: count("hooks", model.carrier_time)
+	endPass(len(op_col))
+	return MachineTimeEstimate(passes, sections)
+
+
+def estimateMachineTime(source: Union["Writer", OpBuffer, str, Path, IO], model: Optional[MachineModel]=None) -> float:
+	'''
+	Returns the estimated time (in s) to knit a program on the machine (see `carriagePasses`, which also breaks it down per pass and per section).
+	'''
+	return carriagePasses(source, model).time
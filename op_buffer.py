@@ -0,0 +1,450 @@
+from __future__ import annotations #so we don't have to worry about situations that would require forward declarations
+from typing import Optional, Union, Iterator, List, Tuple, Dict, IO
+from array import array
+from enum import IntEnum
+import tempfile
+import shutil
+
+import numpy as np
+
+
+class Op(IntEnum):
+	RAW = 0 # any line we don't have a dedicated opcode for (comments, pauses, other extensions); stored as an interned string
+	KNIT = 1
+	TUCK = 2
+	MISS = 3
+	XFER = 4
+	SPLIT = 5
+	DROP = 6
+	RACK = 7
+	IN = 8
+	INHOOK = 9
+	OUT = 10
+	OUTHOOK = 11
+	RELEASEHOOK = 12
+	STITCH_NUMBER = 13
+	SPEED_NUMBER = 14
+
+
+# knitout names for each opcode (`None` for RAW)
+OP_NAMES = (None, "knit", "tuck", "miss", "xfer", "split", "drop", "rack", "in", "inhook", "out", "outhook", "releasehook", "x-stitch-number", "x-speed-number")
+
+# encodings for the `d`, `bed`, and `bed2` columns (index 0 means n/a)
+DIRECTIONS = ("", "+", "-")
+DIRECTION_IDS = {"+": 1, "-": 2}
+
+BEDS = ("", "f", "b", "fs", "bs")
+BED_IDS = {"f": 1, "b": 2, "fs": 3, "bs": 4}
+
+CARRIER_OPS = (Op.IN, Op.INHOOK, Op.OUT, Op.OUTHOOK, Op.RELEASEHOOK)
+ARG_OPS = (Op.RACK, Op.STITCH_NUMBER, Op.SPEED_NUMBER)
+
+
+class OpBuffer:
+	'''
+	Compact, column-oriented store for knitout operations.
+
+	Each operation is one row across typed `array` columns:
+	* `op`: opcode (see `Op`).
+	* `d`: direction id (see `DIRECTIONS`).
+	* `bed`, `n`: bed id (see `BEDS`) and needle.
+	* `bed2`, `n2`: second bed id and needle (for `xfer` and `split`).
+	* `cs`: id of an interned string; the carrier set for ops that use one, the argument for `rack`/extensions, or the whole line for `Op.RAW`.
+
+	Text is only rendered when the buffer is iterated or written out.  Appending a plain string (e.g., from the base knitout Writer's `comment` or `pause` methods) stores it as an `Op.RAW` line, so this can be used anywhere a list of lines was used before.
+
+	Repeated blocks of operations (e.g., the same couple of passes knitted over and over) can be stored run-length encoded with `addRepeat`: the block's rows are stored once, along with how many more times they repeat (and how far their needles shift each time), and are only expanded when the buffer is rendered.  Indexing, iterating, and `len` all see the expanded operations.
+
+	If `buffer_size` is passed, the buffer renders its rows out to a temporary spool file every `buffer_size` operations (rows actually stored, so repeats don't count towards it), so memory use stays flat no matter how long the program is (NOTE: once spooled, operations can no longer be accessed by index).
+
+	Parameters:
+	----------
+	* `buffer_size` (int, optional): number of operations to hold in memory before flushing them to the spool file. Defaults to `None` (aka never flush).
+	* `dir` (str, optional): directory to create the spool file in (ideally on the same disk as the final output). Defaults to `None` (aka the system temp directory).
+	'''
+	def __init__(self, buffer_size: Optional[int]=None, dir: Optional[str]=None):
+		self.op = array("B")
+		self.d = array("B")
+		self.bed = array("B")
+		self.n = array("i")
+		self.bed2 = array("B")
+		self.n2 = array("i")
+		self.cs = array("I")
+		#
+		self.repeats: List[Tuple[int, int, int, int]] = [] # (start row, end row, times, n_delta) for each repeat block, in row order
+		self.repeated_ct = 0 # number of (in-memory) operations that are stored as repeats
+		#
+		self.strings = []
+		self.string_ids = {}
+		#
+		self.buffer_size = buffer_size
+		self.spool = None if buffer_size is None else tempfile.TemporaryFile(mode="w+", dir=dir)
+		self.spooled_ct = 0
+
+	@staticmethod
+	def increment(n):
+		pass
+
+	@staticmethod
+	def beforeFlush():
+		pass
+
+	def intern(self, s: str) -> int:
+		try:
+			return self.string_ids[s]
+		except KeyError:
+			i = self.string_ids[s] = len(self.strings)
+			self.strings.append(s)
+			return i
+
+	def addOp(self, op: int, d: int=0, bed: int=0, n: int=0, bed2: int=0, n2: int=0, cs: int=0) -> None:
+		self.op.append(op)
+		self.d.append(d)
+		self.bed.append(bed)
+		self.n.append(n)
+		self.bed2.append(bed2)
+		self.n2.append(n2)
+		self.cs.append(cs)
+		#
+		self.increment(1)
+		if self.buffer_size is not None and len(self.op) >= self.buffer_size: self.flush()
+
+	def addOps(self, op: int, d: int, bed: Union[int, np.ndarray], n: np.ndarray, bed2: Union[int, np.ndarray]=0, n2: Union[int, np.ndarray]=0, cs: int=0) -> None:
+		'''
+		Batch version of `addOp`: adds one operation per needle in `n` (in order), with each of the other columns given either as a single value (shared by every operation) or as an array (one value per operation).
+		'''
+		n = np.asarray(n)
+		ct = len(n)
+		start = 0
+		while start < ct:
+			if self.buffer_size is None: end = ct
+			else: end = min(ct, start+self.buffer_size-len(self.op)) # (so flushes happen at the same points as with `addOp`)
+			#
+			for col, vals in ((self.op, op), (self.d, d), (self.bed, bed), (self.n, n), (self.bed2, bed2), (self.n2, n2), (self.cs, cs)):
+				if np.ndim(vals) == 0: col.extend(array(col.typecode, [vals]) * (end-start))
+				else: col.frombytes(np.asarray(vals[start:end], dtype=col.typecode).tobytes())
+			#
+			self.increment(end-start)
+			if self.buffer_size is not None and len(self.op) >= self.buffer_size: self.flush()
+			start = end
+
+	def addRepeat(self, length: int, times: int, n_delta: int=0) -> bool:
+		'''
+		Repeats the last `length` operations `times` more times (with their needles shifted by another `n_delta` each time), storing the repeats as a reference to those rows rather than as copies.
+
+		Parameters:
+		----------
+		* `length` (int): number of operations in the block to repeat (the last `length` operations added).
+		* `times` (int): number of times to repeat the block (after the copy that was already added).
+		* `n_delta` (int, optional): how much the needles in the block shift with each repeat. Defaults to `0`.
+
+		Returns:
+		-------
+		* (bool): whether the repeats were added; `False` (and nothing is added) if the block isn't all in memory (e.g., part of it was flushed already) or overlaps an earlier repeat block.
+		'''
+		if length < 1 or times < 1: return True
+		end = len(self.op)
+		start = end-length
+		if start < (self.repeats[-1][1] if len(self.repeats) else 0): return False
+		#
+		self.repeats.append((start, end, times, n_delta))
+		self.repeated_ct += length*times
+		self.increment(length*times)
+		return True
+
+	def addBuffer(self, other: OpBuffer) -> None:
+		'''
+		Appends the (in-memory) operations of another op buffer, in order, keeping its repeat blocks as repeats where possible.
+		'''
+		cs_ids = np.array([self.intern(s) for s in other.strings] or [0], dtype=np.int64)
+		op, d, bed, n, bed2, n2, cs = [np.frombuffer(col, dtype=col.typecode) if len(col) else np.zeros(0, dtype=col.typecode) for col in (other.op, other.d, other.bed, other.n, other.bed2, other.n2, other.cs)]
+		#
+		def addRows(start: int, end: int, n_delta: int=0) -> None:
+			if start >= end: return
+			ns, ns2 = n[start:end], n2[start:end]
+			if n_delta:
+				ops = op[start:end]
+				ns = np.where((ops >= Op.KNIT) & (ops <= Op.DROP), ns+n_delta, ns)
+				ns2 = np.where((ops == Op.XFER) | (ops == Op.SPLIT), ns2+n_delta, ns2)
+			self.addOps(op[start:end], d[start:end], bed[start:end], ns, bed2[start:end], ns2, cs_ids[cs[start:end]])
+		#
+		i = 0
+		for start, end, times, n_delta in other.repeats:
+			addRows(i, end)
+			if not self.addRepeat(end-start, times, n_delta): # (e.g., if part of the block was flushed already, so just add copies)
+				for r in range(1, times+1):
+					addRows(start, end, r*n_delta)
+			i = end
+		addRows(i, len(op))
+
+	def copyOps(self, start: int=0) -> OpBuffer:
+		'''
+		Returns a new op buffer holding copies of the (in-memory) operations from index `start` (with repeats expanded) on, keeping the repeat blocks that are entirely within them as repeats.
+		'''
+		res = OpBuffer()
+		res.strings, res.string_ids = list(self.strings), dict(self.string_ids)
+		#
+		def addRange(a: int, b: int) -> None: # (in-memory operations `a:b`, with repeats expanded)
+			if a < b: res.addOps(*self.columns(a, b))
+		#
+		pos, row = 0, 0 # (position, with repeats expanded, of the first row after the last repeat block)
+		for rep_start, rep_end, times, n_delta in self.repeats:
+			pos_end = pos+rep_end-row
+			addRange(max(start, pos), pos_end)
+			size = (rep_end-rep_start)*times
+			if start <= pos_end-(rep_end-rep_start): res.addRepeat(rep_end-rep_start, times, n_delta) # (the block's rows were just added)
+			else: addRange(max(start, pos_end), pos_end+size)
+			pos, row = pos_end+size, rep_end
+		addRange(max(start, pos), pos+len(self.op)-row)
+		return res
+
+	def remapped(self, n_offset: int=0, carriers: Optional[Dict[str, str]]=None) -> OpBuffer:
+		'''
+		Returns a copy of the (in-memory) operations with `n_offset` added to every needle, and carriers renamed according to `carriers` (e.g., to place a panel that was generated on its own next to another one), keeping repeat blocks as repeats.
+		'''
+		res = self.copyOps()
+		if not len(res.op): return res
+		#
+		op = np.frombuffer(res.op, dtype=res.op.typecode)
+		if n_offset:
+			n, n2 = np.frombuffer(res.n, dtype=res.n.typecode), np.frombuffer(res.n2, dtype=res.n2.typecode)
+			n[(op >= Op.KNIT) & (op <= Op.DROP)] += n_offset
+			n2[(op == Op.XFER) | (op == Op.SPLIT)] += n_offset
+		if carriers:
+			cs = np.frombuffer(res.cs, dtype=res.cs.typecode)
+			rows = np.flatnonzero(((op >= Op.KNIT) & (op <= Op.SPLIT) & (op != Op.XFER)) | np.isin(op, CARRIER_OPS))
+			ids = {i: res.intern(" ".join(carriers.get(c, c) for c in res.strings[i].split(" "))) for i in np.unique(cs[rows]).tolist()}
+			cs[rows] = [ids[i] for i in cs[rows].tolist()]
+		return res
+
+	def append(self, line: str) -> None:
+		self.addOp(Op.RAW, cs=self.intern(line))
+
+	def extend(self, lines) -> None:
+		for line in lines:
+			self.append(line)
+
+	def __iadd__(self, lines):
+		self.extend(lines)
+		return self
+
+	def __len__(self) -> int:
+		return self.spooled_ct + len(self.op) + self.repeated_ct
+
+	def render(self, i: int, n_delta: int=0) -> str:
+		'''
+		Returns the knitout line for the operation stored in (in-memory) row `i`, with its needles shifted by `n_delta`.
+		'''
+		op = self.op[i]
+		if op == Op.RAW: return self.strings[self.cs[i]]
+		elif op <= Op.MISS: return f"{OP_NAMES[op]} {DIRECTIONS[self.d[i]]} {BEDS[self.bed[i]]}{self.n[i]+n_delta} {self.strings[self.cs[i]]}"
+		elif op == Op.XFER: return f"xfer {BEDS[self.bed[i]]}{self.n[i]+n_delta} {BEDS[self.bed2[i]]}{self.n2[i]+n_delta}"
+		elif op == Op.SPLIT: return f"split {DIRECTIONS[self.d[i]]} {BEDS[self.bed[i]]}{self.n[i]+n_delta} {BEDS[self.bed2[i]]}{self.n2[i]+n_delta} {self.strings[self.cs[i]]}"
+		elif op == Op.DROP: return f"drop {BEDS[self.bed[i]]}{self.n[i]+n_delta}"
+		else: return f"{OP_NAMES[op]} {self.strings[self.cs[i]]}" # carrier ops, rack, and extensions
+
+	def locate(self, i: int) -> Tuple[int, int]:
+		'''
+		Returns the row, and needle shift, of the (in-memory) operation at index `i` (with repeats expanded).
+		'''
+		for start, end, times, n_delta in self.repeats:
+			if i < end: return i, 0
+			ct = (end-start)*times
+			if i < end+ct:
+				r, j = divmod(i-end, end-start)
+				return start+j, (r+1)*n_delta
+			i -= ct
+		return i, 0
+
+	def rows(self) -> Iterator[Tuple[int, int]]:
+		'''
+		Yields the row, and needle shift, of each (in-memory) operation, in order (with repeats expanded).
+		'''
+		i = 0
+		for start, end, times, n_delta in self.repeats:
+			for j in range(i, end):
+				yield j, 0
+			for r in range(1, times+1):
+				for j in range(start, end):
+					yield j, r*n_delta
+			i = end
+		for j in range(i, len(self.op)):
+			yield j, 0
+
+	def __getitem__(self, i: Union[int, slice]) -> Union[str, List[str]]:
+		ct = len(self.op)+self.repeated_ct
+		if isinstance(i, slice): return [self.render(*self.locate(j)) for j in range(*i.indices(ct))]
+		else:
+			if i < 0: i += ct
+			if not 0 <= i < ct: raise IndexError("operation index out of range")
+			return self.render(*self.locate(i))
+
+	def __iter__(self) -> Iterator[str]:
+		for i, n_delta in self.rows():
+			yield self.render(i, n_delta)
+
+	def chunks(self) -> Iterator[str]:
+		'''
+		Yields the text of the (in-memory) operations, one line (ending in a newline) per operation, in chunks.  Each repeat block is only rendered once (or once per repeat, if its needles shift), so writing out a block that repeats many times is just writing the same string over again.
+		'''
+		i = 0
+		for start, end, times, n_delta in self.repeats:
+			yield ''.join(self.render(j)+'\n' for j in range(i, end))
+			if n_delta == 0:
+				block = ''.join(self.render(j)+'\n' for j in range(start, end))
+				for _ in range(times):
+					yield block
+			else:
+				for r in range(1, times+1):
+					yield ''.join(self.render(j, r*n_delta)+'\n' for j in range(start, end))
+			i = end
+		if i < len(self.op): yield ''.join(self.render(j)+'\n' for j in range(i, len(self.op)))
+
+	def columns(self, start: int, end: int) -> Tuple[np.ndarray, ...]:
+		'''
+		Returns the `op`, `d`, `bed`, `n`, `bed2`, `n2`, and `cs` columns for the (in-memory) operations `start:end` (with repeats expanded, and their needles shifted), as numpy arrays.
+		'''
+		cols = [np.frombuffer(col, dtype=col.typecode) if len(col) else np.zeros(0, dtype=col.typecode) for col in (self.op, self.d, self.bed, self.n, self.bed2, self.n2, self.cs)]
+		if not len(self.repeats): return tuple(col[start:end] for col in cols)
+		#
+		idxs, shifts = [], []
+		i = 0
+		for rep_start, rep_end, times, n_delta in self.repeats:
+			idxs += [np.arange(i, rep_end), np.tile(np.arange(rep_start, rep_end), times)]
+			shifts += [np.zeros(rep_end-i, dtype=np.int64), np.repeat(np.arange(1, times+1)*n_delta, rep_end-rep_start)]
+			i = rep_end
+		idxs.append(np.arange(i, len(self.op)))
+		shifts.append(np.zeros(len(self.op)-i, dtype=np.int64))
+		idx, shift = np.concatenate(idxs)[start:end], np.concatenate(shifts)[start:end]
+		#
+		op, d, bed, n, bed2, n2, cs = [col[idx] for col in cols]
+		if shift.any():
+			n = np.where((op >= Op.KNIT) & (op <= Op.DROP), n+shift, n).astype(n.dtype)
+			n2 = np.where((op == Op.XFER) | (op == Op.SPLIT), n2+shift, n2).astype(n2.dtype)
+		return op, d, bed, n, bed2, n2, cs
+
+	def count(self, op: Optional[int]=None) -> int:
+		'''
+		Number of (in-memory) operations with opcode `op` (or all of them, if `op` is `None`).
+		'''
+		if op is None: return len(self.op)+self.repeated_ct
+		ct = self.op.count(op)
+		for start, end, times, _ in self.repeats:
+			ct += self.op[start:end].count(op)*times
+		return ct
+
+	def truncate(self, ct: int) -> None:
+		'''
+		Removes every operation after the first `ct` (e.g., to roll back to a checkpoint).  A repeat block that is cut partway through keeps its whole repeats, and the rest of the last one is stored as plain rows.
+
+		Raises:
+		------
+		* ValueError: if some of the operations to remove were flushed already.
+		'''
+		i = ct-self.spooled_ct
+		if i < 0: raise ValueError("Can't remove operations that were flushed already.", ct)
+		removed = len(self)-ct
+		if removed <= 0: return
+		#
+		keep = i # (in-memory operations to keep, with repeats expanded)
+		repeats, tail = [], None
+		for start, end, times, n_delta in self.repeats:
+			if i <= end:
+				row = i
+				break
+			size = (end-start)*times
+			if i <= end+size:
+				r, rem = divmod(i-end, end-start)
+				if r: repeats.append((start, end, r, n_delta))
+				if rem: tail = self.columns(keep-rem, keep) # (the part of the last repeat that's kept)
+				row = end
+				break
+			repeats.append((start, end, times, n_delta))
+			i -= size
+		else: row = i
+		#
+		for col in (self.op, self.d, self.bed, self.n, self.bed2, self.n2, self.cs):
+			del col[row:]
+		self.repeats = repeats
+		self.repeated_ct = sum((end-start)*times for start, end, times, _ in repeats)
+		if tail is not None:
+			for col, vals in zip((self.op, self.d, self.bed, self.n, self.bed2, self.n2, self.cs), tail):
+				col.frombytes(np.asarray(vals, dtype=col.typecode).tobytes())
+		#
+		self.increment(-removed)
+
+	def clearColumns(self) -> None:
+		for col in (self.op, self.d, self.bed, self.n, self.bed2, self.n2, self.cs):
+			del col[:]
+		self.repeats = []
+		self.repeated_ct = 0
+
+	def flush(self) -> None:
+		if self.spool is not None and len(self.op):
+			self.beforeFlush()
+			for chunk in self.chunks():
+				self.spool.write(chunk)
+			self.spooled_ct += len(self.op)+self.repeated_ct
+			self.clearColumns()
+
+	def writeTo(self, out: IO) -> None:
+		'''
+		Writes all operations (spooled and in-memory), one per line, to the file-like object `out`.
+		'''
+		if self.spool is not None and len(self):
+			self.flush()
+			self.spool.seek(0)
+			shutil.copyfileobj(self.spool, out)
+			self.spool.seek(0, 2) # back to the end so we can keep appending
+		elif len(self.op):
+			for chunk in self.chunks():
+				out.write(chunk)
+		else: out.write('\n')
+
+	def close(self) -> None:
+		if self.spool is not None: self.spool.close()
+
+
+class PassTemplate:
+	'''
+	A pass of `knit`, `tuck`, and `miss` operations, resolved once (as segments of operations that share an opcode) so it can be added to a Writer any number of times with `Writer.addTemplate` or `Writer.replayPasses`, without redoing the work of figuring out which needles the pass uses.
+
+	Templates don't include carriers (those are passed when the template is added), so the same template can be reused with different carriers.
+
+	Parameters:
+	----------
+	* `direction` (str): direction of the pass (`"+"` or `"-"`).
+	'''
+	def __init__(self, direction: str):
+		self.direction = direction
+		self.segments = [] # (op, beds, needles), where `beds` is a single bed or one bed per needle
+		self._columns = None
+
+	def add(self, op: Op, beds, needles: np.ndarray) -> None:
+		'''
+		Appends a segment of `op` operations on `needles` (in order), where `beds` is either the bed for all of the needles or one bed per needle.  Empty segments are skipped.
+		'''
+		assert op in (Op.KNIT, Op.TUCK, Op.MISS), f"can't add '{op.name}' operations to a pass template"
+		needles = np.asarray(needles, dtype=np.int64)
+		if not len(needles): return
+		if not isinstance(beds, str): assert len(beds) == len(needles), "need one bed per needle"
+		self.segments.append((op, beds, needles))
+		self._columns = None
+
+	def __len__(self) -> int:
+		return sum(len(needles) for _, _, needles in self.segments)
+
+	def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+		'''
+		Returns the `op`, `bed`, and `n` columns for the whole pass (computed once, and cached).
+		'''
+		if self._columns is None:
+			ops, beds, ns = [], [], []
+			for op, seg_beds, needles in self.segments:
+				ops.append(np.full(len(needles), op, dtype=np.uint8))
+				if isinstance(seg_beds, str): beds.append(np.full(len(needles), BED_IDS[seg_beds], dtype=np.uint8))
+				else: beds.append(np.array([BED_IDS[bed] for bed in seg_beds], dtype=np.uint8))
+				ns.append(needles)
+			if ops: self._columns = (np.concatenate(ops), np.concatenate(beds), np.concatenate(ns))
+			else: self._columns = (np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int64))
+		return self._columns
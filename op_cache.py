@@ -0,0 +1,222 @@
+from typing import Optional, Union, Callable, Any
+from collections.abc import Mapping, Set
+from functools import lru_cache, wraps
+from pathlib import Path
+from enum import Enum
+import tempfile
+import warnings
+import hashlib
+import inspect
+import marshal
+import pickle
+import io
+import os
+
+import numpy as np
+
+#===============================================================================
+import sys
+
+## Standalone boilerplate before relative imports
+if not __package__: #remove #?
+	DIR = Path(__file__).resolve().parent
+	sys.path.insert(0, str(DIR.parent))
+	__package__ = DIR.name
+#===============================================================================
+
+from .op_file import OpFile, writeOpFile
+from .knitlib_knitout import KnitoutException
+
+
+# Writer state that knitting functions can change (and so is stored with each cache entry, and applied on a hit)
+STATE_KEYS = ("bns", "carrier_map", "rack_value", "stitch_number", "speed_number", "hook_active", "use_hook")
+
+
+def canonical(value) -> str:
+	'''
+	Returns a canonical string for `value`, for hashing: equal values give the same string, regardless of e.g. the order of items in a dict or set.
+
+	Raises:
+	------
+	* TypeError: if `value` is of a type that can't be reliably hashed this way.
+	'''
+	if value is None or isinstance(value, (bool, int, float, str, bytes)): return f"{type(value).__name__}:{value!r}"
+	elif isinstance(value, np.generic): return canonical(value.item())
+	elif isinstance(value, Enum): return f"{type(value).__qualname__}.{value.name}"
+	elif isinstance(value, np.ndarray): return f"ndarray:{value.dtype.str}:{value.shape}:{hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()}"
+	elif isinstance(value, range): return f"range:{value.start}:{value.stop}:{value.step}"
+	elif isinstance(value, (list, tuple)): return f"{type(value).__name__}[" + ",".join(canonical(v) for v in value) + "]"
+	elif isinstance(value, Mapping): return "map{" + ",".join(sorted(f"{canonical(key)}:{canonical(v)}" for key, v in value.items())) + "}"
+	elif isinstance(value, Set): return "set{" + ",".join(sorted(canonical(v) for v in value)) + "}"
+	elif callable(value) and hasattr(value, "__qualname__"): return f"func:{getattr(value, '__module__', '')}.{value.__qualname__}"
+	else: raise TypeError(f"Can't hash a value of type '{type(value).__name__}' for the op cache.")
+
+
+@lru_cache(maxsize=None)
+def libraryVersion() -> str:
+	'''
+	Hash of the knitlib source files, so cache entries are invalidated whenever the library changes.
+	'''
+	h = hashlib.sha256()
+	for fn in sorted(Path(__file__).resolve().parent.glob("*.py")):
+		if not fn.is_file(): continue # (e.g., a submodule that isn't checked out)
+		h.update(fn.name.encode())
+		h.update(fn.read_bytes())
+	return h.hexdigest()
+
+
+def writerKey(k) -> str:
+	'''
+	Returns a canonical string for the parts of the Writer's state that knitting functions can depend on: the loops on each needle (in the order they were added), carrier positions, rack, stitch/speed numbers, hook, and the validation/exception handling settings.
+	'''
+	bns = []
+	for bed, needle in k.bns.keys():
+		arrs = k.bns.beds[bed]
+		i = needle-arrs.offset
+		bns.append((bed, needle, int(arrs.loop_ct[i]), int(arrs.stitch_ct[i]), int(arrs.init_row[i])))
+	#
+	exceptions = [(e.name, e.value.ENABLED, e.value.ERROR, sorted((name, val) for name, val in vars(e.value).items() if name.startswith("MAX_"))) for e in KnitoutException]
+	return canonical([k.carriers, k.validation_enabled, bns, [(c, carrier.direction, carrier.bed, carrier.needle) for c, carrier in k.carrier_map.items()], k.rack_value, k.stitch_number, k.speed_number, k.hook_active, k.use_hook, exceptions])
+
+
+class OpCache:
+	'''
+	Content-addressed, on-disk cache for the blocks of operations emitted by knitting functions (stitch patterns, castons, bindoffs, etc.), so batches of programs that share sections (e.g., size or color variants) only generate each distinct section once.
+
+	Each call is keyed on a hash of the function (along with the knitlib source), its arguments (other than the Writer), and the Writer's incoming state (see `writerKey`).  On a miss, the function is run as usual, and the operations it emitted (in the binary op format, so repeat blocks stay compact), its return value, and the Writer's resulting state are stored.  On a hit, the stored block is spliced into the op log and the resulting state is applied, without running the function; the program comes out the same either way, and the spliced operations are validated as usual.
+
+	Calls that can't be cached safely just run the function: ones with arguments that can't be hashed (see `canonical`), ones that issue warnings (which are reported against particular line numbers), ones whose operations were flushed by a streaming Writer before the call returned, and ones that return something that can't be pickled.
+
+	Entries are stored one per file, written atomically (so several processes can share a cache directory), and the least recently used ones are evicted once the cache grows past `max_bytes`.
+
+	NOTE: cache entries are pickled, so only use a cache directory you trust.
+
+	Parameters:
+	----------
+	* `dir` (str or Path): the cache directory (created if it doesn't exist).
+	* `max_bytes` (int, optional): size limit for the cache, in bytes. Defaults to `256*1024**2`.
+	'''
+	VERSION = 1
+
+	def __init__(self, dir: Union[str, Path], max_bytes: int=256*1024**2):
+		self.dir = Path(dir).expanduser()
+		self.dir.mkdir(parents=True, exist_ok=True)
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+
+	def key(self, func: Callable, k, *args, **kwargs) -> Optional[str]:
+		'''
+		Returns the cache key for calling `func(k, *args, **kwargs)` in the Writer's current state, or `None` if the call can't be cached (e.g., since some of the arguments can't be hashed).
+		'''
+		try:
+			bound = inspect.signature(func).bind(k, *args, **kwargs)
+			bound.apply_defaults()
+			arguments = list(bound.arguments.items())[1:] # (everything but the Writer)
+			code = getattr(func, "__code__", None)
+			func_id = canonical([func, hashlib.sha256(marshal.dumps(code)).hexdigest() if code is not None else None])
+			key = canonical([self.VERSION, libraryVersion(), func_id, arguments, writerKey(k)])
+		except (TypeError, ValueError): return None
+		return hashlib.sha256(key.encode()).hexdigest()
+
+	def path(self, key: str) -> Path:
+		return self.dir / f"{key}.pkl"
+
+	def get(self, key: str) -> Optional[dict]:
+		'''
+		Returns the cache entry for `key`, or `None` if there isn't one (marking it as recently used).
+		'''
+		path = self.path(key)
+		try:
+			with open(path, "rb") as f:
+				entry = pickle.load(f)
+			os.utime(path)
+		except FileNotFoundError: return None
+		except Exception: # (corrupt entry)
+			path.unlink(missing_ok=True)
+			return None
+		#
+		if not isinstance(entry, dict) or entry.get("version") != self.VERSION: return None
+		return entry
+
+	def put(self, key: str, entry: dict) -> None:
+		'''
+		Stores a cache entry (atomically), and evicts the least recently used entries if the cache is over its size limit.
+		'''
+		entry["version"] = self.VERSION
+		with tempfile.NamedTemporaryFile(dir=self.dir, suffix=".tmp", delete=False) as f:
+			pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(f.name, self.path(key))
+		self.evict()
+
+	def evict(self) -> None:
+		entries = []
+		for entry in os.scandir(self.dir):
+			if entry.name.endswith(".pkl"):
+				try:
+					stat = entry.stat()
+				except FileNotFoundError: continue # (evicted by another process)
+				entries.append((stat.st_mtime, stat.st_size, entry.path))
+		#
+		total = sum(size for _, size, _ in entries)
+		for _, size, path in sorted(entries):
+			if total <= self.max_bytes: break
+			try:
+				os.remove(path)
+			except FileNotFoundError: pass
+			total -= size
+
+	def clear(self) -> None:
+		'''
+		Removes every entry from the cache.
+		'''
+		for path in self.dir.glob("*.pkl"):
+			path.unlink(missing_ok=True)
+
+	def call(self, func: Callable, k, *args, **kwargs) -> Any:
+		'''
+		Calls `func(k, *args, **kwargs)` through the cache: on a hit, the stored operations are added to `k` and its state is updated, without running `func`.
+
+		Returns:
+		-------
+		* (any): what `func` returns.
+		'''
+		key = self.key(func, k, *args, **kwargs)
+		if key is None: return func(k, *args, **kwargs)
+		#
+		entry = self.get(key)
+		if entry is not None:
+			self.hits += 1
+			k.operations.addBuffer(OpFile(io.BytesIO(entry["ops"])).toOpBuffer())
+			k.setState(entry["state"])
+			return entry["result"]
+		#
+		self.misses += 1
+		start = len(k.operations)
+		try:
+			with warnings.catch_warnings(record=True) as caught:
+				warnings.simplefilter("always")
+				result = func(k, *args, **kwargs)
+		finally:
+			for w in caught: # (pass them on, subject to the caller's filters)
+				warnings.warn_explicit(w.message, w.category, w.filename, w.lineno)
+		if len(caught) or k.operations.spooled_ct > start: return result
+		#
+		try:
+			pickled_result = pickle.dumps(result)
+		except Exception: return result
+		#
+		buf = io.BytesIO()
+		writeOpFile(buf, [], k.operations.copyOps(start-k.operations.spooled_ct))
+		state = k.getState()
+		self.put(key, {"ops": buf.getvalue(), "state": {name: state[name] for name in STATE_KEYS}, "result": pickle.loads(pickled_result)})
+		return result
+
+	def wrap(self, func: Callable) -> Callable:
+		'''
+		Returns a version of `func` (which takes the Writer as its first argument) that is called through the cache.
+		'''
+		@wraps(func)
+		def cached(k, *args, **kwargs):
+			return self.call(func, k, *args, **kwargs)
+		return cached
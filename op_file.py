@@ -0,0 +1,252 @@
+from typing import Optional, Union, Tuple, List, Iterator, IO
+from contextlib import contextmanager
+from pathlib import Path
+import struct
+import gzip
+import io
+
+import numpy as np
+
+#===============================================================================
+import sys
+
+## Standalone boilerplate before relative imports
+if not __package__: #remove #?
+	DIR = Path(__file__).resolve().parent
+	sys.path.insert(0, str(DIR.parent))
+	__package__ = DIR.name
+#===============================================================================
+
+from .op_buffer import OpBuffer
+
+
+KNITOUT_VERSION = ";!knitout-2"
+
+# output file extensions
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+BINARY_EXT = ".kops"
+
+#-------------------------------------------------------------------------------
+# Binary op format (`.kops`), little-endian, with every section starting on an 8-byte boundary so the columns can be mapped straight into numpy arrays:
+# * header (see `BINARY_HEADER`): magic, version, and the number of stored operations, repeat blocks, strings, and knitout header lines.
+# * string table: `string_ct+1` uint64 offsets into the utf-8 string blob that follows.
+# * knitout header lines: one uint32 string id per line.
+# * op columns (see `OpBuffer`), one after the other: `op` (uint8), `d` (uint8), `bed` (uint8), `n` (int32), `bed2` (uint8), `n2` (int32), `cs` (uint32).
+# * repeat blocks: `repeat_ct` rows of (start row, end row, times, n_delta) as int64 (see `OpBuffer.addRepeat`).
+#-------------------------------------------------------------------------------
+BINARY_MAGIC = b"KNITOPS\0"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<8sIIQQQQ") # magic, version, (reserved), op_ct, repeat_ct, string_ct, header_ct
+COLUMNS = (("op", "<u1"), ("d", "<u1"), ("bed", "<u1"), ("n", "<i4"), ("bed2", "<u1"), ("n2", "<i4"), ("cs", "<u4"))
+
+
+def padding(size: int) -> int:
+	return -size % 8
+
+
+def outputFormat(filename, compression: Optional[str]=None, binary: Optional[bool]=None) -> Tuple[Optional[str], bool]:
+	'''
+	Works out how to write a program to `filename`, inferring whatever isn't specified from its extensions (e.g., `"swatch.k.gz"` is gzip-compressed knitout, `"swatch.kops"` is the binary op format, and `"swatch.kops.zst"` is zstd-compressed binary).
+
+	Parameters:
+	----------
+	* `filename` (str, Path, or file-like): where the program will be written (nothing can be inferred for file-like objects).
+	* `compression` (str, optional): `"gzip"` or `"zstd"`, or `None` to infer it. Defaults to `None`.
+	* `binary` (bool, optional): whether to write the binary op format, or `None` to infer it. Defaults to `None`.
+
+	Raises:
+	------
+	* ValueError: if `compression` isn't a supported value.
+
+	Returns:
+	-------
+	* (tuple): `(compression, binary)`.
+	'''
+	suffixes = [suffix.lower() for suffix in Path(filename).suffixes] if isinstance(filename, (str, Path)) else []
+	if suffixes and suffixes[-1] in COMPRESSIONS:
+		if compression is None: compression = COMPRESSIONS[suffixes[-1]]
+		suffixes.pop()
+	if compression not in (None, "gzip", "zstd"): raise ValueError(f"Unsupported compression: {compression}.  Supported values are 'gzip' and 'zstd'.")
+	#
+	if binary is None: binary = len(suffixes) > 0 and suffixes[-1] == BINARY_EXT
+	return compression, binary
+
+
+def zstandard():
+	try:
+		import zstandard
+	except ImportError:
+		raise ImportError("zstd compression requires the `zstandard` package (`pip install zstandard`).")
+	return zstandard
+
+
+@contextmanager
+def openOutput(target: Union[str, Path, IO], compression: Optional[str]=None, binary: bool=False) -> Iterator[IO]:
+	'''
+	Opens `target` for writing a program, yielding a stream that compresses the data as it is written (if `compression` is given), so the program never has to be held in memory as a whole.
+
+	Parameters:
+	----------
+	* `target` (str, Path, or file-like): file to write to.  File-like objects must be opened in binary mode if `compression` or `binary` is used, and are left open.
+	* `compression` (str, optional): `"gzip"` or `"zstd"`. Defaults to `None` (aka uncompressed).
+	* `binary` (bool, optional): whether to yield a binary stream rather than a text one. Defaults to `False`.
+	'''
+	if compression == "zstd": zstd = zstandard() # (before opening anything, in case it isn't installed)
+	#
+	if hasattr(target, "write"):
+		if compression is None and not binary:
+			yield target
+			return
+		if isinstance(target, io.TextIOBase): raise ValueError("Compressed and binary output need a file object opened in binary mode.", target)
+		raw, close_raw = target, False
+	else:
+		if compression is None and not binary:
+			with open(target, "w") as out:
+				yield out
+			return
+		raw, close_raw = open(target, "wb"), True
+	#
+	try:
+		if compression == "gzip": stream = gzip.GzipFile(filename="", mode="wb", fileobj=raw)
+		elif compression == "zstd": stream = zstd.ZstdCompressor().stream_writer(raw, closefd=False)
+		else: stream = raw
+		#
+		if binary: out = stream
+		else: out = io.TextIOWrapper(stream, encoding="utf-8", newline="", write_through=True)
+		yield out
+		#
+		if not binary: out.detach()
+		if stream is not raw: stream.close() # (writes out the end of the compressed stream; leaves `raw` open)
+		raw.flush()
+	finally:
+		if close_raw: raw.close()
+
+
+def openInput(source: Union[str, Path, IO]) -> IO:
+	'''
+	Opens a (possibly gzip- or zstd-compressed, going by its extension) file for reading in binary mode.
+	'''
+	if hasattr(source, "read"): return source
+	compression, _ = outputFormat(source)
+	if compression == "gzip": return gzip.open(source, "rb")
+	elif compression == "zstd": return zstandard().ZstdDecompressor().stream_reader(open(source, "rb"), closefd=True)
+	else: return open(source, "rb")
+
+
+def writeKnitout(out: IO, headers: List[str], ops: OpBuffer) -> None:
+	'''
+	Writes a knitout-2 program (version line, `headers`, then `ops`, one per line) to the text stream `out`.
+	'''
+	out.write(KNITOUT_VERSION + '\n' + '\n'.join(headers) + '\n')
+	#
+	ops.writeTo(out)
+
+
+def writeOpFile(out: IO, headers: List[str], ops: OpBuffer) -> None:
+	'''
+	Writes a program in the binary op format (see `OpFile`) to the binary stream `out`.  Repeat blocks are stored as-is, so the file is about as compact as the Writer's op log.
+
+	Parameters:
+	----------
+	* `out` (file-like): binary stream to write to.
+	* `headers` (list): knitout header lines.
+	* `ops` (OpBuffer): the operations.
+
+	Raises:
+	------
+	* ValueError: if some of the operations were flushed already (they only exist as text at that point).
+	'''
+	if ops.spooled_ct: raise ValueError("Can't write the binary op format for a streaming Writer whose operations were flushed already (use `stream=None`).")
+	#
+	strings = list(ops.strings)
+	string_ids = dict(ops.string_ids)
+	header_ids = []
+	for line in headers:
+		if line not in string_ids:
+			string_ids[line] = len(strings)
+			strings.append(line)
+		header_ids.append(string_ids[line])
+	#
+	blobs = [s.encode("utf-8") for s in strings]
+	offsets = np.zeros(len(blobs)+1, dtype="<u8")
+	offsets[1:] = np.cumsum([len(b) for b in blobs])
+	#
+	def section(data: bytes) -> None:
+		out.write(data)
+		out.write(b"\0"*padding(len(data)))
+	#
+	out.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(ops.op), len(ops.repeats), len(strings), len(header_ids)))
+	section(offsets.tobytes())
+	section(b"".join(blobs))
+	section(np.array(header_ids, dtype="<u4").tobytes())
+	for name, dtype in COLUMNS:
+		section(np.frombuffer(getattr(ops, name), dtype=getattr(ops, name).typecode).astype(dtype).tobytes() if len(getattr(ops, name)) else b"")
+	section(np.array(ops.repeats, dtype="<i8").reshape(-1, 4).tobytes())
+
+
+class OpFile:
+	'''
+	A program stored in the binary op format (`.kops`, written by `Writer.write`), loaded without parsing any knitout text.
+
+	The op columns (`op`, `d`, `bed`, `n`, `bed2`, `n2`, `cs`; see `OpBuffer`) and the `repeats` table are exposed as numpy arrays.  For an uncompressed file opened by path, they are memory-mapped straight from the file, so tools (diffs, stats, visualisers) can work on very large programs without reading them in.  `toOpBuffer()` and `writeKnitout()` convert back to the Writer's op log and to knitout-2 text (byte-for-byte what `Writer.write` produces for a `.k` file).
+
+	Parameters:
+	----------
+	* `source` (str, Path, or file-like): the file (compressed files are decompressed into memory, going by their extension).
+	* `mmap` (bool, optional): whether to memory-map an uncompressed file rather than reading it in. Defaults to `True`.
+	'''
+	def __init__(self, source: Union[str, Path, IO], mmap: bool=True):
+		if mmap and isinstance(source, (str, Path)) and outputFormat(source)[0] is None: buf = np.memmap(source, dtype=np.uint8, mode="r")
+		else:
+			f = openInput(source)
+			try:
+				buf = np.frombuffer(f.read(), dtype=np.uint8)
+			finally:
+				if f is not source: f.close()
+		#
+		if len(buf) < BINARY_HEADER.size: raise ValueError("Not a knitlib binary op file (too short).")
+		magic, version, _, op_ct, repeat_ct, string_ct, header_ct = BINARY_HEADER.unpack(buf[:BINARY_HEADER.size].tobytes())
+		if magic != BINARY_MAGIC: raise ValueError("Not a knitlib binary op file.")
+		if version != BINARY_VERSION: raise ValueError(f"Unsupported binary op file version: {version}.")
+		#
+		pos = BINARY_HEADER.size
+		def section(ct: int, dtype: str) -> np.ndarray:
+			nonlocal pos
+			size = ct*np.dtype(dtype).itemsize
+			arr = buf[pos:pos+size].view(dtype)
+			pos += size+padding(size)
+			return arr
+		#
+		offsets = section(string_ct+1, "<u8")
+		blob = section(int(offsets[-1]), "<u1").tobytes()
+		self.strings = [blob[offsets[i]:offsets[i+1]].decode("utf-8") for i in range(string_ct)]
+		self.headers = [self.strings[i] for i in section(header_ct, "<u4").tolist()]
+		for name, dtype in COLUMNS:
+			setattr(self, name, section(op_ct, dtype))
+		self.repeats = section(repeat_ct*4, "<i8").reshape(-1, 4)
+
+	def __len__(self) -> int:
+		'''
+		Number of operations (with repeats expanded).
+		'''
+		return len(self.op) + int(((self.repeats[:, 1]-self.repeats[:, 0])*self.repeats[:, 2]).sum())
+
+	def toOpBuffer(self) -> OpBuffer:
+		'''
+		Returns the operations as an `OpBuffer` (the columns are copied over as-is; nothing is parsed).
+		'''
+		ops = OpBuffer()
+		for name, dtype in COLUMNS:
+			col = getattr(ops, name)
+			col.frombytes(getattr(self, name).astype(col.typecode).tobytes())
+		for s in self.strings:
+			ops.intern(s)
+		ops.repeats = [tuple(int(v) for v in row) for row in self.repeats]
+		ops.repeated_ct = len(self)-len(self.op)
+		return ops
+
+	def writeKnitout(self, out: IO) -> None:
+		'''
+		Writes the program out as knitout-2 text to the text stream `out`.
+		'''
+		writeKnitout(out, self.headers, self.toOpBuffer())
@@ -0,0 +1,302 @@
+from typing import Union, Dict, List, Tuple, Set, Sequence
+from pathlib import Path
+
+import numpy as np
+
+#===============================================================================
+import sys
+
+## Standalone boilerplate before relative imports
+if not __package__: #remove #?
+	DIR = Path(__file__).resolve().parent
+	sys.path.insert(0, str(DIR.parent))
+	__package__ = DIR.name
+#===============================================================================
+
+from .op_buffer import OpBuffer, Op, ARG_OPS
+from .knitout_reader import parseArg
+
+
+# names of the ops counted by `removeRedundantOps`
+REDUNDANT_OPS = {Op.RACK: "rack", Op.STITCH_NUMBER: "stitch_number", Op.SPEED_NUMBER: "speed_number", Op.MISS: "miss"}
+
+
+def opColumns(ops: OpBuffer) -> List[np.ndarray]:
+	'''
+	Returns the (in-memory, unexpanded) columns of `ops` as numpy arrays, along with a mask of the rows in its repeat blocks and the set of rows where those blocks start or end.
+
+	Raises:
+	------
+	* ValueError: if some of the operations were flushed already.
+	'''
+	if ops.spooled_ct: raise ValueError("Can't optimize operations that were flushed already (by a streaming Writer).")
+	cols = [np.frombuffer(col, dtype=col.typecode) if len(col) else np.zeros(0, dtype=col.typecode) for col in (ops.op, ops.d, ops.bed, ops.n, ops.bed2, ops.n2, ops.cs)]
+	#
+	frozen = np.zeros(len(cols[0]), dtype=bool)
+	bounds: Set[int] = set()
+	for start, end, _, _ in ops.repeats:
+		frozen[start:end] = True
+		bounds.update((start, end))
+	return cols, frozen, bounds
+
+
+def commentRows(ops: OpBuffer, op: np.ndarray, cs: np.ndarray) -> np.ndarray:
+	'''
+	Returns a mask of the rows of `ops` that are comments.
+	'''
+	comment_ids = np.array([i for i, s in enumerate(ops.strings) if s.startswith(";")], dtype=np.int64)
+	return (op == Op.RAW) & np.isin(cs, comment_ids)
+
+
+def selectRows(ops: OpBuffer, cols: List[np.ndarray], rows: Sequence[int]) -> OpBuffer:
+	'''
+	Returns a new op log with the rows `rows` of `ops` (in that order), where `-1-cs_id` adds a new `rack` operation with the argument `ops.strings[cs_id]`.  The rows of each repeat block need to be kept, in order, so the repeats are kept too.
+	'''
+	res = OpBuffer()
+	res.strings, res.string_ids = list(ops.strings), dict(ops.string_ids)
+	#
+	idx = np.array(rows, dtype=np.int64)
+	new_rack = idx < 0
+	src = np.where(new_rack, 0, idx)
+	res_cols = [col[src] if len(col) else np.zeros(len(idx), dtype=col.dtype) for col in cols]
+	res_cols[0] = np.where(new_rack, Op.RACK, res_cols[0])
+	for c in range(1, 6):
+		res_cols[c] = np.where(new_rack, 0, res_cols[c])
+	res_cols[6] = np.where(new_rack, -1-idx, res_cols[6])
+	res.addOps(*res_cols)
+	#
+	pos = np.full(len(cols[0]), -1, dtype=np.int64)
+	pos[idx[~new_rack]] = np.flatnonzero(~new_rack)
+	res.repeats = [(int(pos[start]), int(pos[start])+end-start, times, n_delta) for start, end, times, n_delta in ops.repeats]
+	res.repeated_ct = ops.repeated_ct
+	return res
+
+
+def simulateXfers(rows: List[int], bed: np.ndarray, n: np.ndarray, bed2: np.ndarray, n2: np.ndarray) -> Dict[Tuple[int, int], list]:
+	'''
+	Returns where the loops end up after the transfers on `rows` (in order), starting with a distinct loop on each needle involved: `{(bed, needle): [loops, in the order they were stacked]}`.
+	'''
+	beds: Dict[Tuple[int, int], list] = {}
+	for i in rows:
+		src, dst = (int(bed[i]), int(n[i])), (int(bed2[i]), int(n2[i]))
+		loops = beds.pop(src, [src]) # (each needle starts with a loop identified by the needle itself)
+		beds.setdefault(dst, [dst]).extend(loops)
+		beds[src] = []
+	return beds
+
+
+def scheduleXfers(xfers: List[Tuple[int, Union[int, float]]], keys: List[Tuple[Tuple[int, int], ...]], rack: Union[int, float]) -> List[Tuple[Union[int, float], List[int]]]:
+	'''
+	Groups the transfers `xfers` (`(row, rack)` for each, in order) by racking, as far as their dependencies allow: a transfer has to stay after any earlier transfer that uses one of the same needles (`keys`), but transfers on separate needles can be reordered.  Starting from the current `rack`, each group holds every transfer that's ready at its racking, and the next racking is the one with the most transfers ready.
+
+	Returns:
+	-------
+	* (list): `(rack, [indices into xfers])` for each group, in order.
+	'''
+	preds = [0]*len(xfers)
+	succs: List[List[int]] = [[] for _ in xfers]
+	last: Dict[Tuple[int, int], int] = {}
+	for x, bns in enumerate(keys):
+		for p in {last[bn] for bn in bns if bn in last}:
+			succs[p].append(x)
+			preds[x] += 1
+		for bn in bns:
+			last[bn] = x
+	#
+	ready = {x for x in range(len(xfers)) if not preds[x]}
+	groups = []
+	while len(ready):
+		racks = [xfers[x][1] for x in sorted(ready)]
+		if rack not in racks: rack = max(racks, key=lambda r: (racks.count(r), -racks.index(r)))
+		group = []
+		while True:
+			batch = sorted(x for x in ready if xfers[x][1] == rack)
+			if not len(batch): break
+			for x in batch:
+				ready.remove(x)
+				group.append(x)
+				for s in succs[x]:
+					preds[s] -= 1
+					if not preds[s]: ready.add(s)
+		groups.append((rack, group))
+	return groups
+
+
+def optimizeXfers(ops: OpBuffer, verify: bool=True) -> Tuple[OpBuffer, int]:
+	'''
+	Returns a copy of the op log with its transfers regrouped to need fewer racking changes (and so fewer carriage passes on the machine).
+
+	Functions that transfer loops one needle at a time (e.g., `decEdge`, `incSchoolBus`, or the bindoffs) emit a `rack`, `xfer`, `rack` sequence per needle; within each run of consecutive transfers and racking changes (along with any comments), the transfers are reordered so that all of the ones at the same racking are done together (see `scheduleXfers`), and racking changes that aren't needed (e.g., a `rack 1`, `rack 0` round trip with no transfers in between) are removed.  Transfers that use the same needle are never reordered, and each transfer is still done at the racking it was emitted at, so the loops end up in the same place; with `verify`, that is checked for each run by simulating the transfers both ways (see `simulateXfers`), and the run is left as-is if they don't match.  The racking at the end of each run is also the same as before, so the operations after it are unaffected.
+
+	Runs are only changed if that removes some racking changes, so a program without any is returned as-is.  Operations in repeat blocks are left as-is (so the repeats are kept).
+
+	Parameters:
+	----------
+	* `ops` (OpBuffer): the op log (all of its operations need to be in memory, i.e., not flushed by a streaming Writer).
+	* `verify` (bool, optional): whether to check that each reordered run moves the loops the same way. Defaults to `True`.
+
+	Returns:
+	-------
+	* (OpBuffer): the optimized op log.
+	* (int): number of `rack` operations removed.
+
+	Raises:
+	------
+	* ValueError: if some of the operations were flushed already.
+	'''
+	cols, frozen, bounds = opColumns(ops)
+	op, d, bed, n, bed2, n2, cs = cols
+	row_ct = len(op)
+	#
+	# (runs can't include rows in repeat blocks, or cross their edges)
+	movable = ((op == Op.XFER) | (op == Op.RACK) | commentRows(ops, op, cs)) & ~frozen
+	#
+	rack_values: Dict[int, Union[int, float]] = {}
+	def rackValue(cs_id: int) -> Union[int, float]:
+		if cs_id not in rack_values: rack_values[cs_id] = parseArg(ops.strings[cs_id])
+		return rack_values[cs_id]
+	#
+	out: List[int] = [] # rows of the original, or `-1-cs_id` for a new `rack` operation (see `selectRows`)
+	rack, rack_cs = 0, None
+	removed_ct = 0
+	#
+	i = 0
+	while i < row_ct:
+		if not movable[i]:
+			if op[i] == Op.RACK: rack, rack_cs = rackValue(int(cs[i])), int(cs[i])
+			out.append(i)
+			i += 1
+			continue
+		#
+		j = i+1
+		while j < row_ct and movable[j] and j not in bounds: j += 1
+		#
+		xfers, comments, trailing = [], [], [] # (comments are kept just before the transfer that followed them)
+		rack_ids = {} if rack_cs is None else {rack: rack_cs}
+		r, r_cs, rack_ct = rack, rack_cs, 0
+		for row in range(i, j):
+			if op[row] == Op.XFER:
+				xfers.append((row, r))
+				comments.append(trailing)
+				trailing = []
+			elif op[row] == Op.RACK:
+				r, r_cs = rackValue(int(cs[row])), int(cs[row])
+				rack_ids.setdefault(r, r_cs)
+				rack_ct += 1
+			else: trailing.append(row)
+		#
+		rows: List[int] = []
+		cur, new_rack_ct = rack, 0
+		for group_rack, group in scheduleXfers(xfers, [((int(bed[row]), int(n[row])), (int(bed2[row]), int(n2[row]))) for row, _ in xfers], rack):
+			if group_rack != cur:
+				if group_rack not in rack_ids: rack_ids[group_rack] = ops.intern(str(group_rack)) # (the initial racking)
+				rows.append(-1-rack_ids[group_rack])
+				cur = group_rack
+				new_rack_ct += 1
+			for x in group:
+				rows.extend(comments[x])
+				rows.append(xfers[x][0])
+		rows.extend(trailing)
+		if cur != r:
+			if r_cs is None: r_cs = rack_ids[r] = ops.intern(str(r))
+			rows.append(-1-r_cs)
+			new_rack_ct += 1
+		#
+		orig_rows = [row for row, _ in xfers]
+		new_rows = [row for row in rows if row >= 0 and op[row] == Op.XFER]
+		if new_rack_ct < rack_ct and (not verify or simulateXfers(orig_rows, bed, n, bed2, n2) == simulateXfers(new_rows, bed, n, bed2, n2)):
+			out.extend(rows)
+			removed_ct += rack_ct-new_rack_ct
+		else: out.extend(range(i, j))
+		rack, rack_cs = r, r_cs
+		i = j
+	return selectRows(ops, cols, out), removed_ct
+
+
+def removeRedundantOps(ops: OpBuffer) -> Tuple[OpBuffer, Dict[str, int]]:
+	'''
+	Peephole pass that returns a copy of the op log without the operations that have no effect on the machine:
+	* `rack`, `x-stitch-number`, and `x-speed-number` operations that set the value that's already in effect (e.g., the stitch number being reset after each swatch, or a `rack 1`, `rack 0` round trip), or that are overridden by another one before any other operation (comments aside) uses them.
+	* `miss` operations that repeat the previous operation exactly (same direction, needle, and carriers), since the carriers are already there.
+
+	Operations in repeat blocks are left as-is (so the repeats are kept).
+
+	Parameters:
+	----------
+	* `ops` (OpBuffer): the op log (all of its operations need to be in memory, i.e., not flushed by a streaming Writer).
+
+	Returns:
+	-------
+	* (OpBuffer): the optimized op log.
+	* (dict): `{op name: number of lines removed}` for each kind of operation (see `REDUNDANT_OPS`).
+
+	Raises:
+	------
+	* ValueError: if some of the operations were flushed already.
+	'''
+	cols, frozen, bounds = opColumns(ops)
+	op, d, bed, n, bed2, n2, cs = cols
+	row_ct = len(op)
+	comments = commentRows(ops, op, cs)
+	#
+	keep = np.ones(row_ct, dtype=bool)
+	removed = {name: 0 for name in REDUNDANT_OPS.values()}
+	#
+	values: Dict[int, Union[int, float]] = {}
+	def value(row: int) -> Union[int, float]:
+		cs_id = int(cs[row])
+		if cs_id not in values: values[cs_id] = parseArg(ops.strings[cs_id])
+		return values[cs_id]
+	#
+	current = {Op.RACK: 0, Op.STITCH_NUMBER: None, Op.SPEED_NUMBER: None} # (values in effect)
+	pending: Dict[Op, int] = {} # (last row that sets each value, since the last operation that could use it)
+	def remove(row: int) -> None:
+		keep[row] = False
+		removed[REDUNDANT_OPS[op[row]]] += 1
+	def settle() -> None:
+		for code, row in pending.items():
+			if value(row) == current[code]: remove(row)
+			else: current[code] = value(row)
+		pending.clear()
+	#
+	prev_miss = None
+	for i in range(row_ct):
+		if i in bounds:
+			settle()
+			prev_miss = None
+		if frozen[i]:
+			if op[i] in ARG_OPS: current[Op(op[i])] = value(i)
+			continue
+		elif comments[i]: continue
+		elif op[i] in ARG_OPS:
+			code = Op(op[i])
+			if code in pending: remove(pending[code])
+			pending[code] = i
+			prev_miss = None
+			continue
+		#
+		settle()
+		if op[i] == Op.MISS:
+			if prev_miss is not None and d[i] == d[prev_miss] and bed[i] == bed[prev_miss] and n[i] == n[prev_miss] and cs[i] == cs[prev_miss]:
+				remove(i)
+				continue
+			prev_miss = i
+		else: prev_miss = None
+	settle()
+	return selectRows(ops, cols, np.flatnonzero(keep)), removed
+
+
+def optimizeOps(ops: OpBuffer, xfers: bool=True) -> Tuple[OpBuffer, Dict[str, int]]:
+	'''
+	Runs the optimization passes over the op log: `optimizeXfers` (if `xfers`), then `removeRedundantOps`.
+
+	Returns:
+	-------
+	* (OpBuffer): the optimized op log.
+	* (dict): `{op name: number of lines removed}` for each kind of operation (see `REDUNDANT_OPS`).
+	'''
+	rack_ct = 0
+	if xfers: ops, rack_ct = optimizeXfers(ops)
+	res, removed = removeRedundantOps(ops)
+	removed["rack"] += rack_ct
+	return res, removed
@@ -0,0 +1,211 @@
+from typing import Optional, Union, Callable, Dict, List, Tuple, Sequence, IO
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from enum import Enum
+import warnings
+import inspect
+import io
+
+import numpy as np
+
+#===============================================================================
+import sys
+
+## Standalone boilerplate before relative imports
+if not __package__: #remove #?
+	DIR = Path(__file__).resolve().parent
+	sys.path.insert(0, str(DIR.parent))
+	__package__ = DIR.name
+#===============================================================================
+
+from .knitlib_knitout import Writer
+from .knit_object import KnitObject
+from .knitlib import wasteSection
+from .op_buffer import OpBuffer, Op
+from .op_file import OpFile, writeOpFile
+
+
+class PanelLayout(Enum):
+	SIDE_BY_SIDE = 0
+	SEQUENTIAL = 1
+	#
+	@classmethod
+	def parse(self, val):
+		if isinstance(val, self): return val
+		elif isinstance(val, int): return self._value2member_map_[val]
+		else: raise ValueError
+
+
+class Panel:
+	'''
+	One panel of a garment (e.g., the front, back, or a sleeve), knit by `build` on its own KnitObject (see `buildGarment`).
+
+	Panels are built in their own needle and carrier numbering, and placed on the machine when they're merged: `needle_offset` is added to every needle, and carriers are renamed according to `carriers`.
+
+	If `build` is a generator function, each `yield` marks a point where the other panels' operations can be interleaved with this one's when the panels are knit side by side (e.g., after each row); otherwise the panel is a single block.  Yields shouldn't fall between an `inhook` and its `releasehook`, since the other panels may need the yarn inserting hook.
+
+	Parameters:
+	----------
+	* `build` (callable): `build(obj, *args)` knits the panel on the KnitObject `obj` (it needs to be picklable, e.g., a module-level function, to be run in a worker process).
+	* `args` (tuple, optional): extra arguments for `build`. Defaults to `()`.
+	* `name` (str, optional): name of the panel (for comments). Defaults to `None` (aka the name of `build`).
+	* `gauge` (int, optional): gauge of the KnitObject. Defaults to `1`.
+	* `needle_offset` (int, optional): needle the panel's needle 0 is placed on. Defaults to `0`.
+	* `carriers` (dict, optional): `{panel carrier: machine carrier}` for any carriers that should be renamed. Defaults to `None`.
+	* `bed` (str, optional): bed to cast the waste section before the panel on, when the panels are knit sequentially (`None` for double-bed knitting). Defaults to `"f"`.  (`build` should bind off or drop the panel's loops in that case, so they aren't held while the next panel is knit.)
+	* `settings`: settings for the KnitObject (see `KnitObject.setSettings`).
+	'''
+	def __init__(self, build: Callable, args: tuple=(), name: Optional[str]=None, gauge: int=1, needle_offset: int=0, carriers: Optional[Dict[str, str]]=None, bed: Optional[str]="f", **settings):
+		self.build = build
+		self.args = args
+		self.name = build.__name__ if name is None else name
+		self.gauge = gauge
+		self.needle_offset = needle_offset
+		self.carriers = carriers
+		self.bed = bed
+		self.settings = settings
+
+
+class BuiltPanel:
+	'''
+	Operations of a panel built by `buildPanel` (placed on the machine), split into blocks that can be interleaved with other panels' blocks.
+
+	Parameters:
+	----------
+	* `panel` (Panel): the panel.
+	* `ops` (OpBuffer): the panel's operations.
+	* `blocks` (list): `(start, end, rack, stitch_number, speed_number)` for each block: its operations, and the Writer settings the panel had at its start.
+	* `carriers` (list of str): carriers that are still in at the end of the panel.
+	* `headers` (list of str): the header lines of the panel's Writer (e.g., any `;;Machine:` or `;;Gauge:` headers `build` added). Defaults to `None` (aka no headers).
+	'''
+	def __init__(self, panel: Panel, ops: OpBuffer, blocks: List[tuple], carriers: List[str], headers: Optional[List[str]]=None):
+		self.panel = panel
+		self.ops = ops
+		self.blocks = blocks
+		self.carriers = carriers
+		self.headers = [] if headers is None else headers
+
+	def needleRange(self) -> Tuple[int, int]:
+		'''
+		Returns the leftmost and rightmost needles the panel uses.
+		'''
+		op, _, _, n, _, n2, _ = self.ops.columns(0, len(self.ops))
+		ns = np.concatenate((n[(op >= Op.KNIT) & (op <= Op.DROP)], n2[(op == Op.XFER) | (op == Op.SPLIT)]))
+		return int(ns.min()), int(ns.max())
+
+	def block(self, i: int) -> OpBuffer:
+		start, end = self.blocks[i][:2]
+		if start == 0 and end == len(self.ops): return self.ops
+		res = self.ops.copyOps(start)
+		res.truncate(end-start)
+		return res
+
+
+def buildPanel(panel: Panel, cs: str) -> Tuple[bytes, List[tuple], List[str], List[str]]:
+	'''
+	Knits a panel on its own KnitObject and Writer (e.g., in a worker process; see `Panel`), and returns its operations (placed on the machine, in the binary op format; see `OpFile`), its blocks, the carriers it leaves in, and its Writer's headers (see `BuiltPanel`).
+
+	Warnings are ignored here: the operations are checked when they're merged into the garment (see `Writer.addSegment`), against the line numbers they end up on.
+	'''
+	k = Writer(cs)
+	with warnings.catch_warnings():
+		warnings.simplefilter("ignore") # (after creating the Writer, since it sets up its own filters)
+		obj = KnitObject(k, gauge=panel.gauge, **panel.settings)
+		#
+		starts = [(0, k.rack_value, k.stitch_number, k.speed_number)]
+		res = panel.build(obj, *panel.args)
+		if inspect.isgenerator(res):
+			for _ in res:
+				starts.append((len(k.operations), k.rack_value, k.stitch_number, k.speed_number))
+	#
+	ends = [start[0] for start in starts[1:]]+[len(k.operations)]
+	blocks = [(start, end, *settings) for (start, *settings), end in zip(starts, ends) if end > start]
+	#
+	carriers = [panel.carriers.get(c, c) if panel.carriers else c for c in k.carrier_map.keys()]
+	#
+	buf = io.BytesIO()
+	writeOpFile(buf, [], k.operations.remapped(panel.needle_offset, panel.carriers))
+	return buf.getvalue(), blocks, carriers, list(k.headers)
+
+
+def buildPanels(panels: Sequence[Panel], cs: str, processes: Optional[int]=None) -> List[BuiltPanel]:
+	'''
+	Builds each panel (see `buildPanel`), in a process pool (or in this process, in order, if `processes` is `1`).
+	'''
+	if processes == 1 or len(panels) < 2: results = [buildPanel(panel, cs) for panel in panels]
+	else:
+		with ProcessPoolExecutor(max_workers=processes) as pool:
+			results = list(pool.map(buildPanel, panels, [cs]*len(panels)))
+	return [BuiltPanel(panel, OpFile(io.BytesIO(ops)).toOpBuffer(), blocks, carriers, headers) for panel, (ops, blocks, carriers, headers) in zip(panels, results)]
+
+
+def applySettings(k, rack, stitch_number, speed_number) -> None:
+	'''
+	Restores the Writer settings a panel's block was generated with, if another panel's block changed them (stitch and speed numbers that were never set in the panel are left as they are, since there's no op to reset them).
+	'''
+	if k.rack_value != rack: k.rack(rack)
+	if stitch_number is not None and k.stitch_number != stitch_number: k.stitchNumber(stitch_number)
+	if speed_number is not None and k.speed_number != speed_number: k.speedNumber(speed_number)
+
+
+def mergeSideBySide(k, built: Sequence[BuiltPanel]) -> None:
+	'''
+	Adds the panels' operations to `k`, interleaving their blocks round-robin (the first block of each panel, in order, then the second block of each, and so on), so the panels are knit side by side.
+	'''
+	for r in range(max((len(b.blocks) for b in built), default=0)):
+		for b in built:
+			if r < len(b.blocks):
+				applySettings(k, *b.blocks[r][2:])
+				k.addSegment(b.block(r))
+
+
+def mergeSequential(k, built: Sequence[BuiltPanel], waste_c: str, draw_c: str, machine: str="swgn2") -> None:
+	'''
+	Adds the panels' operations to `k` one after another, taking out each panel's carriers when it's done, with a waste section (and draw thread) on the next panel's needles in between.
+	'''
+	for i, b in enumerate(built):
+		if i > 0:
+			for c in built[i-1].carriers:
+				if c in k.carrier_map and c != waste_c and c != draw_c:
+					if machine.lower() == "kniterate": k.outcarrier(c)
+					else: k.outhook(c)
+			#
+			left_n, right_n = b.needleRange()
+			in_cs = [c for c in (waste_c, draw_c) if c not in k.carrier_map]
+			wasteSection(k, left_n, right_n, caston_bed=b.panel.bed, waste_c=waste_c, draw_c=draw_c, in_cs=in_cs, gauge=b.panel.gauge, initial=(len(in_cs) > 0), machine=machine)
+		#
+		k.comment(f"begin panel: {b.panel.name}")
+		applySettings(k, *b.blocks[0][2:])
+		k.addSegment(b.ops)
+
+
+def buildGarment(panels: Sequence[Panel], cs: str="1 2 3 4 5 6 7 8 9 10", layout: Union[PanelLayout, int]=PanelLayout.SIDE_BY_SIDE, processes: Optional[int]=None, waste_c: Optional[str]=None, draw_c: Optional[str]=None, stream: Optional[Union[str, Path, IO]]=None, buffer_size: int=10000, validate: bool=True, machine: str="swgn2") -> Writer:
+	'''
+	Builds a garment made of several independent panels, each generated from its own KnitObject in a separate process (see `buildPanels`), so the wall time scales with the number of cores rather than the number of panels.
+
+	The panels' operations are then merged into a single program, in a deterministic order (the order of `panels`), on a new Writer: the merged operations are checked against that Writer's state, as if they had been emitted there (see `Writer.addSegment`), so the program is the same no matter how many processes were used.  The Writer gets the first panel's headers (e.g., a `;;Machine:` header added by its `build` function).
+
+	Parameters:
+	----------
+	* `panels` (sequence of Panel): the panels, placed on the machine with their `needle_offset` and `carriers`.
+	* `cs` (str, optional): carriers available on the machine. Defaults to `"1 2 3 4 5 6 7 8 9 10"`.
+	* `layout` (PanelLayout, optional): `PanelLayout.SIDE_BY_SIDE` to knit the panels at the same time, on separate needles and carriers (see `mergeSideBySide`), or `PanelLayout.SEQUENTIAL` to knit them one after another, with waste sections in between (see `mergeSequential`). Defaults to `PanelLayout.SIDE_BY_SIDE`.
+	* `processes` (int, optional): number of worker processes; `1` to build the panels in this process. Defaults to `None` (aka the number of CPUs).
+	* `waste_c`, `draw_c` (str, optional): carriers for the waste sections and draw threads (required for `PanelLayout.SEQUENTIAL`). Defaults to `None`.
+	* `stream`, `buffer_size`, `validate`: see `Writer`.
+	* `machine` (str, optional): the machine (for the waste sections). Defaults to `"swgn2"`.
+
+	Returns:
+	-------
+	* (Writer): the garment's Writer (call `write` to output it).
+	'''
+	layout = PanelLayout.parse(layout)
+	if layout == PanelLayout.SEQUENTIAL: assert waste_c is not None and draw_c is not None, "need `waste_c` and `draw_c` for the waste sections between panels"
+	#
+	built = buildPanels(panels, cs, processes)
+	#
+	k = Writer(cs, stream=stream, buffer_size=buffer_size, validate=validate)
+	if len(built): k.setHeaders(built[0].headers) # (the panels are all built on Writers with the same carriers, so the `;;Carriers:` header matches)
+	if layout == PanelLayout.SIDE_BY_SIDE: mergeSideBySide(k, built)
+	else: mergeSequential(k, built, waste_c, draw_c, machine)
+	return k
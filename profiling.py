@@ -0,0 +1,206 @@
+from typing import Optional, Union, Dict, List, Tuple, Sequence, IO
+from types import CodeType, FrameType
+from pathlib import Path
+import time
+import sys
+
+
+# knitlib modules whose functions are profiled by default (the ones that emit operations on behalf of the caller; the Writer's own internals are attributed to whichever of these called them)
+DEFAULT_MODULES = ("knitlib", "stitch_patterns", "knit_object", "shaping", "punch_card", "generate_swatches", "panels")
+
+# name used for operations emitted (and time spent) outside of any profiled function, e.g., direct calls to `k.knit`
+OTHER = "(other)"
+
+
+class FunctionStats:
+	'''
+	Totals for one profiled function (or call stack), see `Profiler.stats`.
+
+	* `calls` (int): number of calls.
+	* `ops` (int): operations emitted during the calls (including by other profiled functions they called).
+	* `self_ops` (int): operations emitted during the calls, excluding those emitted by other profiled functions they called.
+	* `wall` (float): wall time, in seconds (excluding recursive calls, so it isn't counted twice).
+	* `self_wall` (float): wall time, excluding time spent in other profiled functions.
+	* `cpu` (float): CPU time used by the Python process (see `time.process_time`), in seconds; unlike the wall time, this doesn't include time spent waiting (e.g., on I/O or worker processes).
+	'''
+	__slots__ = ("calls", "ops", "self_ops", "wall", "self_wall", "cpu")
+
+	def __init__(self):
+		self.calls = 0
+		self.ops = 0
+		self.self_ops = 0
+		self.wall = 0.0
+		self.self_wall = 0.0
+		self.cpu = 0.0
+
+	def asDict(self) -> dict:
+		return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Profiler:
+	'''
+	Optional instrumentation for a Writer: records, for each knitlib function that is called while it's enabled (e.g., `jersey`, `closedTubeBindoff`, `decSchoolBus`, or `KnitObject.knitPass`), the number of operations it emitted, its wall time, and its CPU time, both in total (see `report`) and per call stack (see `writeStacks`).
+
+	It uses a profile hook (see `sys.setprofile`) that's only installed while the profiler is enabled, so the library runs as usual (at no extra cost) otherwise.  Only the thread that enables it is profiled.
+
+	Usage:
+	-----
+	```
+	with k.profile() as prof:
+		... # build the program
+	print(prof.report())
+	prof.writeStacks("garment.folded") # e.g., for `flamegraph.pl garment.folded > garment.svg`
+	```
+
+	Parameters:
+	----------
+	* `k` (Writer): the Writer whose operations are counted.
+	* `modules` (sequence of str, optional): names of the knitlib modules whose functions are profiled. Defaults to `DEFAULT_MODULES`.
+	* `files` (sequence of str or Path, optional): other source files whose functions are profiled too (e.g., the script that builds the garment). Defaults to `()`.
+	'''
+	def __init__(self, k, modules: Sequence[str]=DEFAULT_MODULES, files: Sequence[Union[str, Path]]=()):
+		self.k = k
+		pkg_dir = Path(__file__).resolve().parent
+		self.paths = {str(pkg_dir / f"{name}.py") for name in modules} | {str(Path(fn).resolve()) for fn in files}
+		self.names: Dict[CodeType, Optional[str]] = {} # (cached name of each code object, or `None` if it isn't profiled)
+		#
+		self.functions: Dict[str, FunctionStats] = {}
+		self.stacks: Dict[Tuple[str, ...], FunctionStats] = {}
+		self.stack: List[list] = [] # [name, frame, stack key, wall start, cpu start, op count at start, child wall, child cpu, child ops] for each active profiled call
+		self.active: Dict[str, int] = {} # (number of active calls of each function, for recursion)
+		self.total = FunctionStats()
+		self.enabled = False
+
+	def name(self, code: CodeType) -> Optional[str]:
+		try:
+			return self.names[code]
+		except KeyError:
+			name = None
+			if not code.co_name.startswith("<"): # (skip lambdas, comprehensions, and module-level code)
+				try:
+					path = str(Path(code.co_filename).resolve())
+				except (OSError, ValueError): path = None
+				if path in self.paths: name = getattr(code, "co_qualname", code.co_name) # (e.g., `KnitObject.knitPass`)
+			self.names[code] = name
+			return name
+
+	def hook(self, frame: FrameType, event: str, arg) -> None:
+		if event == "call":
+			name = self.name(frame.f_code)
+			if name is None: return
+			key = (self.stack[-1][2] if len(self.stack) else ()) + (name,)
+			self.stack.append([name, frame, key, time.perf_counter(), time.process_time(), len(self.k.operations), 0.0, 0.0, 0])
+			self.active[name] = self.active.get(name, 0)+1
+		elif event == "return" and len(self.stack) and self.stack[-1][1] is frame: # (also called when a generator yields, or an exception is raised)
+			wall_end, cpu_end, op_ct = time.perf_counter(), time.process_time(), len(self.k.operations)
+			name, _, key, wall_start, cpu_start, start_ct, child_wall, child_cpu, child_ops = self.stack.pop()
+			wall, cpu, ops = wall_end-wall_start, cpu_end-cpu_start, op_ct-start_ct
+			self.active[name] -= 1
+			#
+			for stats in (self.functions.setdefault(name, FunctionStats()), self.stacks.setdefault(key, FunctionStats())):
+				stats.calls += 1
+				stats.self_ops += ops-child_ops
+				stats.self_wall += wall-child_wall
+				if stats is self.stacks[key] or not self.active[name]: # (only count the outermost of any recursive calls in the totals)
+					stats.ops += ops
+					stats.wall += wall
+					stats.cpu += cpu
+			#
+			if len(self.stack):
+				parent = self.stack[-1]
+				parent[6] += wall
+				parent[7] += cpu
+				parent[8] += ops
+
+	def enable(self) -> None:
+		'''
+		Starts profiling (see `disable`).
+		'''
+		assert not self.enabled, "the profiler is enabled already"
+		assert sys.getprofile() is None, "another profiler is active in this thread"
+		self.enabled = True
+		self.start = (time.perf_counter(), time.process_time(), len(self.k.operations))
+		sys.setprofile(self.hook)
+
+	def disable(self) -> None:
+		'''
+		Stops profiling (the results are kept, and added to if the profiler is enabled again).
+		'''
+		sys.setprofile(None)
+		self.enabled = False
+		wall, cpu, op_ct = time.perf_counter(), time.process_time(), len(self.k.operations)
+		self.total.calls += 1
+		self.total.ops += op_ct-self.start[2]
+		self.total.wall += wall-self.start[0]
+		self.total.cpu += cpu-self.start[1]
+		del self.stack[:]
+		self.active.clear()
+
+	def __enter__(self) -> "Profiler":
+		self.enable()
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.disable()
+
+	def other(self) -> FunctionStats:
+		'''
+		Returns the totals for everything outside of the profiled functions (e.g., direct calls to `k.knit`, or the caller's own code).
+		'''
+		res = FunctionStats()
+		res.calls = self.total.calls
+		res.ops = res.self_ops = self.total.ops-sum(stats.ops for key, stats in self.stacks.items() if len(key) == 1)
+		res.wall = res.self_wall = self.total.wall-sum(stats.wall for key, stats in self.stacks.items() if len(key) == 1)
+		res.cpu = self.total.cpu-sum(stats.cpu for key, stats in self.stacks.items() if len(key) == 1)
+		return res
+
+	def stats(self) -> Dict[str, dict]:
+		'''
+		Returns the totals for each profiled function (along with `OTHER`, see `other`) as dicts (see `FunctionStats`), sorted by self wall time (highest first).
+		'''
+		res = dict(self.functions)
+		res[OTHER] = self.other()
+		return {name: stats.asDict() for name, stats in sorted(res.items(), key=lambda item: -item[1].self_wall)}
+
+	def report(self, sort: str="self_wall", limit: Optional[int]=None) -> str:
+		'''
+		Returns a flat report (a table with a row per function, see `stats`) as a string.
+
+		Parameters:
+		----------
+		* `sort` (str, optional): column to sort by (highest first): one of `"calls"`, `"ops"`, `"self_ops"`, `"wall"`, `"self_wall"`, or `"cpu"`. Defaults to `"self_wall"`.
+		* `limit` (int, optional): max number of rows. Defaults to `None` (aka all of them).
+		'''
+		rows = sorted(self.stats().items(), key=lambda item: -item[1][sort])[:limit]
+		width = max([len("function")]+[len(name) for name, _ in rows])
+		lines = [f"{'function':<{width}}  {'calls':>8}  {'ops':>10}  {'self ops':>10}  {'wall (ms)':>10}  {'self (ms)':>10}  {'cpu (ms)':>10}  {'ops/s':>12}"]
+		for name, s in rows:
+			ops_per_sec = f"{s['self_ops']/s['self_wall']:,.0f}" if s["self_wall"] > 0 else "-"
+			lines.append(f"{name:<{width}}  {s['calls']:>8}  {s['ops']:>10}  {s['self_ops']:>10}  {s['wall']*1000:>10.2f}  {s['self_wall']*1000:>10.2f}  {s['cpu']*1000:>10.2f}  {ops_per_sec:>12}")
+		lines.append(f"total: {self.total.ops} ops in {self.total.wall*1000:.2f}ms (cpu: {self.total.cpu*1000:.2f}ms)")
+		return "\n".join(lines)
+
+	def writeStacks(self, out: Union[str, Path, IO], metric: str="self_wall") -> None:
+		'''
+		Writes the profile per call stack in the "folded" format used by flamegraph tools (e.g., `flamegraph.pl`, speedscope, or inferno): a line per stack, like `KnitObject.knitPass;jersey 1234`.
+
+		Parameters:
+		----------
+		* `out` (str, Path, or file object): where to write it.
+		* `metric` (str, optional): `"self_wall"` to weight the stacks by self wall time (in microseconds), `"cpu"` by self CPU time (in microseconds), or `"self_ops"` by number of operations emitted. Defaults to `"self_wall"`.
+		'''
+		assert metric in ("self_wall", "cpu", "self_ops"), f"unsupported metric, '{metric}'"
+		#
+		def value(key: Tuple[str, ...], stats: FunctionStats) -> int:
+			if metric == "self_ops": return stats.self_ops
+			elif metric == "self_wall": return round(stats.self_wall*1e6)
+			else: return round((stats.cpu-sum(child.cpu for child_key, child in self.stacks.items() if len(child_key) == len(key)+1 and child_key[:-1] == key))*1e6)
+		#
+		lines = [f"{';'.join(key)} {value(key, stats)}" for key, stats in self.stacks.items()]
+		other = self.other()
+		lines.append(f"{OTHER} {other.self_ops if metric == 'self_ops' else round((other.self_wall if metric == 'self_wall' else other.cpu)*1e6)}")
+		#
+		if isinstance(out, (str, Path)):
+			with open(out, "w") as f:
+				f.write("\n".join(lines)+"\n")
+		else: out.write("\n".join(lines)+"\n")
@@ -2,7 +2,7 @@ import numpy as np
 import cv2
 # import matplotlib.pyplot as plt
 
-from .helpers import c2cs, toggleDirection, tuckPattern, flattenIter, bnValid, bnEdges
+from .helpers import c2cs, toggleDirection, tuckPattern, flattenIter, bnValid, getNeedleLayout
 
 TUCK = 0 # punch card: tuck on non-punched (white) pixels
 FAIRISLE = 1 # punch card: knit color 2 on punched (black) pixels
@@ -90,7 +90,8 @@ def generate(k, start_n, end_n, passes, c, bed, img_path, punch_card_width=24, p
 	#
 	n_ranges = {"-": range(right_n, left_n-1, -1), "+": range(left_n, right_n+1)}
 	#
-	left_edge_bn, right_edge_bn = bnEdges(left_n, right_n, gauge, return_type=list)
+	layout = getNeedleLayout(left_n, right_n, gauge)
+	left_edge_bn, right_edge_bn = layout.edges()
 	#
 	cs = c2cs(c)
 	#
@@ -162,8 +163,8 @@ def generate(k, start_n, end_n, passes, c, bed, img_path, punch_card_width=24, p
 		d = directions[cs]
 		miss_n = n_ranges[d][-1]
 		#
-		for n in n_ranges[d]:
-			if bnValid(bed, n, gauge):
+		for n, valid in zip(n_ranges[d], layout.validMask(bed, d).tolist()):
+			if valid:
 				# if row[n%w] == 0: k.knit(d, f"{bed}{n}", *cs) #TODO: #check
 				if getData(p, n) == 0: k.knit(d, f"{bed}{n}", *cs) #TODO: #check
 				else:
@@ -249,8 +250,8 @@ def generate(k, start_n, end_n, passes, c, bed, img_path, punch_card_width=24, p
 			d = directions[cs2]
 			miss_n = n_ranges[d][-1]
 			#
-			for n in n_ranges[d]:
-				if bnValid(bed, n, gauge):
+			for n, valid in zip(n_ranges[d], layout.validMask(bed, d).tolist()):
+				if valid:
 					if getData(p, n) == 0: k.knit(d, f"{bed}{n}", *cs2) #TODO: #check
 					else:
 						if setting == TUCK: k.tuck(d, f"{bed}{n}", *cs2)
@@ -1,7 +1,9 @@
 from typing import Union, Optional, Tuple, List, Dict
 import warnings #new
 
-from .helpers import c2cs, modsHalveGauge, gauged, bnValid, toggleDirection, bnEdges, tuckPattern, knitPass
+import numpy as np
+
+from .helpers import c2cs, modsHalveGauge, gauged, bnValid, toggleDirection, bnEdges, tuckPattern, knitPass, rangeArray, bnValidMask, needleMask, sequenceMask, maskedPass, maskedXfers, passTemplate, knitPassTemplate, replayPasses, NeedleSet, toNeedleSet, getNeedleLayout
 
 
 pattern_names = ["jersey", "interlock", "rib", "seed", "garter", "tuckGarter", "tuckStitch", "altKnitTuck"]
@@ -55,6 +57,7 @@ def jersey(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], L
 	else: rh_p = -1
 
 	cs = c2cs(c) # ensure tuple type
+	avoid_bns, bn_locs = toNeedleSet(avoid_bns), toNeedleSet(bn_locs) # (normalized once, so membership checks below are O(1))
 
 	k.comment(f"begin {bed +'-bed ' if bed is not None else ''}jersey")
 
@@ -71,9 +74,8 @@ def jersey(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], L
 	bed2 = "f" if bed == "b" else "b"
 
 	if bn_locs is not None and len(bn_locs.get(bed2, [])):
-		for n in range(start_n, end_n+step, step):
-			if bnValid(bed, n, gauge, mod=mod[bed]) and n in bn_locs[bed2] and n not in avoid_bns[bed] and n not in avoid_bns.get(bed2, []):
-				k.xfer(f"{bed2}{n}", f"{bed}{n}")
+		ns = np.arange(start_n, end_n+step, step)
+		maskedXfers(k, ns, [(bed2, bed, bnValidMask(bed, ns, gauge, mod=mod[bed]) & needleMask(ns, bn_locs[bed2]) & ~needleMask(ns, avoid_bns[bed]) & ~needleMask(ns, avoid_bns.get(bed2, [])))])
 
 	if inhook:
 		if machine.lower() == "kniterate": k.incarrier(*cs)
@@ -82,24 +84,17 @@ def jersey(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], L
 
 	if bn_locs is None: print("TODO: add caston") #debug
 
-	for p in range(passes):
-		if p % 2 == 0:
-			pass_start_n = start_n
-			pass_end_n = end_n
-		else:
-			pass_start_n = end_n
-			pass_end_n = start_n
-
-		knitPass(k, start_n=pass_start_n, end_n=pass_end_n, c=c, bed=bed, gauge=gauge, mod=mod[bed], avoid_bns=avoid_bns, init_direction=init_direction)
+	def releaseHook():
+		if machine.lower() != "kniterate": k.releasehook(*cs)
+		if tuck_pattern: tuckPattern(k, first_n=start_n, direction=d1, c=None) # drop it
 
-		if p == rh_p:
-			if machine.lower() != "kniterate": k.releasehook(*cs)
-			if tuck_pattern: tuckPattern(k, first_n=start_n, direction=d1, c=None) # drop it
+	# each distinct pass is only built once, then replayed
+	templates = [knitPassTemplate(start_n, end_n, bed=bed, gauge=gauge, mod=mod[bed], avoid_bns=avoid_bns, init_direction=init_direction), knitPassTemplate(end_n, start_n, bed=bed, gauge=gauge, mod=mod[bed], avoid_bns=avoid_bns, init_direction=init_direction)]
+	replayPasses(k, templates, passes, c, after_pass=(rh_p, releaseHook))
 
 	if xfer_bns_back and bn_locs is not None and len(bn_locs.get(bed2, [])):
-		for n in range(start_n, end_n+step, step):
-			if bnValid(bed, n, gauge, mod=mod[bed]) and n in bn_locs[bed2] and n not in avoid_bns[bed] and n not in avoid_bns.get(bed2, []):
-				k.xfer(f"{bed}{n}", f"{bed2}{n}")
+		ns = np.arange(start_n, end_n+step, step)
+		maskedXfers(k, ns, [(bed, bed2, bnValidMask(bed, ns, gauge, mod=mod[bed]) & needleMask(ns, bn_locs[bed2]) & ~needleMask(ns, avoid_bns[bed]) & ~needleMask(ns, avoid_bns.get(bed2, [])))])
 
 	k.comment(f"end {bed +'-bed ' if bed is not None else ''}jersey")
 
@@ -164,6 +159,7 @@ def interlock(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str]
 	else: rh_p = -1
 
 	cs = c2cs(c) # ensure tuple type
+	avoid_bns, bn_locs = toNeedleSet(avoid_bns), toNeedleSet(bn_locs) # (normalized once, so membership checks below are O(1))
 
 	k.comment(f"begin {bed +'-bed ' if bed is not None else ''}interlock")
 
@@ -189,14 +185,14 @@ def interlock(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str]
 		# single_bed = False
 		bed1, bed2 = "f", "b"
 
-		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = {"f": [n for n in range(left_n, right_n+1) if bnValid("f", n, gauge) and n not in avoid_bns.get("f", [])], "b": [n for n in range(left_n, right_n+1) if bnValid("b", n, gauge) and n not in avoid_bns.get("b", [])]}
+		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = NeedleSet({"f": [n for n in range(left_n, right_n+1) if bnValid("f", n, gauge) and n not in avoid_bns.get("f", [])], "b": [n for n in range(left_n, right_n+1) if bnValid("b", n, gauge) and n not in avoid_bns.get("b", [])]})
 		else: _bn_locs = bn_locs.copy() #internal version, so not modifying arg
 	else:
 		# single_bed = True
 		if bed == "f": bed1, bed2 = "f", "b"
 		else: bed1, bed2 = "b", "f"
 
-		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = {bed1: [n for n in range(left_n, right_n+1) if bnValid(bed1, n, gauge) and n not in avoid_bns.get(bed1, [])], bed2: []}
+		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = NeedleSet({bed1: [n for n in range(left_n, right_n+1) if bnValid(bed1, n, gauge) and n not in avoid_bns.get(bed1, [])], bed2: []})
 		else: _bn_locs = bn_locs.copy() #internal version, so not modifying arg
 
 	secure_needles = {"f": [], "b": []}
@@ -214,6 +210,8 @@ def interlock(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str]
 	else: mods2 = modsHalveGauge(gauge, bed1)
 
 	n_ranges = {"+": range(left_n, right_n+1), "-": range(right_n, left_n-1, -1)}
+	layout = getNeedleLayout(left_n, right_n, gauge)
+	not_avoid = {d: {b: ~needleMask(layout.needles(d), avoid_bns.get(b, [])) for b in (bed1, bed2)} for d in (d1, d2)}
 
 	if inhook:
 		if machine.lower() == "kniterate": k.incarrier(*cs)
@@ -234,52 +232,40 @@ def interlock(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str]
 			if xfer_speed_number is not None: k.speedNumber(xfer_speed_number)
 			if xfer_stitch_number is not None: k.stitchNumber(xfer_stitch_number)
 
+			ns = layout.needles("+")
+			skip = needleMask(ns, avoid_bns.get("f", [])) | needleMask(ns, avoid_bns.get("b", [])) | needleMask(ns, secure_needles.get(bed1, []))
 			if bed is None:
-				for n in range(left_n, right_n+1):
-					if n in avoid_bns.get("f", []) or n in avoid_bns.get("b", []) or n in secure_needles.get(bed1, []) or n in secure_needles.get(bed2, []): continue
-					elif n in _bn_locs.get(bed1, []) and n % (gauge*2) == mods2[1]: k.xfer(f"{bed1}{n}", f"{bed2}{n}") # `n % (gauge*2) == mods2[1]` is the same as saying `(n % (gauge*4) == mods4[0][1] or n % (gauge*4) == mods4[1][1])` #TODO: #check 
-					elif n in _bn_locs.get(bed2, []) and n % (gauge*2) == mods2[0]: k.xfer(f"{bed2}{n}", f"{bed1}{n}") # `n % (gauge*2) == mods2[0]` is the same as saying `(n % (gauge*4) == mods4[0][0] or n % (gauge*4) == mods4[1][0])` #TODO: #check 
+				skip |= needleMask(ns, secure_needles.get(bed2, []))
+				maskedXfers(k, ns, [
+					(bed1, bed2, ~skip & needleMask(ns, _bn_locs.get(bed1, [])) & layout.modMask("+", gauge*2, mods2[1])), # `n % (gauge*2) == mods2[1]` is the same as saying `(n % (gauge*4) == mods4[0][1] or n % (gauge*4) == mods4[1][1])` #TODO: #check 
+					(bed2, bed1, ~skip & needleMask(ns, _bn_locs.get(bed2, [])) & layout.modMask("+", gauge*2, mods2[0])) # `n % (gauge*2) == mods2[0]` is the same as saying `(n % (gauge*4) == mods4[0][0] or n % (gauge*4) == mods4[1][0])` #TODO: #check 
+				])
 			else:
-				for n in range(left_n, right_n+1):
-					if n in avoid_bns.get("f", []) or n in avoid_bns.get("b", []) or n in secure_needles.get(bed1, []) or not bnValid(bed1, n, gauge): continue
-					elif n in _bn_locs.get(bed1, []) and n % (gauge*2) == mods2[1]: k.xfer(f"{bed1}{n}", f"{bed2}{n}") # `n % (gauge*2) == mods2[1]` is the same as saying `(n % (gauge*4) == mods4[0][1] or n % (gauge*4) == mods4[1][1])` #TODO: #check
+				skip |= ~layout.validMask(bed1, "+")
+				maskedXfers(k, ns, [(bed1, bed2, ~skip & needleMask(ns, _bn_locs.get(bed1, [])) & layout.modMask("+", gauge*2, mods2[1]))]) # `n % (gauge*2) == mods2[1]` is the same as saying `(n % (gauge*4) == mods4[0][1] or n % (gauge*4) == mods4[1][1])` #TODO: #check
 			
 			# reset settings
 			if speed_number is not None: k.speedNumber(speed_number)
 			if stitch_number is not None: k.stitchNumber(stitch_number)
 
 		def passSequence1(d):
-			for n in n_ranges[d]:
-				if n % m == mods4[0][seq1_idx] and n not in avoid_bns.get(bed1, []): k.knit(d, f"{bed1}{n}", *cs)
-				elif n % m == mods4[1][seq1_idx] and n not in avoid_bns.get(bed2, []): k.knit(d, f"{bed2}{n}", *cs)
-				elif n == n_ranges[d][-1]: k.miss(d, f"{bed1}{n}", *cs)
+			return passTemplate(d, layout.needles(d), [(bed1, layout.modMask(d, m, mods4[0][seq1_idx]) & not_avoid[d][bed1]), (bed2, layout.modMask(d, m, mods4[1][seq1_idx]) & not_avoid[d][bed2])], miss_bn=(bed1, n_ranges[d][-1]))
 
 		def passSequence2(d):
-			for n in n_ranges[d]:
-				if n % m == mods4[0][seq2_idx] and n not in avoid_bns.get(bed1, []): k.knit(d, f"{bed1}{n}", *cs)
-				elif n % m == mods4[1][seq2_idx] and n not in avoid_bns.get(bed2, []): k.knit(d, f"{bed2}{n}", *cs)
-				elif n == n_ranges[d][-1]: k.miss(d, f"{bed1}{n}", *cs)
+			return passTemplate(d, layout.needles(d), [(bed1, layout.modMask(d, m, mods4[0][seq2_idx]) & not_avoid[d][bed1]), (bed2, layout.modMask(d, m, mods4[1][seq2_idx]) & not_avoid[d][bed2])], miss_bn=(bed1, n_ranges[d][-1]))
 	else:
 		def passSequence1(d):
-			for n in n_ranges[d]:
-				if n % (gauge*2) == mods2[seq1_idx] and n not in avoid_bns.get(bed1, []): k.knit(d, f"{bed1}{n}", *cs)
-				elif n % (gauge*2) == mods2[seq2_idx] and n not in avoid_bns.get(bed2, []): k.knit(d, f"{bed2}{n}", *cs)
-				elif n == n_ranges[d][-1]: k.miss(d, f"{bed1}{n}", *cs)
+			return passTemplate(d, layout.needles(d), [(bed1, layout.modMask(d, gauge*2, mods2[seq1_idx]) & not_avoid[d][bed1]), (bed2, layout.modMask(d, gauge*2, mods2[seq2_idx]) & not_avoid[d][bed2])], miss_bn=(bed1, n_ranges[d][-1]))
 		
 		def passSequence2(d):
-			for n in n_ranges[d]:
-				if n % (gauge*2) == mods2[seq2_idx] and n not in avoid_bns.get(bed1, []): k.knit(d, f"{bed1}{n}", *cs)
-				elif n % (gauge*2) == mods2[seq1_idx] and n not in avoid_bns.get(bed2, []): k.knit(d, f"{bed2}{n}", *cs)
-				elif n == n_ranges[d][-1]: k.miss(d, f"{bed1}{n}", *cs)
+			return passTemplate(d, layout.needles(d), [(bed1, layout.modMask(d, gauge*2, mods2[seq2_idx]) & not_avoid[d][bed1]), (bed2, layout.modMask(d, gauge*2, mods2[seq1_idx]) & not_avoid[d][bed2])], miss_bn=(bed1, n_ranges[d][-1]))
 
-	#--- the knitting ---
-	for p in range(passes):
-		if p % 2 == 0: passSequence1(d1)
-		else: passSequence2(d2)
+	def releaseHook():
+		if machine.lower() != "kniterate": k.releasehook(*cs)
+		if tuck_pattern: tuckPattern(k, first_n=start_n, direction=d1, c=None) # drop it
 
-		if p == rh_p:
-			if machine.lower() != "kniterate": k.releasehook(*cs)
-			if tuck_pattern: tuckPattern(k, first_n=start_n, direction=d1, c=None) # drop it
+	#--- the knitting --- (each distinct pass is only built once, then replayed)
+	replayPasses(k, [passSequence1(d1), passSequence2(d2)], passes, cs, after_pass=(rh_p, releaseHook))
 
 
 	# return the loops back
@@ -287,21 +273,24 @@ def interlock(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str]
 		if xfer_speed_number is not None: k.speedNumber(xfer_speed_number)
 		if xfer_stitch_number is not None: k.stitchNumber(xfer_stitch_number)
 		
+		ns = layout.needles("+")
 		if gauge == 1: #TODO: #check
-			for n in range(left_n, right_n+1):
-				if avoid_bns.get("f", []) or n in avoid_bns.get("b", []) or n in secure_needles.get(bed1, []) or not bnValid(bed1, n, gauge): continue
-				elif n not in _bn_locs.get(bed1, []): k.xfer(f"{bed1}{n}", f"{bed2}{n}") #TODO: #check
-				elif n not in _bn_locs.get(bed2, []): k.xfer(f"{bed2}{n}", f"{bed1}{n}")
+			skip = (len(avoid_bns.get("f", [])) > 0) | needleMask(ns, avoid_bns.get("b", [])) | needleMask(ns, secure_needles.get(bed1, [])) | ~layout.validMask(bed1, "+")
+			maskedXfers(k, ns, [
+				(bed1, bed2, ~skip & ~needleMask(ns, _bn_locs.get(bed1, []))), #TODO: #check
+				(bed2, bed1, ~skip & ~needleMask(ns, _bn_locs.get(bed2, [])))
+			])
 		else:
-			if bed is None:
-				for n in range(left_n, right_n+1): #TODO: check for bed is None
-					if n in avoid_bns.get("f", []) or n in avoid_bns.get("b", []) or n in secure_needles.get(bed1, []) or n in secure_needles.get(bed2, []): continue
-					elif n in _bn_locs.get(bed1, []) and n % (gauge*2) == mods2[1]: k.xfer(f"{bed2}{n}", f"{bed1}{n}") # `n % (gauge*2) == mods2[1]` is the same as saying `(n % (gauge*4) == mods4[0][1] or n % (gauge*4) == mods4[1][1])` #TODO: #check 
-					elif n in _bn_locs.get(bed2, []) and n % (gauge*2) == mods2[0]: k.xfer(f"{bed1}{n}", f"{bed2}{n}") # `n % (gauge*2) == mods2[0]` is the same as saying `(n % (gauge*4) == mods4[0][0] or n % (gauge*4) == mods4[1][0])` #TODO: #check 
+			skip = needleMask(ns, avoid_bns.get("f", [])) | needleMask(ns, avoid_bns.get("b", [])) | needleMask(ns, secure_needles.get(bed1, []))
+			if bed is None: #TODO: check for bed is None
+				skip |= needleMask(ns, secure_needles.get(bed2, []))
+				maskedXfers(k, ns, [
+					(bed2, bed1, ~skip & needleMask(ns, _bn_locs.get(bed1, [])) & layout.modMask("+", gauge*2, mods2[1])), # `n % (gauge*2) == mods2[1]` is the same as saying `(n % (gauge*4) == mods4[0][1] or n % (gauge*4) == mods4[1][1])` #TODO: #check 
+					(bed1, bed2, ~skip & needleMask(ns, _bn_locs.get(bed2, [])) & layout.modMask("+", gauge*2, mods2[0])) # `n % (gauge*2) == mods2[0]` is the same as saying `(n % (gauge*4) == mods4[0][0] or n % (gauge*4) == mods4[1][0])` #TODO: #check 
+				])
 			else: #if bed is not None:
-				for n in range(left_n, right_n+1):
-					if n in avoid_bns.get("f", []) or n in avoid_bns.get("b", []) or n in secure_needles.get(bed1, []) or not bnValid(bed1, n, gauge): continue
-					elif n in _bn_locs.get(bed1, []) and n % (gauge*2) == mods2[1]: k.xfer(f"{bed2}{n}", f"{bed1}{n}") # `n % (gauge*2) == mods2[1]` is the same as saying `(n % (gauge*4) == mods4[0][1] or n % (gauge*4) == mods4[1][1])` #TODO: #check
+				skip |= ~layout.validMask(bed1, "+")
+				maskedXfers(k, ns, [(bed2, bed1, ~skip & needleMask(ns, _bn_locs.get(bed1, [])) & layout.modMask("+", gauge*2, mods2[1]))]) # `n % (gauge*2) == mods2[1]` is the same as saying `(n % (gauge*4) == mods4[0][1] or n % (gauge*4) == mods4[1][1])` #TODO: #check
 			
 		# reset settings
 		if speed_number is not None: k.speedNumber(speed_number)
@@ -361,6 +350,7 @@ def rib(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], List
 	else: rh_p = -1
 
 	cs = c2cs(c) # ensure tuple type
+	avoid_bns, bn_locs = toNeedleSet(avoid_bns), toNeedleSet(bn_locs) # (normalized once, so membership checks below are O(1))
 
 	k.comment(f"begin {bed +'-bed ' if bed is not None else ''}rib ({sequence})")
 
@@ -377,6 +367,7 @@ def rib(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], List
 		d1 = "+"
 		d2 = "-"
 		n_ranges = {d1: range(start_n, end_n+1), d2: range(end_n, start_n-1, -1)}
+		layout = getNeedleLayout(start_n, end_n, gauge)
 		#
 		border_edge_ns = {"+": [(start_n-border_width, start_n-1), (end_n+1, end_n+border_width)], "-": [(end_n+border_width, end_n+1), (start_n-1, start_n-border_width)]}
 		#
@@ -385,6 +376,7 @@ def rib(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], List
 		d1 = "-"
 		d2 = "+"
 		n_ranges = {d1: range(start_n, end_n-1, -1), d2: range(end_n, start_n+1)}
+		layout = getNeedleLayout(end_n, start_n, gauge)
 		#
 		border_edge_ns = {"+": [(end_n-border_width, end_n-1), (start_n+1, start_n+border_width)], "-": [(start_n+border_width, start_n+1), (end_n-1, end_n-border_width)]}
 		#
@@ -393,12 +385,12 @@ def rib(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], List
 	if bed is None:
 		bed = "f"
 		# bed1, bed2 = "f", "b"
-		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = {"f": [n for n in n_ranges[d1] if bnValid("f", n, gauge)], "b": [n for n in n_ranges[d1] if bnValid("b", n, gauge)]} #make sure we transfer to get them where we want #TODO: #check
+		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = NeedleSet({"f": [n for n in n_ranges[d1] if bnValid("f", n, gauge)], "b": [n for n in n_ranges[d1] if bnValid("b", n, gauge)]}) #make sure we transfer to get them where we want #TODO: #check
 		else: _bn_locs = bn_locs.copy()
 	else:
 		# if bed == "f": bed1, bed2 = "f", "b"
 		# else: bed1, bed2 = "b", "f"
-		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = {bed: [n for n in n_ranges[d1] if bnValid(bed, n, gauge)]} #make sure we transfer to get them where we want #TODO: #check
+		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = NeedleSet({bed: [n for n in n_ranges[d1] if bnValid(bed, n, gauge)]}) #make sure we transfer to get them where we want #TODO: #check
 		else: _bn_locs = bn_locs.copy()
 
 	secure_needles = {"f": [], "b": []}
@@ -413,16 +405,15 @@ def rib(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], List
 		if secure_start_n: secure_needles[edge_bns[1][0]].append(edge_bns[1][1])
 
 	# now let's make sure we have *all* the info in one dict
-	xfer_bns = {"f": [n for n in _bn_locs.get("f", []) if sequence[n % len(sequence)] == "b" and bnValid(bed, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles["f"]], "b": [n for n in _bn_locs.get("b", []) if sequence[n % len(sequence)] == "f" and bnValid(bed, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles["b"]]}
+	xfer_bns = NeedleSet({"f": [n for n in _bn_locs.get("f", []) if sequence[n % len(sequence)] == "b" and bnValid(bed, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles["f"]], "b": [n for n in _bn_locs.get("b", []) if sequence[n % len(sequence)] == "f" and bnValid(bed, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles["b"]]})
 	# xfer_bns = {"f": [n for n in list(set(_bn_locs.get("f", [])+bn_locs.get("f", []))) if sequence[n % len(sequence)] == "b" and bnValid(bed1, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles["f"]], "b": [n for n in list(set(_bn_locs.get("b", [])+bn_locs.get("b", []))) if sequence[n % len(sequence)] == "f" and bnValid(bed1, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles["b"]]}
 
 	if len(xfer_bns["f"]) or len(xfer_bns["b"]): # indicates that we might need to start by xferring to proper spots
 		if xfer_speed_number is not None: k.speedNumber(xfer_speed_number)
 		if xfer_stitch_number is not None: k.stitchNumber(xfer_stitch_number)
 
-		for n in n_ranges[d1]: #TODO: #check adjustment for gauge
-			if n in xfer_bns["f"]: k.xfer(f"f{n}", f"b{n}")
-			elif n in xfer_bns["b"]: k.xfer(f"b{n}", f"f{n}")
+		ns = layout.needles(d1) #TODO: #check adjustment for gauge
+		maskedXfers(k, ns, [("f", "b", needleMask(ns, xfer_bns["f"])), ("b", "f", needleMask(ns, xfer_bns["b"]))])
 
 		if speed_number is not None: k.speedNumber(speed_number)
 		if stitch_number is not None: k.stitchNumber(stitch_number)
@@ -434,38 +425,43 @@ def rib(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], List
 	
 	if bn_locs is None: print("TODO: add caston") #debug
 
-	#TODO: maybe change stitch size for rib? k.stitchNumber(math.ceil(specs.stitchNumber/2)) (if so -- remember to reset settings)
-	for p in range(passes):
-		if p % 2 == 0:
-			d = d1
-			last_n = end_n
-		else:
-			d = d2
-			last_n = start_n
+	def ribPass(d, last_n):
+		ns = layout.needles(d)
+		valid = layout.validMask(bed, d)
+		return passTemplate(d, ns, [
+			("f", needleMask(ns, secure_needles["f"]) & ~needleMask(ns, _bn_locs.get("b", []))), #TODO: #check
+			("b", needleMask(ns, secure_needles["b"]) & ~needleMask(ns, _bn_locs.get("f", []))), #TODO: #check
+			("f", layout.sequenceMask(d, sequence, "f") & ~needleMask(ns, avoid_bns.get("f", [])) & valid), #xferred it or bed1 == "f", ok to knit
+			("b", layout.sequenceMask(d, sequence, "b") & ~needleMask(ns, avoid_bns.get("b", [])) & valid) #xferred it or bed1 == "b", ok to knit
+		], miss_bn=("f", last_n))
 
-		if border_width: interlock(k, start_n=border_edge_ns[d][0][0], end_n=border_edge_ns[d][0][-1], passes=1, c=cs, gauge=gauge)
+	def releaseHook():
+		if machine.lower() != "kniterate": k.releasehook(*cs)
+		if tuck_pattern: tuckPattern(k, first_n=first_n, direction=d1, c=None) # drop it
 
-		for n in n_ranges[d]:
-			if n in secure_needles["f"] and n not in _bn_locs.get("b", []): k.knit(d, f"f{n}", *cs) #TODO: #check
-			elif n in secure_needles["b"] and n not in _bn_locs.get("f", []): k.knit(d, f"b{n}", *cs) #TODO: #check
-			elif sequence[n % len(sequence)] == "f" and n not in avoid_bns.get("f", []) and bnValid(bed, n, gauge): k.knit(d, f"f{n}", *cs) #xferred it or bed1 == "f", ok to knit
-			elif sequence[n % len(sequence)] == "b" and n not in avoid_bns.get("b", []) and bnValid(bed, n, gauge): k.knit(d, f"b{n}", *cs) #xferred it or bed1 == "b", ok to knit
-			elif n == last_n: k.miss(d, f"f{n}", *cs)
-		#
-		if border_width: interlock(k, start_n=border_edge_ns[d][1][0], end_n=border_edge_ns[d][1][-1], passes=1, c=cs, gauge=gauge)
+	# each distinct pass is only built once, then replayed
+	templates = [ribPass(d1, end_n), ribPass(d2, start_n)]
 
-		if p == rh_p:
-			if machine.lower() != "kniterate": k.releasehook(*cs)
-			if tuck_pattern: tuckPattern(k, first_n=first_n, direction=d1, c=None) # drop it
+	#TODO: maybe change stitch size for rib? k.stitchNumber(math.ceil(specs.stitchNumber/2)) (if so -- remember to reset settings)
+	if border_width:
+		for p in range(passes):
+			if p % 2 == 0: d = d1
+			else: d = d2
+
+			interlock(k, start_n=border_edge_ns[d][0][0], end_n=border_edge_ns[d][0][-1], passes=1, c=cs, gauge=gauge)
+			k.addTemplate(templates[p % 2], *cs)
+			interlock(k, start_n=border_edge_ns[d][1][0], end_n=border_edge_ns[d][1][-1], passes=1, c=cs, gauge=gauge)
+
+			if p == rh_p: releaseHook()
+	else: replayPasses(k, templates, passes, cs, after_pass=(rh_p, releaseHook))
 
 	# return the loops:
 	if xfer_bns_back and (len(xfer_bns["f"]) or len(xfer_bns["b"])):
 		if xfer_speed_number is not None: k.speedNumber(xfer_speed_number)
 		if xfer_stitch_number is not None: k.stitchNumber(xfer_stitch_number)
 
-		for n in n_ranges[d1]:
-			if n in xfer_bns["f"]: k.xfer(f"b{n}", f"f{n}")
-			elif n in xfer_bns["b"]: k.xfer(f"f{n}", f"b{n}")
+		ns = layout.needles(d1)
+		maskedXfers(k, ns, [("b", "f", needleMask(ns, xfer_bns["f"])), ("f", "b", needleMask(ns, xfer_bns["b"]))])
 			
 		if speed_number is not None: k.speedNumber(speed_number)
 		if stitch_number is not None: k.stitchNumber(stitch_number)
@@ -523,6 +519,7 @@ def seed(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], Lis
 	else: rh_p = -1
 
 	cs = c2cs(c) # ensure tuple type
+	avoid_bns, bn_locs = toNeedleSet(avoid_bns), toNeedleSet(bn_locs) # (normalized once, so membership checks below are O(1))
 
 	k.comment(f"begin {bed +'-bed ' if bed is not None else ''}seed ({sequence})")
 
@@ -532,19 +529,21 @@ def seed(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], Lis
 	if end_n > start_n or init_direction == "+": #first pass is pos
 		d1, d2 = "+", "-"
 		n_ranges = {d1: range(start_n, end_n+1), d2: range(end_n, start_n-1, -1)}
+		layout = getNeedleLayout(start_n, end_n, gauge)
 	else: #first pass is neg
 		d1, d2 = "-", "+"
 		n_ranges = {d1: range(start_n, end_n-1, -1), d2: range(end_n, start_n+1)}
+		layout = getNeedleLayout(end_n, start_n, gauge)
 	
 	if bed is None:
 		bed = "f"
 		# bed1, bed2 = "f", "b"
-		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = {"f": [n for n in n_ranges[d1] if bnValid("f", n, gauge)], "b": [n for n in n_ranges[d1] if bnValid("b", n, gauge)]} #make sure we transfer to get them where we want #TODO: #check
+		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = NeedleSet({"f": [n for n in n_ranges[d1] if bnValid("f", n, gauge)], "b": [n for n in n_ranges[d1] if bnValid("b", n, gauge)]}) #make sure we transfer to get them where we want #TODO: #check
 		else: _bn_locs = bn_locs.copy()
 	else:
 		# if bed == "f": bed1, bed2 = "f", "b"
 		# else: bed1, bed2 = "b", "f"
-		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = {bed: [n for n in n_ranges[d1] if bnValid(bed, n, gauge)]} #make sure we transfer to get them where we want #TODO: #check
+		if bn_locs is None or (not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", []))): _bn_locs = NeedleSet({bed: [n for n in n_ranges[d1] if bnValid(bed, n, gauge)]}) #make sure we transfer to get them where we want #TODO: #check
 		else: _bn_locs = bn_locs.copy()
 
 	# if bed is not None: _bn_locs = {bed: [n for n in n_ranges[d1] if bnValid(bed, n, gauge)]} #make sure we transfer to get them where we want #TODO; #check
@@ -567,15 +566,14 @@ def seed(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], Lis
 		if secure_end_n: secure_needles[edge_bns[0][0]].append(edge_bns[0][1])
 		if secure_start_n: secure_needles[edge_bns[1][0]].append(edge_bns[1][1])
 
-	xfer_bns = {"f": [n for n in _bn_locs.get("f", []) if sequence[n % len(sequence)] == "b" and bnValid(bed, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles["f"]], "b": [n for n in _bn_locs.get("b", []) if sequence[n % len(sequence)] == "f" and bnValid(bed, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles["b"]]}
+	xfer_bns = NeedleSet({"f": [n for n in _bn_locs.get("f", []) if sequence[n % len(sequence)] == "b" and bnValid(bed, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles["f"]], "b": [n for n in _bn_locs.get("b", []) if sequence[n % len(sequence)] == "f" and bnValid(bed, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles["b"]]})
 
 	if len(xfer_bns["f"]) or len(xfer_bns["b"]): # indicates that we might need to start by xferring to proper spots
 		if xfer_speed_number is not None: k.speedNumber(xfer_speed_number)
 		if xfer_stitch_number is not None: k.stitchNumber(xfer_stitch_number)
 
-		for n in n_ranges[d1]:
-			if n in xfer_bns["f"]: k.xfer(f"f{n}", f"b{n}")
-			elif n in xfer_bns["b"]: k.xfer(f"b{n}", f"f{n}")
+		ns = layout.needles(d1)
+		maskedXfers(k, ns, [("f", "b", needleMask(ns, xfer_bns["f"])), ("b", "f", needleMask(ns, xfer_bns["b"]))])
 			
 		if speed_number is not None: k.speedNumber(speed_number)
 		if stitch_number is not None: k.stitchNumber(stitch_number)
@@ -590,32 +588,27 @@ def seed(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], Lis
 			d = d1
 			last_n = end_n
 
-			for n in n_ranges[d]:
-				if bnValid(bed, n, gauge):
-					if n in secure_needles["f"] and n not in _bn_locs.get("b", []): k.knit(d, f"f{n}", *cs) #TODO: #check
-					elif n in secure_needles["b"] and n not in _bn_locs.get("f", []): k.knit(d, f"b{n}", *cs) #TODO: #check
-					else:
-						if n not in avoid_bns.get("f", []) and (sequence[n % len(sequence)] == "f" or (sequence[n % len(sequence)] == "b" and n in avoid_bns.get("b", []))): k.knit(d, f"f{n}", *cs) #xferred it or bed1 == "f", ok to knit
-						elif n not in avoid_bns.get("b", []) and (sequence[n % len(sequence)] == "b" or (sequence[n % len(sequence)] == "f" and n in avoid_bns.get("f", []))): k.knit(d, f"b{n}", *cs) #xferred it or bed1 == "b", ok to knit
-						elif n == last_n: k.miss(d, f"f{n}", *cs)
-				elif n == last_n: k.miss(d, f"f{n}", *cs)
+			ns = layout.needles(d)
+			valid = layout.validMask(bed, d)
+			seq_f, seq_b = layout.sequenceMask(d, sequence, "f"), layout.sequenceMask(d, sequence, "b")
+			avoid_f, avoid_b = needleMask(ns, avoid_bns.get("f", [])), needleMask(ns, avoid_bns.get("b", []))
+			maskedPass(k, d, ns, [
+				("f", valid & needleMask(ns, secure_needles["f"]) & ~needleMask(ns, _bn_locs.get("b", []))), #TODO: #check
+				("b", valid & needleMask(ns, secure_needles["b"]) & ~needleMask(ns, _bn_locs.get("f", []))), #TODO: #check
+				("f", valid & ~avoid_f & (seq_f | (seq_b & avoid_b))), #xferred it or bed1 == "f", ok to knit
+				("b", valid & ~avoid_b & (seq_b | (seq_f & avoid_f))) #xferred it or bed1 == "b", ok to knit
+			], cs, miss_bn=("f", last_n))
 			
 			if xfer_speed_number is not None: k.speedNumber(xfer_speed_number)
 			if xfer_stitch_number is not None: k.stitchNumber(xfer_stitch_number)
 
 			if p < passes-1:
-				for n in n_ranges[d]:
-					if n in avoid_bns.get("f", []) or n in avoid_bns.get("b", []): continue
-					elif bnValid(bed, n, gauge):
-						if sequence[n % len(sequence)] == "f" and n not in secure_needles["f"]: k.xfer(f"f{n}", f"b{n}")
-						elif sequence[n % len(sequence)] == "b" and n not in secure_needles["b"]: k.xfer(f"b{n}", f"f{n}")
+				base = valid & ~avoid_f & ~avoid_b
+				maskedXfers(k, ns, [("f", "b", base & seq_f & ~needleMask(ns, secure_needles["f"])), ("b", "f", base & seq_b & ~needleMask(ns, secure_needles["b"]))])
 			elif xfer_bns_back:
 				# return the loops:
-				for n in n_ranges[d]:
-					if n in avoid_bns.get("f", []) or n in avoid_bns.get("b", []) or n in secure_needles["f"] or n in secure_needles["b"]: continue
-					elif bnValid(bed, n, gauge):
-						if sequence[n % len(sequence)] == "f" and n in xfer_bns.get("b", []): k.xfer(f"f{n}", f"b{n}")
-						elif sequence[n % len(sequence)] == "b" and n in xfer_bns.get("f", []): k.xfer(f"b{n}", f"f{n}")
+				base = valid & ~avoid_f & ~avoid_b & ~needleMask(ns, secure_needles["f"]) & ~needleMask(ns, secure_needles["b"])
+				maskedXfers(k, ns, [("f", "b", base & seq_f & needleMask(ns, xfer_bns.get("b", []))), ("b", "f", base & seq_b & needleMask(ns, xfer_bns.get("f", [])))])
 
 			if speed_number is not None: k.speedNumber(speed_number)
 			if stitch_number is not None: k.stitchNumber(stitch_number)
@@ -623,32 +616,27 @@ def seed(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], Lis
 			d = d2
 			last_n = start_n
 
-			for n in n_ranges[d]:
-				if bnValid(bed, n, gauge):
-					if n in secure_needles["f"] and n not in _bn_locs.get("b", []): k.knit(d, f"f{n}", *cs) #TODO: #check
-					elif n in secure_needles["b"] and n not in _bn_locs.get("f", []): k.knit(d, f"b{n}", *cs) #TODO: #check
-					else:
-						if n not in avoid_bns.get("b", []) and (sequence[n % len(sequence)] == "f" or (sequence[n % len(sequence)] == "b" and n in avoid_bns.get("f", []))): k.knit(d, f"b{n}", *cs) #xferred it or bed1 == "f", ok to knit
-						elif n not in avoid_bns.get("f", []) and (sequence[n % len(sequence)] == "b" or (sequence[n % len(sequence)] == "f" and n in avoid_bns.get("b", []))): k.knit(d, f"f{n}", *cs) #xferred it or bed1 == "b", ok to knit
-						elif n == last_n: k.miss(d, f"f{n}", *cs)
-				elif n == last_n: k.miss(d, f"f{n}", *cs)
+			ns = layout.needles(d)
+			valid = layout.validMask(bed, d)
+			seq_f, seq_b = layout.sequenceMask(d, sequence, "f"), layout.sequenceMask(d, sequence, "b")
+			avoid_f, avoid_b = needleMask(ns, avoid_bns.get("f", [])), needleMask(ns, avoid_bns.get("b", []))
+			maskedPass(k, d, ns, [
+				("f", valid & needleMask(ns, secure_needles["f"]) & ~needleMask(ns, _bn_locs.get("b", []))), #TODO: #check
+				("b", valid & needleMask(ns, secure_needles["b"]) & ~needleMask(ns, _bn_locs.get("f", []))), #TODO: #check
+				("b", valid & ~avoid_b & (seq_f | (seq_b & avoid_f))), #xferred it or bed1 == "f", ok to knit
+				("f", valid & ~avoid_f & (seq_b | (seq_f & avoid_b))) #xferred it or bed1 == "b", ok to knit
+			], cs, miss_bn=("f", last_n))
 
 			if xfer_speed_number is not None: k.speedNumber(xfer_speed_number)
 			if xfer_stitch_number is not None: k.stitchNumber(xfer_stitch_number)
 
 			if p < passes-1:
-				for n in n_ranges[d]:
-					if n in avoid_bns.get("f", []) or n in avoid_bns.get("b", []): continue
-					elif n not in secure_needles and bnValid(bed, n, gauge):
-						if sequence[n % len(sequence)] == "f": k.xfer(f"b{n}", f"f{n}")
-						else: k.xfer(f"f{n}", f"b{n}")
+				base = valid & ~avoid_f & ~avoid_b # (`secure_needles` is keyed by bed, so secure needles are xferred here too)
+				maskedXfers(k, ns, [("b", "f", base & seq_f), ("f", "b", base & ~seq_f)])
 			elif xfer_bns_back:
-				# return the loops:
-				for n in n_ranges[d]: #TODO: adjust for gauge
-					if n in avoid_bns.get("f", []) or n in avoid_bns.get("b", []) or n in secure_needles["f"] or n in secure_needles["b"]: continue
-					elif bnValid(bed, n, gauge):
-						if sequence[n % len(sequence)] == "f" and n in xfer_bns.get("f", []): k.xfer(f"b{n}", f"f{n}")
-						elif sequence[n % len(sequence)] == "b" and n in xfer_bns.get("b", []): k.xfer(f"f{n}", f"b{n}")
+				# return the loops: #TODO: adjust for gauge
+				base = valid & ~avoid_f & ~avoid_b & ~needleMask(ns, secure_needles["f"]) & ~needleMask(ns, secure_needles["b"])
+				maskedXfers(k, ns, [("b", "f", base & seq_f & needleMask(ns, xfer_bns.get("f", []))), ("f", "b", base & seq_b & needleMask(ns, xfer_bns.get("b", [])))])
 			
 			if speed_number is not None: k.speedNumber(speed_number)
 			if stitch_number is not None: k.stitchNumber(stitch_number)
@@ -660,7 +648,7 @@ def seed(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], Lis
 	k.comment(f"end {bed +'-bed ' if bed is not None else ''}seed ({sequence})")
 
 	# return next direction
-	if bnValid(bed, n, gauge) % 2 == 0: #TODO: #check
+	if bnValid(bed, last_n, gauge) % 2 == 0: #TODO: #check
 		if end_n > start_n: return "+"
 		else: return "-"
 	else:
@@ -714,6 +702,7 @@ def garter(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], L
 	else: rh_p = -1
 
 	cs = c2cs(c) # ensure tuple type
+	avoid_bns, bn_locs = toNeedleSet(avoid_bns), toNeedleSet(bn_locs) # (normalized once, so membership checks below are O(1))
 
 	pattern_rows = {"f": sequence.count("f"), "b": sequence.count("b")}
 
@@ -725,20 +714,22 @@ def garter(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], L
 	if end_n > start_n or init_direction == "+": #first pass is pos
 		d1, d2 = "+", "-"
 		n_ranges = {"+": range(start_n, end_n+1), "-": range(end_n, start_n-1, -1)}
+		layout = getNeedleLayout(start_n, end_n, gauge)
 	else: #first pass is neg
 		d1, d2 = "-", "+"
 		n_ranges = {"-": range(start_n, end_n-1, -1), "+": range(end_n, start_n+1)}
+		layout = getNeedleLayout(end_n, start_n, gauge)
 
 	if bed is None:
 		bed = "f"
 		# bed1, bed2 = "f", "b"
 		if not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", [])):
-			_bn_locs = {"f": [n for n in n_ranges[d1] if bnValid("f", n, gauge)], "b": [n for n in n_ranges[d1] if bnValid("b", n, gauge)]} #assume loops on both beds
+			_bn_locs = NeedleSet({"f": [n for n in n_ranges[d1] if bnValid("f", n, gauge)], "b": [n for n in n_ranges[d1] if bnValid("b", n, gauge)]}) #assume loops on both beds
 		else: _bn_locs = bn_locs.copy()
 	else:
 		# if bed == "f": bed1, bed2 = "f", "b"
 		# else: bed1, bed2 = "b", "f"
-		if not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", [])): _bn_locs = {bed: [n for n in n_ranges[d1] if bnValid(bed, n, gauge)]} #make sure we transfer to get them where we want #TODO: #check
+		if not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", [])): _bn_locs = NeedleSet({bed: [n for n in n_ranges[d1] if bnValid(bed, n, gauge)]}) #make sure we transfer to get them where we want #TODO: #check
 		else: _bn_locs = bn_locs.copy()
 
 	# if bed is not None: _bn_locs = {bed: [n for n in n_ranges[d1] if bnValid(bed, n, gauge)]} #make sure we transfer to get them where we want #TODO; #check
@@ -767,12 +758,12 @@ def garter(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], L
 	b1 = sequence[0]
 	b2 = "f" if b1 == "b" else "b"
 
-	xfer_bns = {b2: [n for n in _bn_locs.get(b2, []) if bnValid(bed, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles[b2]]}
+	xfer_bns = NeedleSet({b2: [n for n in _bn_locs.get(b2, []) if bnValid(bed, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles[b2]]})
 	# xfer_bns = {b2: [n for n in list(set(_bn_locs.get(b2, [])+bn_locs.get(b2, []))) if bnValid(bed, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles[b2]]}
 
 	if len(xfer_bns[b2]):
-		for n in n_ranges[d2]:
-			if n in xfer_bns[b2]: k.xfer(f"{b2}{n}", f"{b1}{n}")
+		ns = layout.needles(d2)
+		maskedXfers(k, ns, [(b2, b1, needleMask(ns, xfer_bns[b2]))])
 	
 	if inhook:
 		if machine.lower() == "kniterate": k.incarrier(*cs)
@@ -787,9 +778,8 @@ def garter(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], L
 			if xfer_speed_number is not None: k.speedNumber(xfer_speed_number)
 			if xfer_stitch_number is not None: k.stitchNumber(xfer_stitch_number)
 			
-			for n in n_ranges[d]:
-				if n in avoid_bns.get("f", []) or n in avoid_bns.get("b", []): continue
-				elif bnValid(bed, n, gauge) and n not in secure_needles[b1]: k.xfer(f"{b1}{n}", f"{sequence[p % len(sequence)]}{n}")
+			ns = layout.needles(d)
+			maskedXfers(k, ns, [(b1, sequence[p % len(sequence)], ~needleMask(ns, avoid_bns.get("f", [])) & ~needleMask(ns, avoid_bns.get("b", [])) & layout.validMask(bed, d) & ~needleMask(ns, secure_needles[b1]))])
 
 			if speed_number is not None: k.speedNumber(speed_number)
 			if stitch_number is not None: k.stitchNumber(stitch_number)
@@ -797,12 +787,10 @@ def garter(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], L
 		b1 = sequence[p % len(sequence)]
 		b2 = "f" if b1 == "b" else "b"
 
-		for n in n_ranges[d]:
-			if bnValid(bed, n, gauge):
-				if n in secure_needles[b2] or (n in avoid_bns[b1] and n not in avoid_bns[b2]): k.knit(d, f"{b2}{n}", *cs)
-				elif n not in avoid_bns[b1]: k.knit(d, f"{b1}{n}", *cs)
-				elif n == end_n: k.miss(d, f"{b1}{n}", *cs)
-			elif n == end_n: k.miss(d, f"{b1}{n}", *cs)
+		ns = layout.needles(d)
+		valid = layout.validMask(bed, d)
+		avoid1, avoid2 = needleMask(ns, avoid_bns[b1]), needleMask(ns, avoid_bns[b2])
+		maskedPass(k, d, ns, [(b2, valid & (needleMask(ns, secure_needles[b2]) | (avoid1 & ~avoid2))), (b1, valid & ~avoid1)], cs, miss_bn=(b1, end_n))
 		
 		if p == rh_p:
 			if machine.lower() != "kniterate": k.releasehook(*cs)
@@ -811,8 +799,8 @@ def garter(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str], L
 	#return loops
 	b2 = "f" if b1 == "b" else "b"
 	if xfer_bns_back and len(xfer_bns.get(b2, [])):
-		for n in n_ranges[d]:
-			if n in xfer_bns[b2]: k.xfer(f"{b1}{n}", f"{b2}{n}")
+		ns = layout.needles(d)
+		maskedXfers(k, ns, [(b1, b2, needleMask(ns, xfer_bns[b2]))])
 
 	if type(pattern_rows) == dict: k.comment(f"end {pattern_rows['f']}x{pattern_rows['b']} garter")
 	else: k.comment(f"end {pattern_rows}x{pattern_rows} garter")
@@ -870,6 +858,7 @@ def tuckGarter(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str
 	else: rh_p = -1
 
 	cs = c2cs(c) # ensure tuple type
+	avoid_bns, bn_locs = toNeedleSet(avoid_bns), toNeedleSet(bn_locs) # (normalized once, so membership checks below are O(1))
 
 	pattern_rows = {"f": sequence.count("f"), "b": sequence.count("b")}
 
@@ -889,12 +878,12 @@ def tuckGarter(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str
 	if bed is None:
 		bed1, bed2 = "f", "b"
 		if not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", [])):
-			_bn_locs = {"f": [n for n in n_ranges[d1] if bnValid("f", n, gauge)], "b": [n for n in n_ranges[d1] if bnValid("b", n, gauge)]} #assume loops on both beds
+			_bn_locs = NeedleSet({"f": [n for n in n_ranges[d1] if bnValid("f", n, gauge)], "b": [n for n in n_ranges[d1] if bnValid("b", n, gauge)]}) #assume loops on both beds
 		else: _bn_locs = bn_locs.copy()
 	else:
 		if bed == "f": bed1, bed2 = "f", "b"
 		else: bed1, bed2 = "b", "f"
-		if not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", [])): _bn_locs = {bed1: [n for n in n_ranges[d1] if bnValid(bed1, n, gauge)]} #make sure we transfer to get them where we want #TODO: #check
+		if not len(bn_locs.get("f", [])) and not len(bn_locs.get("b", [])): _bn_locs = NeedleSet({bed1: [n for n in n_ranges[d1] if bnValid(bed1, n, gauge)]}) #make sure we transfer to get them where we want #TODO: #check
 		else: _bn_locs = bn_locs.copy()
 
 	secure_needles = {"f": [], "b": []}
@@ -920,7 +909,7 @@ def tuckGarter(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str
 
 	pattern_rows[b1] += 1 #for the tucks
 
-	xfer_bns = {b2: [n for n in _bn_locs.get(b2, []) if bnValid(bed1, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles[b2]]}
+	xfer_bns = NeedleSet({b2: [n for n in _bn_locs.get(b2, []) if bnValid(bed1, n, gauge) and n not in avoid_bns.get("f", []) and n not in avoid_bns.get("b", []) and n not in secure_needles[b2]]})
 
 	if len(xfer_bns[b2]):
 		for n in n_ranges[d2]:
@@ -1028,6 +1017,7 @@ def tuckStitch(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[str
 	else: rh_p = -1
 
 	cs = c2cs(c) # ensure tuple type
+	avoid_bns, bn_locs = toNeedleSet(avoid_bns), toNeedleSet(bn_locs) # (normalized once, so membership checks below are O(1))
 
 	k.comment(f"begin {bed +'-bed ' if bed is not None else ''}tuck stitch ({sequence})")
 
@@ -1143,6 +1133,7 @@ def altKnitTuck(k, start_n: int, end_n: int, passes: int, c: Union[str, Tuple[st
 	else: rh_p = -1
 
 	cs = c2cs(c) # ensure tuple type
+	avoid_bns, bn_locs = toNeedleSet(avoid_bns), toNeedleSet(bn_locs) # (normalized once, so membership checks below are O(1))
 
 	k.comment(f"begin {bed +'-bed ' if bed is not None else ''}alt knit/tuck ({sequence})")
 
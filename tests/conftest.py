@@ -0,0 +1,49 @@
+import contextlib
+import importlib.util
+import io
+import sys
+import warnings
+from pathlib import Path
+
+import pytest
+
+## Register the repo as the `knitlib` package, whatever the clone's folder is named
+ROOT = Path(__file__).absolute().parents[1]
+if "knitlib" not in sys.modules:
+	spec = importlib.util.spec_from_file_location("knitlib", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)])
+	module = importlib.util.module_from_spec(spec)
+	sys.modules["knitlib"] = module
+	spec.loader.exec_module(module)
+
+from knitlib.knitlib_knitout import Writer
+
+
+@pytest.fixture
+def k():
+	'''
+	Fresh Writer, with warnings ignored (the Writer sets up its own filters when it's created).
+	'''
+	res = Writer("1 2 3 4 5 6")
+	with warnings.catch_warnings():
+		warnings.simplefilter("ignore")
+		yield res
+
+
+@pytest.fixture
+def knitted(k):
+	'''
+	Writer holding a small program: a cast-on, some jersey passes (stored as repeats), edge decreases, and stitch/speed number changes, with the carrier left in.
+	'''
+	from knitlib.knit_object import KnitObject, CastonMethod, StitchPattern, DecreaseMethod
+	from knitlib.stitch_patterns import jersey
+	#
+	obj = KnitObject(k, gauge=1, stitch_number=30, speed_number=200)
+	with contextlib.redirect_stdout(io.StringIO()):
+		obj.caston(CastonMethod.ALT_TUCK_CLOSED, "f", (20, 0), "1")
+		for _ in range(2):
+			obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+		obj.decreaseLeft(DecreaseMethod.EDGE, "f", 2)
+		obj.decreaseRight(DecreaseMethod.EDGE, "f", 1)
+		jersey(k, 19, 2, 6, "1")
+	k.comment("end of the test program")
+	return k
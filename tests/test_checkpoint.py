@@ -0,0 +1,92 @@
+import contextlib
+import io
+import pickle
+
+import pytest
+
+from knitlib.knitlib_knitout import Writer
+from knitlib.knit_object import KnitObject, CastonMethod, StitchPattern, DecreaseMethod
+from knitlib.checkpoint import Checkpoint
+from knitlib.stitch_patterns import jersey
+
+
+def state(k: Writer) -> tuple:
+	bns = [(bn, k.bns.snapshot(*bn).loop_ct, k.bns.snapshot(*bn).stitch_ct) for bn in k.bns.keys()]
+	carriers = {c: (carrier.direction, carrier.bed, carrier.needle) for c, carrier in k.carrier_map.items()}
+	return bns, carriers, k.rack_value, k.stitch_number, k.speed_number, k.hook_active, k.line_number
+
+
+def lines(k: Writer) -> list:
+	return [str(line) for line in k.operations]
+
+
+def finish(k: Writer) -> None:
+	jersey(k, 19, 2, 3, "1")
+	k.rack(1)
+	k.xfer("f2", "b1")
+	k.rack(0)
+
+
+def test_save_and_load(knitted, tmp_path):
+	knitted.saveCheckpoint(tmp_path / "program.ckpt")
+	expected = (lines(knitted), state(knitted))
+	finish(knitted)
+	#
+	k = Writer.loadCheckpoint(tmp_path / "program.ckpt")
+	assert (lines(k), state(k)) == expected
+	assert list(k.operations.repeats) == list(knitted.operations.repeats)
+	finish(k)
+	assert (lines(k), state(k)) == (lines(knitted), state(knitted))
+	#
+	knitted.write(tmp_path / "a.k")
+	k.write(tmp_path / "b.k")
+	assert (tmp_path / "a.k").read_bytes() == (tmp_path / "b.k").read_bytes()
+
+
+def test_save_earlier_checkpoint(knitted, tmp_path):
+	checkpoint = knitted.checkpoint()
+	expected = (lines(knitted), state(knitted))
+	finish(knitted)
+	knitted.saveCheckpoint(tmp_path / "program.ckpt", checkpoint)
+	k = Writer.loadCheckpoint(tmp_path / "program.ckpt")
+	assert (lines(k), state(k)) == expected
+
+
+def test_restore(knitted):
+	checkpoint = knitted.checkpoint()
+	expected = (lines(knitted), state(knitted))
+	for _ in range(2): # (the same checkpoint can be restored again)
+		finish(knitted)
+		assert lines(knitted) != expected[0]
+		knitted.restore(checkpoint)
+		assert (lines(knitted), state(knitted)) == expected
+
+
+def test_restore_past_truncation(knitted):
+	checkpoint = knitted.checkpoint()
+	knitted.operations.truncate(10)
+	with pytest.raises(ValueError):
+		knitted.restore(checkpoint)
+
+
+def test_knit_object_round_trip(k, tmp_path):
+	obj = KnitObject(k, gauge=1, stitch_number=30)
+	with contextlib.redirect_stdout(io.StringIO()):
+		obj.caston(CastonMethod.ALT_TUCK_CLOSED, "f", (20, 0), "1")
+		obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+		obj.saveCheckpoint(tmp_path / "obj.ckpt")
+		#
+		obj2 = KnitObject.loadCheckpoint(tmp_path / "obj.ckpt")
+		assert obj2.getState() == obj.getState()
+		for o in (obj, obj2):
+			o.decreaseLeft(DecreaseMethod.EDGE, "f", 2)
+			o.knitPass(StitchPattern.JERSEY, "f", None, "1")
+	assert (lines(obj2.k), state(obj2.k)) == (lines(k), state(k))
+	assert obj2.getState() == obj.getState()
+
+
+def test_load_invalid(tmp_path):
+	with open(tmp_path / "other.ckpt", "wb") as f:
+		pickle.dump({"version": Checkpoint.VERSION+1}, f)
+	with pytest.raises(ValueError):
+		Checkpoint.load(tmp_path / "other.ckpt")
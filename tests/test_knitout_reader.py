@@ -0,0 +1,92 @@
+import io
+
+import pytest
+
+from knitlib.knitlib_knitout import Writer
+from knitlib.knitout_reader import KnitoutReader, headerCarriers, parseArg
+from knitlib.op_buffer import OpBuffer
+
+
+def state(k: Writer) -> tuple:
+	'''
+	The parts of a Writer's state that `fromFile` replays (loops on each needle, carriers, settings, and the hook).
+	'''
+	bns = [(bn, k.bns.snapshot(*bn).loop_ct, k.bns.snapshot(*bn).stitch_ct) for bn in k.bns.keys()]
+	carriers = {c: (carrier.direction, carrier.bed, carrier.needle) for c, carrier in k.carrier_map.items()}
+	return bns, carriers, k.rack_value, k.stitch_number, k.speed_number, k.hook_active
+
+
+@pytest.mark.parametrize("filename", ["program.k", "program.k.gz", "program.kops", "program.kops.gz"])
+def test_from_file_round_trip(knitted, tmp_path, filename):
+	knitted.write(tmp_path / filename)
+	k = Writer.fromFile(tmp_path / filename)
+	assert [str(line) for line in k.operations] == [str(line) for line in knitted.operations]
+	assert list(k.headers) == list(knitted.headers)
+	assert state(k) == state(knitted)
+	#
+	# (and writing it back out gives the same program)
+	knitted.write(tmp_path / "a.k")
+	k.write(tmp_path / "b.k")
+	assert (tmp_path / "a.k").read_bytes() == (tmp_path / "b.k").read_bytes()
+
+
+def test_from_file_kops_file_object(knitted, tmp_path):
+	knitted.write(tmp_path / "program.kops")
+	with open(tmp_path / "program.kops", "rb") as f:
+		k = Writer.fromFile(f, binary=True)
+	assert state(k) == state(knitted)
+
+
+def test_from_file_streaming(knitted, tmp_path):
+	knitted.write(tmp_path / "program.k")
+	k = Writer.fromFile(tmp_path / "program.k", stream=tmp_path / "streamed.k", buffer_size=16)
+	assert state(k) == state(knitted)
+	k.write()
+	assert (tmp_path / "streamed.k").read_bytes() == (tmp_path / "program.k").read_bytes()
+
+
+def test_loaded_program_can_be_extended(knitted, tmp_path):
+	knitted.write(tmp_path / "program.kops")
+	k = Writer.fromFile(tmp_path / "program.kops")
+	for w in (k, knitted):
+		w.inhook("1") # (`write` took it out)
+	for n in range(18, -1, -1):
+		k.knit("-", f"f{n}", "1")
+		knitted.knit("-", f"f{n}", "1")
+	assert state(k) == state(knitted)
+
+
+def test_reader(knitted):
+	out = io.StringIO()
+	knitted.write(out)
+	with KnitoutReader(io.StringIO(out.getvalue())) as reader:
+		assert reader.version.startswith(";!knitout-")
+		assert reader.carriers == "1 2 3 4 5 6"
+		ops = OpBuffer()
+		assert reader.readInto(ops) == len(ops)
+	assert [str(line) for line in ops] == [str(line) for line in knitted.operations]
+
+
+def test_unusual_lines_kept_as_raw():
+	text = ";!knitout-2\n;;Carriers: 1 2\nknit + f1 1 ;comment\nx-presser-mode on\npause\nknit + f2 1\n"
+	with KnitoutReader(io.StringIO(text)) as reader:
+		ops = OpBuffer()
+		reader.readInto(ops)
+	assert [str(line) for line in ops] == text.splitlines()[2:]
+
+
+def test_not_knitout():
+	with pytest.raises(ValueError):
+		KnitoutReader(io.StringIO("knit + f1 1\n"))
+
+
+def test_from_file_needs_carriers(tmp_path):
+	(tmp_path / "program.k").write_text(";!knitout-2\nknit + f1 1\n")
+	with pytest.raises(ValueError):
+		Writer.fromFile(tmp_path / "program.k")
+
+
+def test_helpers():
+	assert headerCarriers([";;Machine: SWGN2", ";;Carriers: 1 2 3"]) == "1 2 3"
+	assert headerCarriers([";;Machine: SWGN2"]) is None
+	assert (parseArg("1"), parseArg("0.25"), parseArg("-1")) == (1, 0.25, -1)
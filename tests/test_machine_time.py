@@ -0,0 +1,74 @@
+import contextlib
+import io
+import warnings
+
+import pytest
+
+from knitlib.machine_time import MachineModel, carriagePasses, estimateMachineTime
+from knitlib.generate_swatches import generate
+
+
+def program(*lines: str) -> io.StringIO:
+	return io.StringIO("\n".join([";!knitout-2", ";;Carriers: 1 2 3", *lines]) + "\n")
+
+
+def test_pass_grouping():
+	est = carriagePasses(program(
+		"inhook 1",
+		*(f"knit + f{n} 1" for n in range(4)),
+		";a comment",
+		*(f"knit - f{n} 1" for n in range(3, -1, -1)),
+		"knit - f0 1", # (same needle again)
+		"xfer f0 b0", "xfer f2 b2",
+		"rack 1",
+		"xfer b2 f3",
+		"drop f1", "drop f3",
+		"tuck + f1 1", "knit + f2 2", # (other carriers)
+	))
+	assert [(p.kind, p.direction, p.op_ct) for p in est.passes] == [("knit", "+", 4), ("knit", "-", 4), ("knit", "-", 1), ("xfer", None, 2), ("xfer", None, 1), ("drop", None, 2), ("knit", "+", 1), ("knit", "+", 1)]
+	assert (est.passes[0].start, est.passes[0].end) == (1, 6) # (including the comment after it)
+	assert (est.passes[4].rack, est.passes[4].left, est.passes[4].right) == (1, 3, 3)
+	whole = est.sections[()]
+	assert (whole.passes, whole.knit_passes, whole.xfer_passes, whole.drop_passes) == (8, 5, 2, 1)
+	assert (whole.ops, whole.xfers, whole.racks, whole.hooks) == (16, 3, 1, 1)
+	#
+	model = MachineModel()
+	assert est.time == pytest.approx(sum(p.time for p in est.passes) + model.rack_time + model.hook_time)
+	assert estimateMachineTime(program("knit + f0 1", "knit + f9 1")) == pytest.approx(model.passTime(carriagePasses(program("knit + f0 1", "knit + f9 1")).passes[0]))
+
+
+def test_sections():
+	est = carriagePasses(program(
+		";begin waste section", "knit + f0 1", ";end waste section",
+		";begin swatch: jersey (4x2)", ";begin f-bed jersey", "knit - f0 1", ";end f-bed jersey",
+		";begin tag", "knit + f0 1", # (never ended, so ended along with its swatch)
+		";begin swatch: rib (4x2)", "knit - f0 1",
+		";begin rib (fb)", "knit + f0 1", ";end f-bed rib (ffbb)", # (`end` that doesn't match its `begin`)
+		"knit - f0 1",
+	))
+	assert list(est.sections) == [(), ("waste section",), ("swatch: jersey (4x2)",), ("swatch: jersey (4x2)", "f-bed jersey"), ("swatch: jersey (4x2)", "tag"), ("swatch: rib (4x2)",), ("swatch: rib (4x2)", "rib (fb)")]
+	assert [p.section for p in est.passes] == [("waste section",), ("swatch: jersey (4x2)", "f-bed jersey"), ("swatch: jersey (4x2)", "tag"), ("swatch: rib (4x2)",), ("swatch: rib (4x2)", "rib (fb)"), ("swatch: rib (4x2)",)]
+	assert [est.sections[key].passes for key in est.sections] == [6, 1, 2, 1, 1, 3, 1]
+	assert est.sections[("swatch: rib (4x2)",)].self_time == pytest.approx(est.passes[3].time + est.passes[5].time)
+	assert "swatch: rib (4x2)" in est.report() and "f-bed jersey" not in est.report(depth=1)
+
+
+def test_generated_swatches():
+	with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+		warnings.simplefilter("ignore")
+		k = generate([["jersey", [11, 6], 1, {}], ["rib_fb", [13, 6], 1, {}]], None, processes=1)
+	est = carriagePasses(k)
+	swatches = [key for key in est.sections if len(key) == 1 and key[0].startswith("swatch:")]
+	assert swatches == [("swatch: jersey (11x6)",), ("swatch: rib_fb (13x6)",)] # (side by side, not nested)
+	assert all(sum(name.startswith("swatch:") for name in key) <= 1 for key in est.sections)
+	assert sum(est.sections[key].time for key in est.sections if len(key) == 1) == pytest.approx(est.time - est.sections[()].self_time)
+
+
+def test_speed_number():
+	model = MachineModel()
+	assert model.speed(None) == model.speed(0) == model.default_speed
+	assert model.speed(400) == pytest.approx(1)
+	assert model.speed(400, xfers=True) == model.max_xfer_speed
+	#
+	times = [carriagePasses(program(*speed, *(f"knit + f{n} 1" for n in range(20)))).passes[0].time for speed in ([], ["x-speed-number 0"], ["x-speed-number 100"])]
+	assert times[0] == times[1] < times[2]
@@ -0,0 +1,180 @@
+import io
+
+import numpy as np
+import pytest
+
+from knitlib.op_buffer import OpBuffer, Op, BED_IDS, DIRECTION_IDS
+
+
+def addPass(ops: OpBuffer, d: str, needles, c: str="1") -> None:
+	ops.addOps(Op.KNIT, DIRECTION_IDS[d], BED_IDS["f"], np.asarray(needles), cs=ops.intern(c))
+
+
+def mixed() -> OpBuffer:
+	ops = OpBuffer()
+	ops.append(";a comment")
+	ops.addOp(Op.INHOOK, cs=ops.intern("1"))
+	addPass(ops, "+", range(4))
+	ops.addOp(Op.RACK, cs=ops.intern("1"))
+	ops.addOp(Op.XFER, bed=BED_IDS["f"], n=2, bed2=BED_IDS["b"], n2=1)
+	ops.addOp(Op.SPLIT, DIRECTION_IDS["-"], BED_IDS["b"], 1, BED_IDS["f"], 2, ops.intern("1"))
+	ops.addOp(Op.DROP, bed=BED_IDS["b"], n=3)
+	ops.addOp(Op.STITCH_NUMBER, cs=ops.intern("35"))
+	ops.addOp(Op.MISS, DIRECTION_IDS["-"], BED_IDS["f"], 0, cs=ops.intern("1"))
+	return ops
+
+
+MIXED_LINES = [";a comment", "inhook 1", "knit + f0 1", "knit + f1 1", "knit + f2 1", "knit + f3 1", "rack 1", "xfer f2 b1", "split - b1 f2 1", "drop b3", "x-stitch-number 35", "miss - f0 1"]
+
+
+def test_render():
+	ops = mixed()
+	assert list(ops) == MIXED_LINES
+	assert len(ops) == len(MIXED_LINES)
+	assert ops[2] == "knit + f0 1" and ops[-1] == "miss - f0 1"
+	assert ops[6:8] == MIXED_LINES[6:8]
+	with pytest.raises(IndexError):
+		ops[len(MIXED_LINES)]
+	out = io.StringIO()
+	ops.writeTo(out)
+	assert out.getvalue() == "".join(line+"\n" for line in MIXED_LINES)
+
+
+def test_intern():
+	ops = OpBuffer()
+	assert (ops.intern("1"), ops.intern("2 3"), ops.intern("1")) == (0, 1, 0)
+	assert ops.strings == ["1", "2 3"]
+
+
+def test_add_ops_matches_add_op():
+	a, b = OpBuffer(), OpBuffer()
+	needles = np.array([5, 3, 1])
+	a.addOps(Op.XFER, 0, BED_IDS["f"], needles, np.array([BED_IDS["b"], BED_IDS["bs"], BED_IDS["b"]]), needles+1)
+	for n, bed2 in zip(needles.tolist(), ("b", "bs", "b")):
+		b.addOp(Op.XFER, 0, BED_IDS["f"], n, BED_IDS[bed2], n+1)
+	assert list(a) == list(b) == ["xfer f5 b6", "xfer f3 bs4", "xfer f1 b2"]
+
+
+def test_count_and_columns():
+	ops = mixed()
+	assert (ops.count(), ops.count(Op.KNIT), ops.count(Op.TUCK)) == (len(MIXED_LINES), 4, 0)
+	op, d, bed, n, bed2, n2, cs = ops.columns(2, 6)
+	assert op.tolist() == [Op.KNIT]*4 and n.tolist() == [0, 1, 2, 3]
+	assert [ops.strings[i] for i in cs.tolist()] == ["1"]*4
+
+
+def test_truncate():
+	ops = mixed()
+	ops.truncate(7)
+	assert list(ops) == MIXED_LINES[:7]
+	ops.truncate(10) # (nothing to remove)
+	assert len(ops) == 7
+	ops.append(";after")
+	assert list(ops) == MIXED_LINES[:7] + [";after"]
+
+
+def test_copy_ops_and_add_buffer():
+	ops = mixed()
+	assert list(ops.copyOps()) == MIXED_LINES
+	assert list(ops.copyOps(6)) == MIXED_LINES[6:]
+	#
+	other = OpBuffer()
+	other.intern("unused") # (so the string ids differ)
+	addPass(other, "-", [3, 2], "2")
+	other.addBuffer(ops)
+	assert list(other) == ["knit - f3 2", "knit - f2 2"] + MIXED_LINES
+
+
+def test_remapped():
+	res = mixed().remapped(10, {"1": "4"})
+	assert list(res) == [";a comment", "inhook 4", "knit + f10 4", "knit + f11 4", "knit + f12 4", "knit + f13 4", "rack 1", "xfer f12 b11", "split - b11 f12 4", "drop b13", "x-stitch-number 35", "miss - f10 4"]
+
+
+def test_spooling(tmp_path):
+	ops = OpBuffer(buffer_size=5, dir=tmp_path)
+	for line in MIXED_LINES:
+		ops.append(line)
+	assert ops.spooled_ct == 10 and len(ops) == len(MIXED_LINES)
+	with pytest.raises(ValueError):
+		ops.truncate(3)
+	out = io.StringIO()
+	ops.writeTo(out)
+	assert out.getvalue() == "".join(line+"\n" for line in MIXED_LINES)
+	ops.close()
+
+
+def repeated() -> tuple:
+	'''
+	An op buffer with two repeat blocks (one of them shifting its needles), along with the lines it should expand to.
+	'''
+	ops = OpBuffer()
+	ops.append(";start")
+	addPass(ops, "+", range(3))
+	addPass(ops, "-", range(2, -1, -1))
+	assert ops.addRepeat(6, 2)
+	ops.addOp(Op.XFER, bed=BED_IDS["f"], n=0, bed2=BED_IDS["b"], n2=0)
+	ops.addOp(Op.TUCK, DIRECTION_IDS["+"], BED_IDS["f"], 1, cs=ops.intern("1"))
+	assert ops.addRepeat(2, 3, n_delta=2)
+	ops.append(";end")
+	#
+	passes = [f"knit + f{n} 1" for n in range(3)] + [f"knit - f{n} 1" for n in range(2, -1, -1)]
+	lines = [";start"] + passes*3
+	for n in range(0, 8, 2):
+		lines += [f"xfer f{n} b{n}", f"tuck + f{n+1} 1"]
+	return ops, lines + [";end"]
+
+
+def test_repeats_expand():
+	ops, lines = repeated()
+	assert (len(ops.op), ops.repeated_ct) == (10, 18)
+	assert list(ops) == lines and len(ops) == len(lines)
+	assert [ops[i] for i in range(len(lines))] == lines
+	assert ops[-3:] == lines[-3:]
+	assert "".join(ops.chunks()) == "".join(line+"\n" for line in lines)
+	assert (ops.count(Op.KNIT), ops.count(Op.XFER)) == (18, 4)
+	#
+	op, d, bed, n, bed2, n2, cs = ops.columns(0, len(lines))
+	assert op.tolist() == [Op.RAW] + [Op.KNIT]*18 + [Op.XFER, Op.TUCK]*4 + [Op.RAW]
+	assert n[-9:-1].tolist() == [0, 1, 2, 3, 4, 5, 6, 7]
+	assert n2[-9:-1:2].tolist() == [0, 2, 4, 6]
+
+
+def test_add_repeat_rejected():
+	ops, _ = repeated()
+	assert not ops.addRepeat(3, 1) # (overlaps the last repeat block)
+	assert ops.addRepeat(0, 4) and ops.addRepeat(1, 0) # (nothing to repeat)
+	assert ops.repeats == repeated()[0].repeats
+
+
+@pytest.mark.parametrize("ct", [0, 1, 4, 7, 13, 19, 20, 23, 26, 27, 28])
+def test_truncate_repeats(ct):
+	ops, lines = repeated()
+	ops.truncate(ct)
+	assert list(ops) == lines[:ct] and len(ops) == ct
+	addPass(ops, "+", [9])
+	assert list(ops)[-1] == "knit + f9 1" and len(ops) == ct+1
+
+
+@pytest.mark.parametrize("start", [0, 1, 5, 7, 19, 21, 22, 27, 28])
+def test_copy_ops_repeats(start):
+	ops, lines = repeated()
+	res = ops.copyOps(start)
+	assert list(res) == lines[start:]
+	if start <= 1: assert res.repeated_ct == ops.repeated_ct # (kept as repeats when the whole block is copied)
+
+
+def test_add_buffer_repeats(tmp_path):
+	ops, lines = repeated()
+	res = OpBuffer()
+	res.append(";first")
+	res.addBuffer(ops)
+	assert list(res) == [";first"] + lines
+	assert res.repeated_ct == ops.repeated_ct
+	#
+	# (once part of a block is spooled, it's added as copies instead)
+	spooled = OpBuffer(buffer_size=4, dir=tmp_path)
+	spooled.addBuffer(ops)
+	out = io.StringIO()
+	spooled.writeTo(out)
+	assert out.getvalue() == "".join(line+"\n" for line in lines)
+	spooled.close()
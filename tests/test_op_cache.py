@@ -0,0 +1,97 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from knitlib.knitlib_knitout import Writer
+from knitlib.knitlib import altTuckCaston
+from knitlib.op_cache import OpCache, canonical
+from knitlib.stitch_patterns import jersey
+
+
+def state(k: Writer) -> tuple:
+	bns = [(bn, k.bns.snapshot(*bn).loop_ct, k.bns.snapshot(*bn).stitch_ct) for bn in k.bns.keys()]
+	carriers = {c: (carrier.direction, carrier.bed, carrier.needle) for c, carrier in k.carrier_map.items()}
+	return bns, carriers, k.rack_value, k.stitch_number, k.speed_number, k.hook_active
+
+
+def castOn() -> Writer:
+	k = Writer("1 2 3")
+	with warnings.catch_warnings():
+		warnings.simplefilter("ignore")
+		altTuckCaston(k, 19, 0, "1", "f", inhook=True, releasehook=True)
+	return k
+
+
+def program(cache, width: int=20, passes: int=4) -> Writer:
+	k = castOn()
+	jersey_ = jersey if cache is None else cache.wrap(jersey)
+	jersey_(k, width-1, 0, passes, "1", speed_number=200)
+	k.knit("-", "f19", "1")
+	return k
+
+
+def test_hit_matches_uncached(tmp_path):
+	cache = OpCache(tmp_path / "cache")
+	expected = program(None)
+	k1 = program(cache)
+	assert (cache.hits, cache.misses) == (0, 1)
+	k2 = program(cache)
+	assert (cache.hits, cache.misses) == (1, 1)
+	for k in (k1, k2):
+		assert [str(line) for line in k.operations] == [str(line) for line in expected.operations]
+		assert list(k.operations.repeats) == list(expected.operations.repeats)
+		assert state(k) == state(expected)
+
+
+def test_key_depends_on_args_and_state(tmp_path):
+	cache = OpCache(tmp_path / "cache")
+	k = castOn()
+	key = cache.key(jersey, k, 19, 0, 4, "1")
+	assert key == cache.key(jersey, castOn(), 19, 0, 4, "1")
+	assert key == cache.key(jersey, k, 19, 0, passes=4, c="1") # (bound the same way)
+	assert key != cache.key(jersey, k, 19, 0, 6, "1")
+	k.knit("-", "f19", "1")
+	assert key != cache.key(jersey, k, 19, 0, 4, "1")
+
+
+def test_uncacheable_calls_run(tmp_path):
+	cache = OpCache(tmp_path / "cache")
+	k = castOn()
+	assert cache.key(jersey, k, 19, 0, 4, "1", bn_locs=object()) is None
+	#
+	# (calls that warn aren't stored, so the warnings are issued again next time)
+	def floats(k):
+		k.knit("+", "f10", "1")
+		k.knit("-", "f0", "1")
+	for _ in range(2):
+		with warnings.catch_warnings(record=True) as caught:
+			warnings.simplefilter("always")
+			cache.call(floats, k)
+		assert len(caught)
+	assert cache.hits == 0 and not any(cache.dir.glob("*.pkl"))
+
+
+def test_eviction_and_corrupt_entries(tmp_path):
+	cache = OpCache(tmp_path / "cache", max_bytes=1)
+	program(cache)
+	assert not any(cache.dir.glob("*.pkl")) # (evicted right away)
+	#
+	cache = OpCache(tmp_path / "cache")
+	program(cache)
+	(path,) = cache.dir.glob("*.pkl")
+	path.write_bytes(b"corrupt")
+	program(cache)
+	assert (cache.hits, cache.misses) == (0, 2)
+	cache.clear()
+	assert not any(cache.dir.glob("*.pkl"))
+
+
+def test_canonical():
+	assert canonical({"a": 1, "b": [1, 2]}) == canonical({"b": [1, 2], "a": 1})
+	assert canonical({1, 2, 3}) == canonical({3, 2, 1})
+	assert canonical((1, 2)) != canonical([1, 2])
+	assert canonical(1) != canonical(1.0)
+	assert canonical(np.arange(3)) == canonical(np.arange(3))
+	with pytest.raises(TypeError):
+		canonical(object())
@@ -0,0 +1,80 @@
+import gzip
+import io
+
+import numpy as np
+import pytest
+
+from knitlib.knitlib_knitout import Writer
+from knitlib.op_buffer import OpBuffer
+from knitlib.op_file import OpFile, writeOpFile, outputFormat
+
+
+def columns(ops: OpBuffer) -> list:
+	return [np.frombuffer(col, dtype=col.typecode).tolist() for col in (ops.op, ops.d, ops.bed, ops.n, ops.bed2, ops.n2, ops.cs)]
+
+
+def test_op_buffer_round_trip(knitted):
+	ops = knitted.operations
+	assert len(ops.repeats) > 0
+	buf = io.BytesIO()
+	writeOpFile(buf, list(knitted.headers), ops)
+	#
+	op_file = OpFile(io.BytesIO(buf.getvalue()))
+	assert op_file.headers == list(knitted.headers)
+	assert len(op_file) == len(ops)
+	res = op_file.toOpBuffer()
+	assert columns(res) == columns(ops)
+	assert res.strings[:len(ops.strings)] == ops.strings # (followed by the header lines)
+	assert res.repeats == ops.repeats
+	assert res.repeated_ct == ops.repeated_ct
+	assert [str(line) for line in res] == [str(line) for line in ops]
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_kops_matches_knitout(knitted, tmp_path, mmap):
+	knitted.write(tmp_path / "program.k")
+	knitted.write(tmp_path / "program.kops")
+	op_file = OpFile(tmp_path / "program.kops", mmap=mmap)
+	assert isinstance(op_file.op, np.memmap) == mmap
+	out = io.StringIO()
+	op_file.writeKnitout(out)
+	assert out.getvalue() == (tmp_path / "program.k").read_text()
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_compressed_output(knitted, tmp_path, compression):
+	if compression == "zstd": zstandard = pytest.importorskip("zstandard")
+	ext = ".gz" if compression == "gzip" else ".zst"
+	knitted.write(tmp_path / "program.k")
+	knitted.write(tmp_path / f"program.k{ext}")
+	knitted.write(tmp_path / f"program.kops{ext}")
+	#
+	data = (tmp_path / f"program.k{ext}").read_bytes()
+	if compression == "gzip": text = gzip.decompress(data)
+	else: text = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+	assert text == (tmp_path / "program.k").read_bytes()
+	assert [str(line) for line in OpFile(tmp_path / f"program.kops{ext}").toOpBuffer()] == [str(line) for line in knitted.operations]
+
+
+def test_output_format():
+	assert outputFormat("a.k") == (None, False)
+	assert outputFormat("a.k.gz") == ("gzip", False)
+	assert outputFormat("a.kops") == (None, True)
+	assert outputFormat("a.KOPS.zst") == ("zstd", True)
+	assert outputFormat(io.BytesIO(), binary=True) == (None, True)
+	with pytest.raises(ValueError):
+		outputFormat("a.k", compression="lzma")
+
+
+def test_not_an_op_file():
+	with pytest.raises(ValueError):
+		OpFile(io.BytesIO(b"not a knitlib op file, just some bytes"))
+
+
+def test_flushed_ops_raise(tmp_path):
+	k = Writer("1 2 3", stream=tmp_path / "out.k", buffer_size=10)
+	k.inhook("1")
+	for n in range(30):
+		k.knit("+", f"f{n}", "1")
+	with pytest.raises(ValueError):
+		writeOpFile(io.BytesIO(), [], k.operations)
@@ -0,0 +1,302 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from knitlib.knitlib_knitout import Writer
+from knitlib.knit_object import KnitObject, CastonMethod, StitchPattern, DecreaseMethod, IncreaseMethod
+from knitlib.knitout_reader import parseArg
+from knitlib.machine_time import carriagePasses
+from knitlib.op_buffer import OpBuffer, Op
+from knitlib.optimize import optimizeXfers, simulateXfers, scheduleXfers, removeRedundantOps, optimizeOps
+
+
+def loopStates(ops: OpBuffer) -> list:
+	'''
+	Steps a bed model (which loops are on each needle, in stacking order) through the operations, and returns the racking and the model's state just before each operation that isn't a transfer, racking, or comment (i.e., the operations `optimizeXfers` never moves), and at the end.
+	'''
+	op, d, bed, n, bed2, n2, cs = [col.tolist() for col in ops.columns(0, len(ops))]
+	beds, rack, states = {}, 0, []
+	new_ct = 0
+	for i in range(len(op)):
+		if op[i] == Op.RACK:
+			rack = parseArg(ops.strings[cs[i]])
+			continue
+		elif op[i] == Op.XFER:
+			beds.setdefault((bed2[i], n2[i]), []).extend(beds.pop((bed[i], n[i]), []))
+			continue
+		elif op[i] == Op.RAW and ops.strings[cs[i]].startswith(";"): continue
+		#
+		states.append((rack, {bn: tuple(loops) for bn, loops in beds.items() if len(loops)}))
+		if op[i] in (Op.KNIT, Op.TUCK, Op.SPLIT):
+			new_ct += 1
+			if op[i] == Op.SPLIT: beds.setdefault((bed2[i], n2[i]), []).extend(beds.pop((bed[i], n[i]), []))
+			if op[i] == Op.TUCK: beds.setdefault((bed[i], n[i]), []).append(new_ct)
+			else: beds[(bed[i], n[i])] = [new_ct]
+		elif op[i] == Op.DROP: beds.pop((bed[i], n[i]), None)
+	states.append((rack, {bn: tuple(loops) for bn, loops in beds.items() if len(loops)}))
+	return states
+
+
+def shapedPanel(k, dec: DecreaseMethod, inc: IncreaseMethod, count: int=2) -> None:
+	obj = KnitObject(k, gauge=1)
+	with contextlib.redirect_stdout(io.StringIO()):
+		obj.caston(CastonMethod.ALT_TUCK_CLOSED, "f", (30, 0), "1")
+		for _ in range(3):
+			obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+			obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+			obj.decreaseLeft(dec, "f", count)
+			obj.decreaseRight(dec, "f", count)
+			obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+			obj.increaseLeft(inc, "f", 1)
+			obj.increaseRight(inc, "f", 1)
+		obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+
+
+def xferOrder(ops: OpBuffer) -> list:
+	op, _, bed, n, bed2, n2, _ = [col.tolist() for col in ops.columns(0, len(ops))]
+	return [(bed[i], n[i], bed2[i], n2[i]) for i in range(len(op)) if op[i] == Op.XFER]
+
+
+@pytest.mark.parametrize("dec, inc", [(DecreaseMethod.EDGE, IncreaseMethod.SCHOOL_BUS), (DecreaseMethod.EDGE, IncreaseMethod.CASTON), (DecreaseMethod.SCHOOL_BUS, IncreaseMethod.SCHOOL_BUS)])
+def test_loop_state_matches_after_each_run(k, dec, inc):
+	shapedPanel(k, dec, inc)
+	res, removed_ct = optimizeXfers(k.operations)
+	assert len(res) == len(k.operations)-removed_ct
+	assert loopStates(res) == loopStates(k.operations)
+	assert sorted(xferOrder(res)) == sorted(xferOrder(k.operations))
+
+
+def test_fewer_racks_and_passes(k):
+	shapedPanel(k, DecreaseMethod.EDGE, IncreaseMethod.CASTON)
+	res, removed_ct = optimizeXfers(k.operations)
+	assert removed_ct > 0
+	assert sum(1 for o in res.op if o == Op.RACK) == sum(1 for o in k.operations.op if o == Op.RACK)-removed_ct
+	assert len(carriagePasses(res).passes) < len(carriagePasses(k.operations).passes)
+
+
+def test_replayed_writer_state_matches(k):
+	shapedPanel(k, DecreaseMethod.EDGE, IncreaseMethod.SCHOOL_BUS)
+	res, _ = optimizeXfers(k.operations)
+	k2 = Writer("1 2 3 4 5 6")
+	k2.addSegment(res)
+	assert [(bn, k2.bns.snapshot(*bn).loop_ct) for bn in k2.bns.keys()] == [(bn, k.bns.snapshot(*bn).loop_ct) for bn in k.bns.keys()]
+	assert k2.rack_value == k.rack_value
+
+
+def test_same_needle_xfers_keep_their_order(k):
+	# f2 -> b1 at rack 1 has to stay after b1 -> f1 at rack 0, and f1 -> b0 at rack 1 before it
+	k.inhook("1")
+	for bn in ("f1", "f2", "f7"):
+		k.knit("+", bn, "1")
+	for bn in ("b5", "b1"):
+		k.knit("-", bn, "1")
+	k.rack(1)
+	k.xfer("f1", "b0")
+	k.rack(0)
+	k.xfer("b1", "f1")
+	k.rack(1)
+	k.xfer("f2", "b1")
+	k.rack(0)
+	k.xfer("b5", "f5")
+	k.rack(1)
+	k.xfer("f7", "b6")
+	k.rack(0)
+	res, removed_ct = optimizeXfers(k.operations)
+	assert removed_ct > 0
+	order = xferOrder(res)
+	assert order.index((2, 1, 1, 1)) > order.index((1, 1, 2, 0))
+	assert order.index((1, 2, 2, 1)) > order.index((2, 1, 1, 1))
+	assert loopStates(res) == loopStates(k.operations)
+
+
+def test_rack_round_trip_removed(k):
+	k.inhook("1")
+	k.rack(1)
+	k.comment("nothing at this racking")
+	k.rack(0)
+	k.knit("+", "f1", "1")
+	res, removed_ct = optimizeXfers(k.operations)
+	assert removed_ct == 2
+	assert [str(line) for line in res] == [str(line) for line in k.operations if not str(line).startswith("rack")]
+
+
+def test_repeat_blocks_are_not_moved(k):
+	k.inhook("1")
+	for n in (1, 3, 4, 5, 13, 14, 15, 23, 24, 25, 40, 41, 42):
+		k.knit("+", f"f{n}", "1")
+	k.rack(1)
+	k.xfer("f1", "b0")
+	k.rack(0)
+	start = len(k.operations)
+	k.rack(1)
+	k.xfer("f3", "b2")
+	k.rack(0)
+	k.xfer("f4", "b4")
+	k.rack(1)
+	k.xfer("f5", "b4")
+	k.rack(0)
+	k.knit("+", "f10", "1")
+	assert k.operations.addRepeat(len(k.operations)-start, 2, 10)
+	k.rack(1)
+	k.xfer("f40", "b39")
+	k.rack(0)
+	k.xfer("f41", "b41")
+	k.rack(1)
+	k.xfer("f42", "b41")
+	k.rack(0)
+	#
+	res, removed_ct = optimizeXfers(k.operations)
+	assert removed_ct > 0
+	assert len(res.repeats) == 1
+	(start, end, times, n_delta), (res_start, res_end, res_times, res_n_delta) = k.operations.repeats[0], res.repeats[0]
+	assert (res_end-res_start, res_times, res_n_delta) == (end-start, times, n_delta)
+	assert [str(line) for line in list(res)[res_start:res_end+(end-start)*times]] == [str(line) for line in list(k.operations)[start:end+(end-start)*times]]
+	assert loopStates(res) == loopStates(k.operations)
+
+
+def test_unchanged_without_removable_racks(k):
+	k.inhook("1")
+	k.rack(1)
+	k.xfer("f1", "b0")
+	k.xfer("f2", "b1")
+	k.rack(0)
+	k.knit("+", "f1", "1")
+	res, removed_ct = optimizeXfers(k.operations)
+	assert removed_ct == 0
+	assert [str(line) for line in res] == [str(line) for line in k.operations]
+
+
+def test_flushed_ops_raise(tmp_path):
+	k = Writer("1 2 3", stream=tmp_path / "out.k", buffer_size=10)
+	k.inhook("1")
+	for n in range(30):
+		k.knit("+", f"f{n}", "1")
+	with pytest.raises(ValueError):
+		optimizeXfers(k.operations)
+
+
+def test_schedule_groups_by_rack():
+	xfers = [(0, 1), (1, 0), (2, 1), (3, 0)]
+	keys = [((1, i), (2, i)) for i in range(4)]
+	assert scheduleXfers(xfers, keys, 0) == [(0, [1, 3]), (1, [0, 2])]
+	# (a shared needle keeps the order)
+	keys[2] = keys[1]
+	assert scheduleXfers(xfers, keys, 0) == [(0, [1, 3]), (1, [0, 2])]
+	keys = [((1, 0), (2, 0))]*3+[((1, 3), (2, 3))]
+	assert scheduleXfers(xfers, keys, 0) == [(0, [3]), (1, [0]), (0, [1]), (1, [2])]
+
+
+def test_simulate_xfers():
+	bed, n, bed2, n2 = np.array([1, 2]), np.array([1, 0]), np.array([2, 1]), np.array([0, 0])
+	assert simulateXfers([0, 1], bed, n, bed2, n2) == {(1, 1): [], (2, 0): [], (1, 0): [(1, 0), (2, 0), (1, 1)]}
+
+
+def settingsAtOps(ops: OpBuffer) -> list:
+	'''
+	Returns each operation other than `rack`, `x-stitch-number`, `x-speed-number`, and comments (as a line), along with the racking, stitch number, and speed number in effect for it.
+	'''
+	settings = {Op.RACK: 0, Op.STITCH_NUMBER: None, Op.SPEED_NUMBER: None}
+	res = []
+	for i, line in enumerate(ops):
+		code = Op(ops.op[i])
+		if code in settings: settings[code] = parseArg(ops.strings[ops.cs[i]])
+		elif not str(line).startswith(";"): res.append((str(line), *settings.values()))
+	return res
+
+
+def lines(ops: OpBuffer) -> list:
+	return [str(line) for line in ops]
+
+
+def test_settings_unchanged_at_each_op(k):
+	k.inhook("1")
+	k.stitchNumber(20) # (overridden before the first knit)
+	k.speedNumber(100)
+	for n in range(6):
+		k.stitchNumber(30) # (re-emitted with the same value after the first one)
+		k.knit("+", f"f{n}", "1")
+		k.speedNumber(200)
+		k.speedNumber(100) # (overrides the one before it, and sets the value that's in effect already)
+		k.stitchNumber(20 if n % 2 else 30)
+		k.knit("-", f"b{n}", "1")
+	k.rack(1)
+	k.comment("no ops at this racking")
+	k.rack(0)
+	k.rack(0.25)
+	k.knit("+", "f10", "1")
+	k.rack(0)
+	res, removed = removeRedundantOps(k.operations)
+	assert settingsAtOps(res) == settingsAtOps(k.operations)
+	assert removed == {"rack": 2, "stitch_number": 7, "speed_number": 12, "miss": 0}
+	assert len(res) == len(k.operations)-sum(removed.values())
+	assert lines(res)[-3:] == ["rack 0.25", "knit + f10 1", "rack 0"]
+
+
+def test_changed_settings_kept(k):
+	k.inhook("1")
+	k.stitchNumber(20)
+	k.knit("+", "f1", "1")
+	k.stitchNumber(30)
+	k.knit("+", "f2", "1")
+	k.rack(1)
+	k.xfer("f2", "b1")
+	k.rack(0)
+	k.speedNumber(100)
+	k.knit("+", "f3", "1")
+	res, removed = removeRedundantOps(k.operations)
+	assert sum(removed.values()) == 0
+	assert lines(res) == lines(k.operations)
+
+
+def test_only_identical_back_to_back_misses_merged(k):
+	k.inhook("1", "2")
+	k.miss("+", "f5", "1")
+	k.miss("+", "f5", "1") # (merged)
+	k.comment("comment")
+	k.miss("+", "f5", "1") # (merged)
+	k.miss("-", "f5", "1") # (other direction)
+	k.miss("-", "f6", "1") # (other needle)
+	k.miss("-", "f6", "2") # (other carrier)
+	k.knit("-", "f6", "2")
+	k.miss("-", "f6", "2") # (after a knit)
+	k.rack(1)
+	k.miss("-", "f6", "2") # (after a racking change)
+	res, removed = removeRedundantOps(k.operations)
+	assert removed == {"rack": 0, "stitch_number": 0, "speed_number": 0, "miss": 2}
+	assert lines(res) == [line for i, line in enumerate(lines(k.operations)) if i not in (2, 4)]
+
+
+def test_repeat_blocks_kept(k):
+	k.inhook("1")
+	k.stitchNumber(20)
+	k.knit("+", "f0", "1")
+	start = len(k.operations)
+	k.stitchNumber(20)
+	k.knit("+", "f1", "1")
+	k.stitchNumber(30)
+	k.knit("+", "f2", "1")
+	assert k.operations.addRepeat(len(k.operations)-start, 2, 2)
+	k.stitchNumber(30)
+	k.knit("+", "f10", "1")
+	res, removed = removeRedundantOps(k.operations)
+	assert removed["stitch_number"] == 1
+	assert [(end-start, times, n_delta) for start, end, times, n_delta in res.repeats] == [(end-start, times, n_delta) for start, end, times, n_delta in k.operations.repeats]
+	assert lines(res) == lines(k.operations)[:-2]+lines(k.operations)[-1:]
+
+
+def test_write_optimized(k, tmp_path, capsys):
+	shapedPanel(k, DecreaseMethod.EDGE, IncreaseMethod.CASTON)
+	k.rack(1)
+	k.rack(0)
+	k.stitchNumber(20)
+	k.stitchNumber(20)
+	k.outhook("1")
+	before = lines(k.operations)
+	expected, removed = optimizeOps(k.operations)
+	k.write(tmp_path / "out.k", optimize=True)
+	assert lines(k.operations) == before
+	assert f"optimized out {sum(removed.values())} lines" in capsys.readouterr().out
+	assert (tmp_path / "out.k").read_text().splitlines()[-len(expected):] == lines(expected)
+	assert removed["rack"] > 2 and removed["stitch_number"] == 1
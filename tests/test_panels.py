@@ -0,0 +1,25 @@
+import contextlib
+import io
+
+from knitlib.knit_object import CastonMethod, StitchPattern
+from knitlib.panels import Panel, PanelLayout, buildGarment
+
+
+def swatch(obj, width: int, rows: int) -> None:
+	obj.k.addHeader("Machine", "SWGN2")
+	obj.k.addHeader("Gauge", "15")
+	obj.caston(CastonMethod.ALT_TUCK_CLOSED, "f", (width-1, 0), "1")
+	for _ in range(rows):
+		obj.knitPass(StitchPattern.JERSEY, "f", None, "1")
+
+
+def test_garment_headers(tmp_path):
+	panels = [Panel(swatch, (10, 4)), Panel(swatch, (8, 4), needle_offset=20, carriers={"1": "2"})]
+	with contextlib.redirect_stdout(io.StringIO()):
+		k = buildGarment(panels, cs="1 2 3", layout=PanelLayout.SIDE_BY_SIDE, processes=1)
+	assert list(k.headers) == [";;Carriers: 1 2 3", ";;Machine: SWGN2", ";;Gauge: 15"]
+	#
+	k.write(tmp_path / "garment.k")
+	lines = (tmp_path / "garment.k").read_text().splitlines()
+	assert lines[1:4] == list(k.headers)
+	assert any(line.startswith("knit") and line.endswith(" 2") for line in lines) # (the second panel's carrier was renamed)
@@ -0,0 +1,217 @@
+from typing import Dict, List, Tuple
+from array import array
+import warnings
+
+import numpy as np
+
+#===============================================================================
+import sys
+from pathlib import Path
+
+## Standalone boilerplate before relative imports
+if not __package__: #remove #?
+	DIR = Path(__file__).resolve().parent
+	sys.path.insert(0, str(DIR.parent))
+	__package__ = DIR.name
+#===============================================================================
+
+from .knitout_helpers import UnalignedNeedlesWarning, StackedLoopWarning, HeldLoopWarning, EmptyXferWarning
+from .op_buffer import OpBuffer, Op, BEDS
+from .bed_needle import RowCounter
+
+
+# order in which checks are reported for a single operation (matches the order the Writer used to run them in)
+UNALIGNED, EMPTY_XFER, HELD_LOOP, STACKED_LOOP = range(4)
+
+
+def parseRack(s: str):
+	try:
+		return int(s)
+	except ValueError:
+		return float(s)
+
+
+class Validator:
+	'''
+	Deferred validation engine for the knitlib Writer.
+
+	Rather than checking each operation as it is emitted, the validator replays the Writer's op log (see `OpBuffer`) in batches, using its own lightweight model of the beds (`loop_ct`, `stitch_ct`, and `init_row` per needle, with the same semantics as `BedNeedleList`).  The replay records the relevant per-op state (held rows, stacked loops, loops on the xfer source, rack), and the checks themselves are then run as vectorized comparisons over those columns.  Warnings are reported in op order, against the line number of the offending operation.
+
+	Checks covered: `UnalignedNeedlesWarning`, `EmptyXferWarning`, `HeldLoopWarning`, and `StackedLoopWarning` (carrier checks stay eager in the Writer, since its carrier state drives other behavior).
+
+	Validation is incremental: each call to `run` only looks at operations that haven't been validated yet, so it can be called after each chunk of a streaming Writer is flushed.
+
+	Parameters:
+	----------
+	* `k` (Writer): the knitout Writer being validated.
+	'''
+	def __init__(self, k):
+		self.k = k
+		self.reset()
+
+	def reset(self) -> None:
+		self.validated_ct = 0 # number of operations (including spooled ones) that have been validated already
+		self.rack = 0
+		self.loops: Dict[Tuple[int, int], List[int]] = {} # (bed, needle) -> [loop_ct, stitch_ct, init_row]
+		self.rows = RowCounter()
+
+	def getState(self) -> dict:
+		'''
+		Returns a copy of the validator's state (for checkpoints; see `Writer.checkpoint`).
+		'''
+		return {"validated_ct": self.validated_ct, "rack": self.rack, "loops": {key: bn.copy() for key, bn in self.loops.items()}, "rows": self.rows.copy()}
+
+	def setState(self, state: dict) -> None:
+		'''
+		Restores the validator's state from `getState` (leaving `state` untouched, so it can be restored again).
+		'''
+		self.validated_ct = state["validated_ct"]
+		self.rack = state["rack"]
+		self.loops = {key: bn.copy() for key, bn in state["loops"].items()}
+		self.rows = state["rows"].copy()
+
+	@property
+	def row_ct(self) -> int:
+		return self.rows.row_ct
+
+	#---------------------------------------------------------------------------
+
+	def newLoop(self, key: Tuple[int, int], loop_ct: int) -> List[int]:
+		bn = self.loops[key] = [loop_ct, 0, self.row_ct]
+		self.rows.add(0)
+		return bn
+
+	def heldRows(self, bn) -> int:
+		if bn is None: return -1
+		else: return max(0, self.row_ct-(bn[2]+bn[1]))
+
+	#---------------------------------------------------------------------------
+	def replay(self, ops: OpBuffer, cols: Tuple[np.ndarray, ...]) -> Tuple[array, array, array, array]:
+		'''
+		Steps the bed model through the operations in `cols` (the `OpBuffer.columns` of the in-memory operations to validate), returning per-op columns of: rack, held rows (before the op; -1 if n/a), loop count after the op on the destination needle (-1 if n/a), and loop count on the xfer source needle before the op (1 if n/a).
+		'''
+		op_col, _, bed_col, n_col, bed2_col, n2_col, cs_col = cols
+		ct = len(op_col)
+		racks = array("d", bytes(8*ct))
+		held = array("i", [-1])*ct
+		stacked = array("i", [-1])*ct
+		from_loops = array("i", [1])*ct
+		#
+		loops = self.loops
+		for i, op, bed, n, bed2, n2, cs in zip(range(ct), op_col.tolist(), bed_col.tolist(), n_col.tolist(), bed2_col.tolist(), n2_col.tolist(), cs_col.tolist()):
+			if op == Op.RACK: self.rack = parseRack(ops.strings[cs])
+			racks[i] = self.rack
+			#
+			if op == Op.KNIT or op == Op.TUCK:
+				bn = loops.get((bed, n))
+				held[i] = self.heldRows(bn)
+				if bn is None: bn = self.newLoop((bed, n), 1)
+				elif op == Op.TUCK: bn[0] += 1
+				else:
+					bn[0] = 1 # since knitted thru
+					self.rows.remove(bn[1])
+					bn[1] += 1
+					self.rows.add(bn[1])
+				if op == Op.TUCK: stacked[i] = bn[0]
+			elif op == Op.XFER or op == Op.SPLIT:
+				bn_from = loops.get((bed, n))
+				from_loops[i] = 0 if bn_from is None else bn_from[0]
+				if op == Op.SPLIT: held[i] = self.heldRows(bn_from)
+				#
+				if bn_from is None: bn_from = self.newLoop((bed, n), 0) # since not necessarily a loop forming
+				bn_to = loops.get((bed2, n2))
+				if bn_to is None: bn_to = self.newLoop((bed2, n2), 0)
+				#
+				bn_to[0] += bn_from[0]
+				if bn_from[1] < bn_to[1]:
+					self.rows.remove(bn_to[1])
+					bn_to[1] = bn_from[1]
+					self.rows.add(bn_to[1])
+					bn_to[2] = bn_from[2]
+				#
+				if op == Op.SPLIT:
+					self.rows.remove(bn_from[1])
+					bn_from[:] = [1, 0, self.row_ct]
+					self.rows.add(0)
+				else:
+					del loops[(bed, n)]
+					self.rows.remove(bn_from[1])
+				stacked[i] = bn_to[0]
+			elif op == Op.DROP:
+				bn = loops.pop((bed, n), None)
+				held[i] = self.heldRows(bn)
+				if bn is not None: self.rows.remove(bn[1])
+		#
+		return racks, held, stacked, from_loops
+
+	def run(self, ops: OpBuffer, header_ct: int=0) -> int:
+		'''
+		Validates any operations in `ops` that haven't been validated yet, issuing warnings (or raising errors, depending on the Writer's exception handling) for any problems found.
+
+		Parameters:
+		----------
+		* `ops` (OpBuffer): the Writer's operations.
+		* `header_ct` (int, optional): number of header lines preceding the operations (for reporting line numbers). Defaults to `0`.
+
+		Returns:
+		-------
+		* (int): number of problems found.
+		'''
+		start, end = self.validated_ct-ops.spooled_ct, len(ops)-ops.spooled_ct
+		assert start >= 0, "operations were flushed without being validated"
+		if start >= end: return 0
+		#
+		cols = ops.columns(start, end)
+		racks, held, stacked, from_loops = self.replay(ops, cols)
+		self.validated_ct = ops.spooled_ct+end
+		#
+		op = cols[0]
+		bed, n, bed2, n2 = [col.astype(np.int64) for col in cols[2:6]]
+		racks = np.frombuffer(racks, dtype=np.float64)
+		#
+		found = [] # (row, check)
+		is_xfer = (op == Op.XFER) | (op == Op.SPLIT)
+		if UnalignedNeedlesWarning.ENABLED:
+			same_bed = (bed % 2) == (bed2 % 2) # (f/fs are odd ids, b/bs are even)
+			offset = np.where(bed % 2 == 1, n-n2, n2-n)
+			for i in np.flatnonzero(is_xfer & (same_bed | (offset != racks))): found.append((i, UNALIGNED))
+		if EmptyXferWarning.ENABLED:
+			for i in np.flatnonzero(is_xfer & (np.frombuffer(from_loops, dtype=np.int32) <= 0)): found.append((i, EMPTY_XFER))
+		if HeldLoopWarning.ENABLED:
+			for i in np.flatnonzero(np.frombuffer(held, dtype=np.int32) > HeldLoopWarning.MAX_HOLD_ROWS): found.append((i, HELD_LOOP))
+		if StackedLoopWarning.ENABLED:
+			for i in np.flatnonzero(np.frombuffer(stacked, dtype=np.int32) > StackedLoopWarning.MAX_STACK_CT): found.append((i, STACKED_LOOP))
+		#
+		found.sort()
+		for i, check in found:
+			line_number = header_ct+ops.spooled_ct+i+start+1
+			bn, bn2 = f"{BEDS[bed[i]]}{n[i]}", f"{BEDS[bed2[i]]}{n2[i]}"
+			if check == UNALIGNED:
+				r = racks[i]
+				if r.is_integer(): r = int(r)
+				if bed[i] % 2 == bed2[i] % 2: print(f"can't xfer to/from to same bed ({BEDS[bed[i]]} -> {BEDS[bed2[i]]})")
+				warnings.warn(UnalignedNeedlesWarning(r, bn, bn2, line_number))
+			elif check == EMPTY_XFER: warnings.warn(EmptyXferWarning(bn, line_number))
+			elif check == HELD_LOOP: warnings.warn(HeldLoopWarning(bn, held[i], line_number))
+			else:
+				if op[i] == Op.TUCK: bn2 = bn
+				warnings.warn(StackedLoopWarning(bn2, stacked[i], line_number))
+		#
+		return len(found)
+
+	def checkHeldLoops(self, line_number: int) -> int:
+		'''
+		Checks all needles that are still holding loops for held loops (e.g., when the program is finished).
+
+		Returns:
+		-------
+		* (int): number of held loops found.
+		'''
+		ct = 0
+		if HeldLoopWarning.ENABLED:
+			for (bed, n), bn in self.loops.items():
+				held_ct = self.heldRows(bn)
+				if held_ct > HeldLoopWarning.MAX_HOLD_ROWS:
+					warnings.warn(HeldLoopWarning(f"{BEDS[bed]}{n}", held_ct, line_number))
+					ct += 1
+		return ct